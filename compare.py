@@ -0,0 +1,104 @@
+import argparse
+import sys
+from statistics import median
+from src.comparison import Comparison, load_results
+
+"""
+Compares the runtimes of a candidate benchmark with those of a baseline benchmark and
+fails if the candidate regressed.
+"""
+
+# Exit code if a regression threshold is crossed
+EXIT_REGRESSION = 1
+
+parser = argparse.ArgumentParser(description='Viper runner regression report.')
+parser.add_argument('baseline', help='results folder, journal or individual timings CSV file of the baseline.')
+parser.add_argument('candidate', help='results folder, journal or individual timings CSV file of the candidate.')
+parser.add_argument('--config', help='run configuration to compare; by default, all run configurations present in '
+                                     'both benchmarks are compared.')
+parser.add_argument('--baseline-config', help='run configuration of the baseline, if named differently.')
+parser.add_argument('--candidate-config', help='run configuration of the candidate, if named differently.')
+parser.add_argument('--alpha', type=float, default=0.05, help='significance level of the tests (default 0.05).')
+parser.add_argument('--correction', choices=['holm', 'fdr'], default='holm',
+                    help='multiple-testing correction: Holm-Bonferroni or Benjamini-Hochberg (default holm).')
+parser.add_argument('--threshold', type=float, default=0.05,
+                    help='fail if the geometric mean slowdown exceeds this fraction (default 0.05, i.e. 5%%).')
+parser.add_argument('--file-threshold', type=float,
+                    help='fail if any file is significantly slower by more than this fraction.')
+parser.add_argument('--allow-new-timeouts', action='store_true',
+                    help='do not fail if runs are killed (timeout or memory) only in the candidate.')
+parser.add_argument('--top', type=int, default=10, help='number of regressions and improvements listed (default 10).')
+args = parser.parse_args()
+
+baseline = load_results(args.baseline)
+candidate = load_results(args.candidate)
+
+if args.baseline_config or args.candidate_config or args.config:
+    pairs = [(args.baseline_config or args.config, args.candidate_config or args.config)]
+    if None in pairs[0]:
+        parser.error("both run configurations are required, use --config or both --baseline-config and "
+                     "--candidate-config")
+else:
+    baseline_configs = set(config for _, config in baseline)
+    candidate_configs = set(config for _, config in candidate)
+    pairs = [(config, config) for config in sorted(baseline_configs & candidate_configs)]
+    if not pairs:
+        print("Error: the benchmarks have no run configuration in common, use --baseline-config and "
+              "--candidate-config")
+        sys.exit(3)
+
+
+def print_files(title, comparisons):
+    print("  {}:".format(title))
+    if not comparisons:
+        print("    none")
+    for comparison in comparisons[:args.top]:
+        print("    {:.3f}x  {}  (median {:.3f} s -> {:.3f} s, p = {:.4f})"
+              .format(comparison.ratio, comparison.file,
+                      median(comparison.baseline_times), median(comparison.candidate_times),
+                      comparison.adjusted_p_value))
+    if len(comparisons) > args.top:
+        print("    ... and {} more".format(len(comparisons) - args.top))
+
+
+failed = False
+for baseline_config, candidate_config in pairs:
+    comparison = Comparison(baseline, candidate, baseline_config, candidate_config, args.correction)
+    print("Comparing '{}' (baseline) with '{}' (candidate) on {} files"
+          .format(baseline_config, candidate_config, len(comparison.files)))
+    if comparison.missing_files:
+        print("  {} files are only present in one of the benchmarks".format(len(comparison.missing_files)))
+
+    ratio = comparison.geometric_mean_ratio()
+    if ratio is None:
+        print("  No file has valid runs in both benchmarks")
+    else:
+        print("  Geometric mean speedup: {:.3f}x (runtime ratio candidate/baseline {:.3f})".format(1 / ratio, ratio))
+        if ratio > 1 + args.threshold:
+            print("  FAILED: geometric mean slowdown exceeds {:.1%}".format(args.threshold))
+            failed = True
+
+    regressions = comparison.regressions(args.alpha)
+    print_files("Significant regressions (runtime ratio candidate/baseline)", regressions)
+    print_files("Significant improvements (runtime ratio candidate/baseline)", comparison.improvements(args.alpha))
+
+    if args.file_threshold is not None:
+        severe = comparison.regressions(args.alpha, args.file_threshold)
+        if severe:
+            print("  FAILED: {} files are slower by more than {:.1%}".format(len(severe), args.file_threshold))
+            failed = True
+
+    new_timeouts = comparison.new_timeouts()
+    print("  New timeouts:")
+    if not new_timeouts:
+        print("    none")
+    for file_comparison in new_timeouts:
+        print("    {}  ({} of {} runs killed)".format(file_comparison.file, file_comparison.candidate_killed,
+                                                      file_comparison.candidate_killed +
+                                                      len(file_comparison.candidate_times)))
+    if new_timeouts and not args.allow_new_timeouts:
+        print("  FAILED: {} files newly time out".format(len(new_timeouts)))
+        failed = True
+    print()
+
+sys.exit(EXIT_REGRESSION if failed else 0)
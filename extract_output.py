@@ -0,0 +1,37 @@
+import argparse
+import os
+import sys
+from src.output_archive import OutputArchive
+
+"""
+Extracts the output of single benchmark runs from the output archive of a benchmark.
+"""
+
+parser = argparse.ArgumentParser(description='Viper runner output extractor.')
+parser.add_argument('archive', help='the output archive, e.g. results/<date>/output.gz.')
+parser.add_argument('--file', help='input file of the run.')
+parser.add_argument('--config', help='run configuration of the run.')
+parser.add_argument('--rep', type=int, help='repetition of the run, starting at 0.')
+parser.add_argument('--stream', choices=['stdout', 'stderr'], default='stdout', help='the output stream.')
+parser.add_argument('--list', action='store_true', help='list the archived runs instead of extracting output.')
+args = parser.parse_args()
+
+matches = [entry for entry in OutputArchive.entries(args.archive)
+           if (args.file is None or os.path.normpath(entry['input_file']) == os.path.normpath(args.file))
+           and (args.config is None or entry['config_name'] == args.config)
+           and (args.rep is None or entry['repetition'] == args.rep)
+           and (args.list or entry['stream'] == args.stream)]
+
+if args.list:
+    for entry in matches:
+        print("{};{};{};{};{}".format(entry['input_file'], entry['config_name'], entry['repetition'],
+                                      entry['stream'], entry['size']))
+    sys.exit(0)
+
+if not matches:
+    print("No matching run found.", file=sys.stderr)
+    sys.exit(1)
+
+for entry in matches:
+    sys.stdout.buffer.write(OutputArchive.read(args.archive, entry))
+sys.stdout.flush()
@@ -0,0 +1,32 @@
+import argparse
+import os
+from src.config import Config
+from src.journal import ResultJournal
+from src.merge import merge_journals
+from src.result import RunResult
+from src.result_processor import ResultProcessor
+from src.util import find_config_copy, require
+
+"""
+Merges the results of the shards of a benchmark, e.g. run with --shard or on several
+hosts, into one results folder with the usual CSV files.
+"""
+
+parser = argparse.ArgumentParser(description='Viper runner result merger.')
+parser.add_argument('results_dirs', nargs='+', metavar='RESULTS_DIR', help='the results folders of the shards.')
+parser.add_argument('--output', required=True, help='the results folder to create.')
+args = parser.parse_args()
+
+for results_dir in args.results_dirs:
+    require(os.path.isdir(results_dir), "Results folder '{}' does not exist".format(results_dir))
+
+config = Config()
+config.read_config_file(find_config_copy(args.results_dirs[0]), {'results.path': args.output})
+journal_file = os.path.join(config.get('results.path'), config.get('results.journal'))
+require(not os.path.exists(journal_file), "Journal '{}' already exists".format(journal_file))
+
+journal = ResultJournal(journal_file)
+merge_journals(args.results_dirs, journal)
+journal.close()
+
+ResultProcessor(RunResult(journal), config).write_result_files()
@@ -2,134 +2,193 @@ import csv
 import datetime
 import argparse
 import numpy
-import matplotlib.pyplot as plt
 import os.path
-
-parser = argparse.ArgumentParser(description='Viper runner result plotter.')
-parser.add_argument('-max', dest='max', type=int, help='cutoff value for plotting.')
-parser.add_argument('csv', help='the csv file containing the data.')
-args = parser.parse_args()
-
-data = {}
-mean_std_dev_dict = {}
-max_value = int(args.max or -1)
-
-# Read data
-with open(args.csv, newline='') as csv_file:
-    dataReader = csv.reader(csv_file, delimiter=";")
-    readerIter = dataReader.__iter__()
-    next(readerIter)  # skip first line
-    for line in readerIter:
-        file_name = line[1]
-        if file_name not in data:
-            data[file_name] = {}
-            mean_std_dev_dict[file_name] = {}
-
-        file_dict = data[file_name]
-
-        config_name = line[2]
-        if config_name not in file_dict:
-            file_dict[config_name] = []
-
-        time = float(line[0])
-        file_dict[config_name].append(time)
-
-# Process data
-for file, file_data in data.items():
-    for config, timings in file_data.items():
-        if not timings:
-            mean_std_dev_dict[file][config] = (-1, 0)
-        else:
-            arr = numpy.array(timings)
-            mean_std_dev_dict[file][config] = (numpy.mean(arr), numpy.std(arr))
-
-# Plot data
-configs = list(list(data.values())[0].keys())
-configs.sort()
-
-for i in range(0, len(configs)):
-    config1 = configs[i]
-
-    for j in range(i + 1, len(configs)):
-        config2 = configs[j]
-        fig = plt.figure()
-
-        curr_min = None
-        curr_max = 0
-
-        config1_faster = 0
-        config2_faster = 0
-
-        diffs = []
-
-        count_cutoffs = 0
-
-        for file, config_dict in data.items():
-            (x, x_dev) = mean_std_dev_dict[file][config1]
-            (y, y_dev) = mean_std_dev_dict[file][config2]
-
-            fmt = 'bo'
-            if x == -1 or 0 < max_value < x:
-                x = max_value
-                x_dev = None
-                fmt = 'rs'
-            if y == -1 or 0 < max_value < y:
-                y = max_value
-                y_dev = None
-                fmt = 'rs'
-
-            if x < y:
-                config1_faster += 1
-            if y < x:
-                config2_faster += 1
-
-            if x != max_value and y != max_value:
-                diffs.append(x - y)
-            else:
-                count_cutoffs += 1
-
-            plt.errorbar(x, y, xerr=x_dev, yerr=y_dev, fmt=fmt)
-
-            tmp_max = max(x, y)
-            if tmp_max > curr_max:
-                curr_max = tmp_max
-            tmp_min = min(x, y)
-            if not curr_min or tmp_min < curr_min:
-                curr_min = tmp_min
-
+from concurrent.futures import ProcessPoolExecutor
+
+"""
+Plots the individual timings of a benchmark: a scatter plot comparing each pair of run
+configurations, and optionally a cactus plot of all run configurations.
+"""
+
+
+def load_columns(csv_path):
+    """
+    Reads an individual timings CSV file into a structured array with one entry per run.
+    Input files and run configurations are stored as indices into the returned name lists.
+    :return: triple (structured array with fields time, file, config and killed,
+             list of input file names, list of run configuration names)
+    """
+    with open(csv_path, newline='') as csv_file:
+        reader = csv.reader(csv_file, delimiter=";")
+        header = next(reader)
+        rows = [line for line in reader if len(line) >= 5]
+    if not rows:
+        return numpy.zeros(0, dtype=[('time', 'f8'), ('file', 'i4'), ('config', 'i4'), ('killed', '?')]), [], []
+    columns = list(zip(*rows))
+
+    files, file_indices = numpy.unique(numpy.array(columns[1]), return_inverse=True)
+    configs, config_indices = numpy.unique(numpy.array(columns[2]), return_inverse=True)
+    killed = numpy.array(columns[4]) == "True"
+    if "out of memory" in header:
+        killed |= numpy.array(columns[header.index("out of memory")]) == "True"
+
+    runs = numpy.empty(len(rows), dtype=[('time', 'f8'), ('file', 'i4'), ('config', 'i4'), ('killed', '?')])
+    runs['time'] = numpy.array(columns[0], dtype=float)
+    runs['file'] = file_indices
+    runs['config'] = config_indices
+    runs['killed'] = killed
+    return runs, files.tolist(), configs.tolist()
+
+
+def aggregate(runs, n_files, n_configs, exclude_killed=False):
+    """
+    Computes the mean and standard deviation of the runtimes, for all input files and run
+    configurations at once.
+    :param exclude_killed: whether to leave out the runs killed due to a timeout or the memory limit
+    :return: pair of (n_files x n_configs) arrays (means, standard deviations); the mean is
+             NaN if a file has no (completed) run under a run configuration
+    """
+    valid = runs[~runs['killed']] if exclude_killed else runs
+    keys = valid['file'] * n_configs + valid['config']
+    size = n_files * n_configs
+    counts = numpy.bincount(keys, minlength=size)
+    sums = numpy.bincount(keys, weights=valid['time'], minlength=size)
+    squares = numpy.bincount(keys, weights=valid['time'] ** 2, minlength=size)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        means = sums / counts
+        std_devs = numpy.sqrt(numpy.maximum(squares / counts - means ** 2, 0))
+    return means.reshape(n_files, n_configs), std_devs.reshape(n_files, n_configs)
+
+
+def configure_matplotlib(fast):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    if not fast:
         plt.rc('text', usetex=True)
-        plt.rc('font', family='serif', size=16)
-        plt.plot([curr_min, curr_max + 0.1], [curr_min, curr_max + 0.1], 'r-')
-        config1_name = config1.upper()
-        config2_name = config2.upper()
-
-        plt.xlabel(config1_name + ", runtime in [s]")
-        plt.ylabel(config2_name + ", runtime in [s]")
-        plt.grid(True)
-
-        time = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
-        file_name = os.path.join(os.path.dirname(os.path.realpath(args.csv)),
-                                 time + "_" + config1 + "_vs_" + config2 + "_scatter") + ""
-
-        with open(file_name + ".txt", 'w+') as plotInfoFile:
-            plotInfoFile.writelines(str(len(data)) + " points\n")
-            plotInfoFile.writelines("config " + config1 + " was faster " + str(config1_faster) + " times.\n")
-            plotInfoFile.writelines("config " + config2 + " was faster " + str(config2_faster) + " times.\n")
-            plotInfoFile.writelines(str(count_cutoffs) + " points were marked red due to cutoff.\n")
-            plotInfoFile.writelines(str(len(data) - config1_faster - config2_faster) +
-                                    " times both were exactly equally fast (or timeout).\n")
-
-            # differences statistics
-            diffs_arr = arr = numpy.array(diffs)
-            mean_diff = numpy.mean(diffs)
-            variance_diffs = numpy.var(diffs)
-            std_diffs = numpy.std(diffs)
-
-            plotInfoFile.writelines("Mean difference (" + config1 + " - " + config2 + ") was " +
-                                    str(mean_diff) + ", standard deviation was " + str(std_diffs) +
-                                    ", variance was " + str(variance_diffs) + ".\n")
-
-        fig_name = file_name + ".pdf"
-        plt.savefig(fig_name, dpi=600, format="pdf")
-
-        # plt.show()
+    plt.rc('font', family='serif', size=16)
+    return plt
+
+
+def save_figure(plt, file_name, fast):
+    plt.tight_layout()
+    if fast:
+        plt.savefig(file_name + ".png", dpi=150, format="png")
+    else:
+        plt.savefig(file_name + ".pdf", dpi=600, format="pdf")
+    plt.close()
+
+
+def render_scatter(task):
+    """
+    Renders the scatter plot of one pair of run configurations and writes its statistics.
+    Runs in a worker process.
+    :return: the name of the plot, without extension
+    """
+    config1, config2, x_values, x_devs, y_values, y_devs, max_value, log_scale, fast, file_name = task
+    plt = configure_matplotlib(fast)
+    plt.figure()
+
+    # Files without (completed) run, or above the cutoff, are drawn at the cutoff
+    cutoff = max_value if max_value > 0 else numpy.nanmax(numpy.concatenate([x_values, y_values, [0.0]]))
+    x_cut = numpy.isnan(x_values) | ((max_value > 0) & (x_values > max_value))
+    y_cut = numpy.isnan(y_values) | ((max_value > 0) & (y_values > max_value))
+    x = numpy.where(x_cut, cutoff, x_values)
+    y = numpy.where(y_cut, cutoff, y_values)
+    cut = x_cut | y_cut
+
+    config1_faster = int(numpy.count_nonzero(x < y))
+    config2_faster = int(numpy.count_nonzero(y < x))
+    diffs = (x - y)[~cut]
+
+    plt.errorbar(x[~cut], y[~cut], xerr=x_devs[~cut], yerr=y_devs[~cut], fmt='bo')
+    plt.plot(x[cut], y[cut], 'rs')
+
+    curr_min = min(x.min(), y.min()) if len(x) else 0
+    curr_max = max(x.max(), y.max()) if len(x) else 0
+    if log_scale:
+        curr_min = max(curr_min, 1e-3)
+        plt.xscale('log')
+        plt.yscale('log')
+    plt.plot([curr_min, curr_max + 0.1], [curr_min, curr_max + 0.1], 'r-')
+
+    plt.xlabel(config1.upper() + ", runtime in [s]")
+    plt.ylabel(config2.upper() + ", runtime in [s]")
+    plt.grid(True)
+
+    with open(file_name + ".txt", 'w+') as plotInfoFile:
+        plotInfoFile.writelines(str(len(x)) + " points\n")
+        plotInfoFile.writelines("config " + config1 + " was faster " + str(config1_faster) + " times.\n")
+        plotInfoFile.writelines("config " + config2 + " was faster " + str(config2_faster) + " times.\n")
+        plotInfoFile.writelines(str(int(numpy.count_nonzero(cut))) + " points were marked red due to cutoff.\n")
+        plotInfoFile.writelines(str(len(x) - config1_faster - config2_faster) +
+                                " times both were exactly equally fast (or timeout).\n")
+
+        # differences statistics
+        plotInfoFile.writelines("Mean difference (" + config1 + " - " + config2 + ") was " +
+                                str(numpy.mean(diffs)) + ", standard deviation was " + str(numpy.std(diffs)) +
+                                ", variance was " + str(numpy.var(diffs)) + ".\n")
+
+    save_figure(plt, file_name, fast)
+    return file_name
+
+
+def render_cactus(task):
+    """
+    Renders a cactus plot: for each run configuration, the number of input files whose
+    average runtime is at most t, as a function of t. Files without completed run are never solved.
+    :return: the name of the plot, without extension
+    """
+    configs, means, log_scale, fast, file_name = task
+    plt = configure_matplotlib(fast)
+    plt.figure()
+    for index, config in enumerate(configs):
+        solved = numpy.sort(means[:, index][~numpy.isnan(means[:, index])])
+        plt.step(solved, numpy.arange(1, len(solved) + 1), where='post', label=config)
+    if log_scale:
+        plt.xscale('log')
+    plt.xlabel("runtime in [s]")
+    plt.ylabel("files solved within runtime")
+    plt.legend(loc='lower right')
+    plt.grid(True)
+    save_figure(plt, file_name, fast)
+    return file_name
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Viper runner result plotter.')
+    parser.add_argument('-max', dest='max', type=int, help='cutoff value for plotting.')
+    parser.add_argument('-j', '--jobs', type=int, help='number of plots rendered in parallel, defaults to the number '
+                                                       'of CPUs.')
+    parser.add_argument('--fast', action='store_true', help='render PNG files without LaTeX, at a lower resolution.')
+    parser.add_argument('--log', action='store_true', help='use logarithmic runtime axes.')
+    parser.add_argument('--cactus', action='store_true', help='also render a cactus plot of all configurations.')
+    parser.add_argument('--exclude-killed', action='store_true',
+                        help='leave runs killed due to a timeout or the memory limit out of the scatter plots\' means; '
+                             'files without completed run are then drawn at the cutoff.')
+    parser.add_argument('csv', help='the csv file containing the data.')
+    args = parser.parse_args()
+
+    max_value = int(args.max or -1)
+
+    runs, files, configs = load_columns(args.csv)
+    means, std_devs = aggregate(runs, len(files), len(configs), args.exclude_killed)
+
+    time = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
+    prefix = os.path.join(os.path.dirname(os.path.realpath(args.csv)), time + "_")
+
+    tasks = []
+    for i in range(0, len(configs)):
+        for j in range(i + 1, len(configs)):
+            tasks.append((render_scatter, (configs[i], configs[j], means[:, i], std_devs[:, i], means[:, j],
+                                           std_devs[:, j], max_value, args.log, args.fast,
+                                           prefix + configs[i] + "_vs_" + configs[j] + "_scatter")))
+    if args.cactus:
+        # A file is only solved by its completed runs
+        completed_means, _ = aggregate(runs, len(files), len(configs), exclude_killed=True)
+        tasks.append((render_cactus, (configs, completed_means, args.log, args.fast, prefix + "cactus")))
+
+    with ProcessPoolExecutor(max_workers=args.jobs) as executor:
+        futures = [executor.submit(render, task) for render, task in tasks]
+        for future in futures:
+            print("Plotted " + future.result())
@@ -0,0 +1,43 @@
+import argparse
+import os
+import sys
+from src.database import ResultDatabase
+
+"""
+Queries the results database that benchmarks with 'results.database' store their results in.
+"""
+
+parser = argparse.ArgumentParser(description='Viper runner results database query.')
+parser.add_argument('database', help='the results database, see results.database.')
+parser.add_argument('--file', help='input files to report, an SQL LIKE pattern, e.g. "%%/quantifiers/%%".')
+parser.add_argument('--config', help='run configuration to report.')
+parser.add_argument('--last', type=int, help='only report the last LAST benchmarks.')
+parser.add_argument('--runs', action='store_true',
+                    help='report every single run instead of aggregates per benchmark, file and run configuration.')
+parser.add_argument('--campaigns', action='store_true', help='list the stored benchmarks instead.')
+parser.add_argument('--show-config', type=int, metavar='ID', help='print the configuration file of a benchmark.')
+args = parser.parse_args()
+
+if not os.path.exists(args.database):
+    print("Error: database '{}' does not exist".format(args.database), file=sys.stderr)
+    sys.exit(3)
+
+database = ResultDatabase(args.database)
+
+if args.campaigns:
+    print("id;results path;date;host;runs")
+    for row in database.campaigns():
+        print(";".join(str(value) for value in row))
+elif args.show_config is not None:
+    config_text = database.config_text(args.show_config)
+    if config_text is None:
+        print("Error: no configuration stored for benchmark {}".format(args.show_config), file=sys.stderr)
+        sys.exit(1)
+    print(config_text)
+else:
+    columns, rows = database.time_series(args.file, args.config, args.last, args.runs)
+    print(";".join(columns))
+    for row in rows:
+        print(";".join("" if value is None else str(value) for value in row))
+
+database.close()
@@ -1,5 +1,12 @@
 import argparse
+import os
+import socket
+import subprocess
+import sys
+from src.distributed import parse_address
 from src.environment import Environment
+from src.plan import ExecutionPlan
+from src.util import find_config_copy, require
 
 """
 Helper script for the Viper tool chain.
@@ -16,9 +23,71 @@ def print_header():
 
 print_header()
 parser = argparse.ArgumentParser(description='Viper tool chain runner.')
-parser.add_argument('config_file', help='the configuration file for this script.')
+parser.add_argument('config_file', nargs='?',
+                    help='the configuration file for this script. Optional when resuming, in which case the copy '
+                         'in the results folder is used.')
+parser.add_argument('-j', '--jobs', type=int, help='number of concurrent job slots, overrides the configuration file.')
+parser.add_argument('--resume', metavar='RESULTS_DIR',
+                    help='resume the interrupted benchmark that wrote its results to RESULTS_DIR.')
+parser.add_argument('--shard', metavar='I/N',
+                    help='only run the I-th of N disjoint subsets of the files, writing the results to the '
+                         'subfolder shard-I-of-N.')
+parser.add_argument('--coordinator', metavar='[HOST:]PORT',
+                    help='do not run the jobs, but serve them to workers connecting to PORT.')
+parser.add_argument('--local-workers', type=int, default=0,
+                    help='number of workers started on this machine, requires --coordinator.')
+parser.add_argument('--worker', metavar='HOST:PORT',
+                    help='run jobs served by the coordinator at HOST:PORT, using the same configuration file.')
+parser.add_argument('--worker-index', type=int, default=0,
+                    help='index of the worker among those on this machine, such that their verifier servers '
+                         'listen on distinct ports. Set by --local-workers.')
+parser.add_argument('--dry-run', action='store_true',
+                    help='do not run the jobs, but save the execution plan to the results folder.')
+parser.add_argument('--plan', metavar='PLAN_FILE',
+                    help='execute a saved execution plan instead of a configuration file.')
 args = parser.parse_args()
+
+overrides = {'jobs': args.jobs}
+if args.shard:
+    overrides['shard'] = args.shard
+    overrides['results.subfolder'] = "shard-" + args.shard.replace("/", "-of-")
+config_file = args.config_file
+plan = None
+if args.plan:
+    if config_file:
+        parser.error("the configuration file cannot be combined with --plan")
+    require(os.path.isfile(args.plan), "Plan file '{}' does not exist".format(args.plan))
+    plan = ExecutionPlan.load(args.plan)
+    config_file = args.plan
+if args.resume:
+    require(os.path.isdir(args.resume), "Results folder '{}' does not exist".format(args.resume))
+    overrides['results.path'] = args.resume
+    if not config_file:
+        config_file = find_config_copy(args.resume)
+elif not config_file:
+    parser.error("the configuration file is required unless --resume or --plan is given")
+if args.local_workers and not args.coordinator:
+    parser.error("--local-workers requires --coordinator")
+
 env = Environment()
-env.exec(args.config_file)
+if args.worker:
+    overrides['results.subfolder'] = "worker-{}-{}".format(socket.gethostname(), os.getpid())
+    env.work(config_file, parse_address(args.worker), overrides, plan, args.worker_index)
+    sys.exit(0)
+
+coordinator = parse_address(args.coordinator) if args.coordinator else None
+workers = []
+for worker_index in range(0, args.local_workers):
+    worker_command = [sys.executable, os.path.abspath(__file__), '--worker', "127.0.0.1:{}".format(coordinator[1]),
+                      '--worker-index', str(worker_index)]
+    if args.jobs:
+        worker_command += ['--jobs', str(args.jobs)]
+    workers.append(subprocess.Popen(worker_command + (['--plan', config_file] if plan else [config_file])))
+
+env.exec(config_file, overrides, resume=bool(args.resume), coordinator=coordinator, plan=plan, dry_run=args.dry_run)
+if args.dry_run:
+    sys.exit(0)
+for worker in workers:
+    worker.wait()
 env.analyze()
 env.print_end_info()
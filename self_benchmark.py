@@ -0,0 +1,57 @@
+import argparse
+import json
+import sys
+from src.self_benchmark import SelfBenchmark, compare_reports, load_report
+
+"""
+Benchmarks the overhead of the runner itself and optionally fails if it regressed
+compared to an earlier report.
+"""
+
+# Exit code if a metric regressed
+EXIT_REGRESSION = 1
+
+parser = argparse.ArgumentParser(description='Viper runner self-benchmark.')
+parser.add_argument('--repetitions', type=int, default=20, help='number of samples per metric (default 20).')
+parser.add_argument('--only', nargs='+', choices=SelfBenchmark.BENCHMARKS, metavar='BENCHMARK',
+                    help='benchmarks to run, out of: ' + ", ".join(SelfBenchmark.BENCHMARKS) + '.')
+parser.add_argument('--containment', choices=['auto', 'cgroup', 'process_group', 'none'], default='auto',
+                    help='containment of the jobs, as the configuration property (default auto).')
+parser.add_argument('--jobs', type=int, default=1, help='number of job slots of the end-to-end benchmark (default 1).')
+parser.add_argument('--output', default='self_benchmark.json',
+                    help='JSON file to write the report to, - for stdout (default self_benchmark.json).')
+parser.add_argument('--baseline', help='report of an earlier self-benchmark to compare with.')
+parser.add_argument('--threshold', type=float, default=0.2,
+                    help='fail if a metric is worse than in the baseline by more than this fraction '
+                         '(default 0.2, i.e. 20%%).')
+args = parser.parse_args()
+if args.repetitions < 1:
+    parser.error("--repetitions must be at least 1")
+
+baseline = load_report(args.baseline) if args.baseline else None
+report = SelfBenchmark(args.repetitions, args.containment, args.jobs).run(args.only)
+
+if args.output == "-":
+    json.dump(report, sys.stdout, indent=2)
+    print()
+else:
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print("Wrote the self-benchmark report to '{}'".format(args.output))
+
+print()
+for name, metric in sorted(report['metrics'].items()):
+    print("  {}: median {:.6g} {} (min {:.6g}, max {:.6g})".format(name, metric['median'], metric['unit'],
+                                                                   metric['min'], metric['max']))
+
+if baseline is not None:
+    regressions = compare_reports(baseline, report, args.threshold)
+    print()
+    print("Regressions compared to '{}':".format(args.baseline))
+    if not regressions:
+        print("  none")
+    for name, before, after in regressions:
+        print("  {}: {:.6g} -> {:.6g} {}".format(name, before, after, report['metrics'][name]['unit']))
+    if regressions:
+        print("FAILED: {} metrics are worse by more than {:.1%}".format(len(regressions), args.threshold))
+        sys.exit(EXIT_REGRESSION)
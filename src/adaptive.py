@@ -0,0 +1,36 @@
+from src.stats import relative_ci_width
+
+
+class AdaptiveRepetitions:
+    """
+    Decides how often a (file, run configuration) pair is repeated: at least 'minimum'
+    and at most 'maximum' times, but no more once the confidence interval of the mean
+    runtime is narrow enough.
+    """
+
+    def __init__(self, minimum, maximum, target_ci_width, confidence):
+        """
+        :param target_ci_width: width of the confidence interval relative to the mean, e.g. 0.05
+        :param confidence: confidence level of the interval, e.g. 0.95
+        """
+        self.minimum = minimum
+        self.maximum = maximum
+        self.target_ci_width = target_ci_width
+        self.confidence = confidence
+
+    def done(self, n_runs, times):
+        """
+        :param n_runs: number of runs so far, including those that timed out
+        :param times: runtimes of the runs that did not time out
+        :return: True if no further repetition is needed
+        """
+        if n_runs >= self.maximum:
+            return True
+        if n_runs < self.minimum:
+            return False
+        if not times:
+            # Timed out every time, more repetitions are unlikely to help
+            return True
+        if len(times) < 2:
+            return False
+        return relative_ci_width(times, self.confidence) <= self.target_ci_width
@@ -0,0 +1,196 @@
+import datetime
+import gzip
+import os
+import re
+import subprocess
+from src.process_runner import ProcessRunner
+from src.result import SingleRunResult
+from src.util import replace_files_placeholder, replace_placeholders
+
+"""
+Batch rounds run several input files in one invocation of a run configuration's
+command, which receives them via the @files@ placeholder, such that the startup of the
+verifier (e.g. of a cold JVM) is paid once per batch instead of once per file. The
+runtime and outcome of each file are extracted from the output of the invocation.
+"""
+
+# Units of the runtimes reported in the output of a batch, to the number of units per second
+TIME_UNITS = {'s': 1, 'ms': 1000}
+
+
+class BatchExtractor:
+    """
+    Extracts the runtime and outcome of each file from the output of a batch with a
+    regular expression, which is searched in each line of the output. Its named group
+    'file' matches the input file as passed to the command, 'time' its runtime and the
+    optional group 'outcome' its outcome, which is a success if it is one of 'success'.
+    """
+
+    def __init__(self, pattern, time_unit='s', success=()):
+        self.pattern = re.compile(pattern)
+        self.units_per_second = TIME_UNITS[time_unit]
+        self.success = set(success)
+
+    def extract(self, output, files):
+        """
+        :param output: the output of the batch
+        :param files: the input files of the batch
+        :return: dictionary from each reported input file to pair (runtime in seconds,
+                 return code: 0 if the outcome is a success, 1 otherwise, None without outcome)
+        """
+        paths = {}
+        for file in files:
+            paths[os.path.normpath(file)] = file
+            paths[os.path.abspath(file)] = file
+
+        reported = {}
+        for line in output.splitlines():
+            match = self.pattern.search(line)
+            if match is None:
+                continue
+            file = paths.get(os.path.normpath(match.group('file'))) or paths.get(os.path.abspath(match.group('file')))
+            if file is None:
+                continue
+            try:
+                time = float(match.group('time')) / self.units_per_second
+            except (TypeError, ValueError):
+                continue
+            return_code = None
+            if 'outcome' in self.pattern.groupindex and match.group('outcome') is not None:
+                return_code = 0 if match.group('outcome') in self.success else 1
+            reported[file] = (time, return_code)
+        return reported
+
+
+class BatchRunner:
+    @staticmethod
+    def run_as_benchmark(jobs, batch, config_name, next_job, total_jobs, repetitions, timeout, stdout_fh, stderr_fh,
+                         remaining_jobs=None, server=None, containment=None, memory_limit=None,
+                         output_archive=None, metrics=None, slot=None, results=None):
+        """
+        Runs the jobs of a batch round, i.e. the command on all files of the batch repeatedly.
+        An invocation is limited to 'batch.timeout' seconds, by default 'timeout' per file.
+        Files it did not report, e.g. because it timed out or crashed, are retried in two
+        halves, until a single file is left, whose runtime is then that of its invocation.
+        :param jobs: the repetitions to run, as JobRecords (see src.plan) with the placeholder @files@
+        :param batch: the 'batch' of a RoundPlan
+        :param timeout: timeout of a single file, infinite if not positive; longer reported runtimes
+                        are recorded as timeouts
+        :param results: RunResult to add the single run results to as soon as their invocation completes, or None
+        :return: list of single run results, for each job one per file
+        """
+        extractor = BatchExtractor(batch['pattern'], batch['time_unit'], batch['success'])
+        files = batch['files']
+        run_results = []
+
+        if remaining_jobs is None:
+            remaining_jobs = total_jobs
+        jobs_info = str(remaining_jobs)
+        if remaining_jobs != total_jobs:
+            jobs_info += " remaining (" + str(total_jobs) + " in total)"
+
+        for job_offset, (i, command) in enumerate(jobs):
+            first = next_job + job_offset * len(files)
+            print(datetime.datetime.now().strftime("%d.%m.%Y, %H:%M:%S") +
+                  ": running jobs " + str(first) + " to " + str(first + len(files) - 1) +
+                  " of " + jobs_info + " as a batch of " + str(len(files)) + " files, repetition " +
+                  str(i + 1) + " of " + str(repetitions) + "...")
+            file_to_result = {}
+            pending = [files]
+            while pending:
+                part = pending.pop(0)
+                part_results, unreported, reason = BatchRunner._run_invocation(
+                    extractor, command, part, config_name, i, batch, timeout, stdout_fh, stderr_fh, server,
+                    containment, memory_limit, output_archive, metrics, slot)
+                if results is not None:
+                    results.add_results(part_results)
+                if metrics is not None:
+                    metrics.jobs_finished(slot, part_results)
+                for result in part_results:
+                    file_to_result[result.input_file] = result
+                if unreported:
+                    # Retry the files in halves, such that a file that hangs or crashes the verifier is isolated
+                    half = (len(unreported) + 1) // 2
+                    print("Batch {}, retrying {} of its {} files in smaller batches"
+                          .format(reason, len(unreported), len(part)))
+                    pending[0:0] = [halve for halve in [unreported[:half], unreported[half:]] if halve]
+            run_results.extend(file_to_result[file] for file in files)
+            print()
+
+        return run_results
+
+    @staticmethod
+    def _run_invocation(extractor, command, files, config_name, repetition, batch, timeout, stdout_fh, stderr_fh,
+                        server, containment, memory_limit, output_archive, metrics, slot):
+        """
+        Runs the command once on the files.
+        :return: triple (single run results of the files it reported or, if there is a single file,
+                 of that file; files to retry; the reason why they are retried)
+        """
+        concrete_command = replace_files_placeholder(command, files)
+        if server is not None:
+            concrete_command = [replace_placeholders(part, port=str(server.port)) for part in concrete_command]
+        print("Command: '" + " ".join(concrete_command))
+        if metrics is not None:
+            metrics.job_started(slot, " ".join(files), config_name, concrete_command)
+
+        if server is not None:
+            server.ensure_ready()
+        # A non-positive timeout is infinite, also for the whole invocation
+        invocation_timeout = batch['timeout'] or (timeout * len(files) if timeout > 0 else timeout)
+        process_result = ProcessRunner.run(concrete_command, invocation_timeout, subprocess.PIPE, subprocess.PIPE,
+                                           containment, memory_limit)
+        if server is not None:
+            server.job_done()
+        print("Time elapsed: " + "{:.3f}".format(process_result.time_elapsed) + " seconds")
+
+        output = {stream: gzip.decompress(data).decode(errors='replace')
+                  for stream, (data, _) in process_result.output.items()}
+        if output_archive is None:
+            stdout_fh.write(output['stdout'])
+            stderr_fh.write(output['stderr'])
+        killed = process_result.timeout_occurred or process_result.out_of_memory
+
+        results = []
+        reported = extractor.extract(output['stdout'] + "\n" + output['stderr'], files)
+        for file in files:
+            if file not in reported:
+                continue
+            time_elapsed, return_code = reported[file]
+            run_result = SingleRunResult(config_name, file)
+            run_result.repetition = repetition
+            run_result.time_elapsed = time_elapsed
+            # Like a single run, which would have been killed
+            run_result.timeout_occurred = 0 < timeout < time_elapsed
+            if return_code is None and not killed:
+                return_code = process_result.return_code
+            # Unknown if the batch was killed later on, since the exit code is that of the kill
+            run_result.return_code = return_code
+            results.append(run_result)
+
+        unreported = [file for file in files if file not in reported]
+        if len(files) == 1 and unreported:
+            print("File " + files[0] + " is not reported in the output, recording the runtime of the invocation")
+            run_result = SingleRunResult(config_name, files[0])
+            run_result.repetition = repetition
+            run_result.timeout_occurred = process_result.timeout_occurred
+            run_result.out_of_memory = process_result.out_of_memory
+            run_result.leftover_processes = process_result.leftover_processes
+            run_result.return_code = process_result.return_code
+            run_result.time_elapsed = process_result.time_elapsed
+            run_result.set_usage(process_result.usage)
+            results.append(run_result)
+            unreported = []
+
+        if output_archive is not None and results:
+            for stream, (data, size) in process_result.output.items():
+                output_archive.add_shared([run_result.input_file for run_result in results], config_name,
+                                          repetition, stream, data, size)
+
+        if process_result.timeout_occurred:
+            reason = "timed out"
+        elif process_result.out_of_memory:
+            reason = "exceeded the memory limit"
+        else:
+            reason = "did not report all files"
+        return results, unreported, reason
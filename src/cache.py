@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import time
+from src.result import SingleRunResult
+
+
+class ResultCache:
+    """
+    Content-addressed cache of single run results.
+
+    A result is keyed on the path and contents of the input file, the fully substituted command,
+    the timeout, the memory limit, the containment of the run, the repetition and the contents
+    of the declared tool artifacts (e.g. the fat jar of a verifier). Entries are evicted by age and, least recently used first,
+    by total size.
+    """
+
+    def __init__(self, path, max_size, max_age):
+        """
+        :param path: folder in which the cache entries are stored
+        :param max_size: maximum total size of all entries in bytes, 0 or less for no limit
+        :param max_age: maximum age of an entry in seconds, 0 or less for no limit
+        """
+        self.path = path
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hashes = {}
+
+    def file_hash(self, filename):
+        """
+        Hashes the contents of a file. Hashes are memoized as long as the file's
+        modification time and size do not change.
+        :return: hex digest of the file contents
+        """
+        stat = os.stat(filename)
+        memo_key = (os.path.abspath(filename), stat.st_mtime_ns, stat.st_size)
+        if memo_key not in self.hashes:
+            digest = hashlib.sha256()
+            with open(filename, 'rb') as fh:
+                for chunk in iter(lambda: fh.read(1 << 20), b''):
+                    digest.update(chunk)
+            self.hashes[memo_key] = digest.hexdigest()
+        return self.hashes[memo_key]
+
+    def key(self, file, command, artifacts, timeout, memory_limit, containment, repetition):
+        """
+        :param memory_limit: memory limit of the run in bytes, or None
+        :param containment: name of the containment the run is executed in (see src.containment), or None
+        :return: the cache key of a single run
+        """
+        data = {
+            'path': file,
+            'file': self.file_hash(file),
+            'command': command,
+            'artifacts': [self.file_hash(artifact) for artifact in artifacts],
+            'timeout': timeout,
+            'memory_limit': memory_limit,
+            'containment': containment,
+            'repetition': repetition
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def lookup(self, key):
+        """
+        :return: the cached SingleRunResult, or None if there is no valid entry for the key
+        """
+        filename = self._entry_filename(key)
+        try:
+            if self.max_age > 0 and time.time() - os.path.getmtime(filename) > self.max_age:
+                return None
+            with open(filename) as fh:
+                result = SingleRunResult.from_dict(json.load(fh))
+            # Mark the entry as recently used
+            os.utime(filename)
+        except (OSError, ValueError):
+            return None
+        return result
+
+    def store(self, key, result):
+        filename = self._entry_filename(key)
+        directory = os.path.dirname(filename)
+        if not os.path.exists(directory):
+            os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file first, so that concurrent readers never see partial entries
+        tmp_filename = "{}.{}.tmp".format(filename, os.getpid())
+        with open(tmp_filename, 'w') as fh:
+            json.dump(result.to_dict(), fh)
+        os.replace(tmp_filename, filename)
+
+    def evict(self):
+        """
+        Removes entries that are too old, then the least recently used entries until the
+        total size of the cache is within its limit.
+        :return: number of removed entries
+        """
+        if not os.path.isdir(self.path):
+            return 0
+
+        entries = []
+        for root, dirs, files in os.walk(self.path):
+            for f in files:
+                filename = os.path.join(root, f)
+                try:
+                    stat = os.stat(filename)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, filename))
+
+        entries.sort()
+        now = time.time()
+        total_size = sum(size for _, size, _ in entries)
+        removed = 0
+        for mtime, size, filename in entries:
+            too_old = self.max_age > 0 and now - mtime > self.max_age
+            too_large = self.max_size > 0 and total_size > self.max_size
+            if not too_old and not too_large:
+                continue
+            try:
+                os.remove(filename)
+            except OSError:
+                continue
+            total_size -= size
+            removed += 1
+        return removed
+
+    def _entry_filename(self, key):
+        return os.path.join(self.path, key[:2], key + ".json")
@@ -0,0 +1,169 @@
+import csv
+import glob
+import math
+import os
+from statistics import median
+from pyhocon import ConfigFactory
+from src.journal import ResultJournal, results_folder_file
+from src.result import SingleRunResult
+from src.stats import adjust_p_values, mann_whitney_u
+from src.warmup import Warmup
+
+
+def load_results(path):
+    """
+    Reads the single run results of a benchmark. Warmup runs are excluded, like from the
+    statistics of the benchmark itself, if the run configurations in the configuration copy
+    of the results folder have a 'warmup' property.
+    :param path: a results folder (its journal is read, or its individual timings CSV file if
+                 there is no journal, see results_folder_file), a journal (.jsonl) or an
+                 individual timings CSV file
+    :return: dictionary from (input file, run configuration name) pairs to lists of SingleRunResult
+    """
+    results_dir = path if os.path.isdir(path) else os.path.dirname(path)
+    if os.path.isdir(path):
+        path = results_folder_file(path)
+    results = ResultJournal(path).read() if path.endswith(".jsonl") else _read_timings_csv(path)
+
+    pair_to_results = {}
+    for result in results:
+        key = (os.path.normpath(result.input_file), result.config_name)
+        pair_to_results.setdefault(key, []).append(result)
+
+    warmups = _read_warmups(results_dir or os.curdir)
+    for (file, config_name), pair_results in pair_to_results.items():
+        if config_name in warmups:
+            pair_to_results[(file, config_name)] = _measured_results(warmups[config_name], pair_results)
+    return pair_to_results
+
+
+def _read_warmups(results_dir):
+    """
+    :return: dictionary from run configuration name to its Warmup, for those with a 'warmup' property
+             in the configuration copy of the results folder; empty if there is no unique copy
+    """
+    candidates = glob.glob(os.path.join(glob.escape(results_dir), "*.conf"))
+    if len(candidates) != 1:
+        return {}
+    run_configs = ConfigFactory.parse_file(candidates[0]).get('run_configurations', [])
+    warmups = {c.get('name'): Warmup.from_config(c) for c in run_configs}
+    return {name: warmup for name, warmup in warmups.items() if warmup is not None}
+
+
+def _measured_results(warmup, results):
+    """
+    :param results: single run results of a (file, run configuration) pair
+    :return: the results that are not warmup runs, sorted by repetition; all results if no
+             steady state was detected, see RunResult.process_timings
+    """
+    if all(result.repetition is not None for result in results):
+        results = sorted(results, key=lambda result: result.repetition)
+    n_warmup = warmup.warmup_runs([result.repetition for result in results],
+                                  [result.time_elapsed for result in results],
+                                  [result.is_valid() for result in results])
+    return results[n_warmup or 0:]
+
+
+def _read_timings_csv(filename):
+    with open(filename, newline='') as fh:
+        reader = csv.reader(fh, delimiter=";")
+        header = next(reader, [])
+        column = {name: index for index, name in enumerate(header)}
+        for line in reader:
+            if len(line) < 5:
+                continue
+            result = SingleRunResult(line[column.get("run configuration", 2)], line[column.get("input file", 1)])
+            result.time_elapsed = float(line[column.get("runtime [s]", 0)])
+            result.return_code = line[column.get("exit code", 3)]
+            result.timeout_occurred = line[column.get("timeout", 4)] == "True"
+            if "out of memory" in column:
+                result.out_of_memory = line[column["out of memory"]] == "True"
+            yield result
+
+
+class FileComparison:
+    """
+    Comparison of the runs of one input file under the baseline and the candidate.
+    """
+
+    def __init__(self, file, baseline_results, candidate_results):
+        self.file = file
+        self.baseline_times = [r.time_elapsed for r in baseline_results if r.is_valid()]
+        self.candidate_times = [r.time_elapsed for r in candidate_results if r.is_valid()]
+        self.baseline_killed = len(baseline_results) - len(self.baseline_times)
+        self.candidate_killed = len(candidate_results) - len(self.candidate_times)
+        self.ratio = None
+        self.p_value = None
+        self.adjusted_p_value = None
+        if self.baseline_times and self.candidate_times:
+            baseline_median = median(self.baseline_times)
+            candidate_median = median(self.candidate_times)
+            if baseline_median > 0 and candidate_median > 0:
+                self.ratio = candidate_median / baseline_median
+            _, self.p_value = mann_whitney_u(self.baseline_times, self.candidate_times)
+
+    def new_timeout(self):
+        """
+        :return: True if runs of the file were killed (timeout or memory) only with the candidate
+        """
+        return self.candidate_killed > 0 and self.baseline_killed == 0
+
+    def significant(self, alpha):
+        return self.adjusted_p_value is not None and self.adjusted_p_value < alpha
+
+
+class Comparison:
+    """
+    Compares the runtimes of a candidate with those of a baseline, file by file.
+
+    The medians of the valid runs of each file are compared, and a Mann-Whitney U test
+    decides whether the difference is significant; the p-values are corrected for
+    testing many files at once.
+    """
+
+    def __init__(self, baseline, candidate, baseline_config, candidate_config, correction="holm"):
+        """
+        :param baseline: results of the baseline, see load_results
+        :param candidate: results of the candidate, see load_results
+        """
+        self.baseline_config = baseline_config
+        self.candidate_config = candidate_config
+        baseline_files = {file: results for (file, config), results in baseline.items() if config == baseline_config}
+        candidate_files = {file: results for (file, config), results in candidate.items()
+                           if config == candidate_config}
+        self.missing_files = sorted(set(baseline_files) ^ set(candidate_files))
+        self.files = [FileComparison(file, baseline_files[file], candidate_files[file])
+                      for file in sorted(set(baseline_files) & set(candidate_files))]
+
+        tested = [comparison for comparison in self.files if comparison.p_value is not None]
+        for comparison, p_value in zip(tested, adjust_p_values([c.p_value for c in tested], correction)):
+            comparison.adjusted_p_value = p_value
+
+    def geometric_mean_ratio(self):
+        """
+        :return: geometric mean of the runtime ratios candidate/baseline, or None if no file has valid runs in both
+        """
+        ratios = [comparison.ratio for comparison in self.files if comparison.ratio is not None]
+        if not ratios:
+            return None
+        return math.exp(sum(math.log(ratio) for ratio in ratios) / len(ratios))
+
+    def regressions(self, alpha, threshold=0.0):
+        """
+        :return: the files that got significantly slower by more than the threshold, slowest first
+        """
+        return sorted([c for c in self.files if c.significant(alpha) and c.ratio is not None
+                       and c.ratio > 1 + threshold],
+                      key=lambda c: -c.ratio)
+
+    def improvements(self, alpha, threshold=0.0):
+        """
+        :return: the files that got significantly faster by more than the threshold, fastest first
+        """
+        return sorted([c for c in self.files if c.significant(alpha) and c.ratio is not None
+                       and c.ratio < 1 / (1 + threshold)],
+                      key=lambda c: c.ratio)
+
+    def new_timeouts(self):
+        return [comparison for comparison in self.files if comparison.new_timeout()]
+
@@ -1,13 +1,20 @@
 import os
+import re
 import shutil
 from pyhocon import ConfigFactory, HOCONConverter, UndefinedKey
-from src.util import replace_placeholders, abort, require
+from src.util import PLACEHOLDER_FILES, replace_placeholders, abort, require
+from src.batch import TIME_UNITS
+from src.scheduler import Scheduler
+from src.warmup import WARMUP_DETECTIONS
 
 class Config():
     """
     Benchmark configuration object.
     """
     data = None
+    # The configuration as read and overridden, before defaults and placeholders are applied
+    source = None
+    config_copy_filename = None
 
     def __init__(self):
         """
@@ -21,19 +28,58 @@ class Config():
         print(HOCONConverter.convert(self.data, 'hocon'))
         print()
 
-    def read_config_file(self, config_file):
+    def read_config_file(self, config_file, overrides=None, create_copy=True):
         """
         Parses the configuration file.
+        :param overrides: dictionary of properties overriding those from the file, e.g. from the command line
+        :param create_copy: if false, e.g. for a worker, no copy is placed in the results folder, which
+                            is not created either
         :return: None
         """
 
         print("Parsing configuration file...")
-        self.data = ConfigFactory.parse_file(config_file)
+        self._read(ConfigFactory.parse_file(config_file), overrides)
+
+        # copy content, unless the config is read from the output folder, e.g. when resuming
+        if create_copy:
+            self._create_config_copy(os.path.basename(config_file))
+            if not os.path.samefile(config_file, self.config_copy_filename):
+                shutil.copyfile(config_file, self.config_copy_filename)
+        print("Done.")
+
+    def read_plan_config(self, plan_file, source, overrides=None, config_file=None, create_copy=True):
+        """
+        Reads the configuration saved in an execution plan, see src.plan.
+        :param source: the configuration, as plain dictionary
+        :param config_file: name of the configuration copy of the benchmark the plan was compiled for,
+                            which is reused such that the results folder has a single configuration copy
+        :param create_copy: see read_config_file
+        :return: None
+        """
+
+        print("Reading configuration of plan...")
+        self._read(ConfigFactory.from_dict(source), overrides)
+
+        # The copy allows resuming the benchmark and merging shards, like that of a configuration file
+        if create_copy:
+            self._create_config_copy(config_file or os.path.splitext(os.path.basename(plan_file))[0] + ".conf")
+            with open(self.config_copy_filename, "w") as fh:
+                fh.write(HOCONConverter.convert(ConfigFactory.from_dict(source), 'hocon'))
+        print("Done.")
+
+    def _read(self, data, overrides):
+        self.data = data
+
+        for key, value in (overrides or {}).items():
+            if value is not None:
+                self.data.put(key, value)
+        self.source = self.data.as_plain_ordered_dict()
 
         self._set_default_values()
         self._replace_placeholders()
         self._check_consistency()
 
+    def _create_config_copy(self, filename):
         print("Copying config to output folder...")
 
         # generate output folder if it does not yet exist
@@ -43,18 +89,39 @@ class Config():
             os.makedirs(output_dir)
 
         # create file in case it does not yet exist.
-        config_copy_filename = os.path.join(output_dir, os.path.basename(config_file))
-        open(config_copy_filename, 'a').close()
-
-        # copy content
-        shutil.copyfile(config_file, config_copy_filename)
-        print("Done.")
+        self.config_copy_filename = os.path.join(output_dir, filename)
+        open(self.config_copy_filename, 'a').close()
 
     def _set_default_values(self):
         self._set_default_value('check_files_accessible', True)
         self._set_default_value('confirm_start', True)
         self._set_default_value('print_output', False)
         self._set_default_value('list_files', False)
+        self._set_default_value('jobs', 1)
+        self._set_default_value('pin_cpus', True)
+        self._set_default_value('results.journal', 'journal.jsonl')
+        self._set_default_value('results.schedule', 'schedule.csv')
+        self._set_default_value('schedule.order', 'sequential')
+        self._set_default_value('server_base_port', 2113)
+        self._set_default_value('containment', 'auto')
+        self._set_default_value('calibration_runs', 10)
+        self._set_default_value('results.calibration', 'calibration.csv')
+        self._set_default_value('results.plan', 'plan.json')
+        self._set_default_value('results.warmup', 'warmup.csv')
+        self._set_default_value('timeline_interval', 0.1)
+        if self.get('metrics', None):
+            self._set_default_value('metrics.http_host', '127.0.0.1')
+        if self.get('sample', None):
+            self._set_default_value('sample.seed', 0)
+            self._set_default_value('sample.runtime_buckets', 4)
+            self._set_default_value('sample.directory_depth', 1)
+            self._set_default_value('sample.history', self.get_list('schedule.history', []))
+            self._set_default_value('results.sample', 'sample.csv')
+
+        if self.data.get('adaptive_repetitions', None):
+            self._set_default_value('adaptive_repetitions.confidence', 0.95)
+            # The maximum number of repetitions bounds the benchmark, just like 'repetitions' otherwise
+            self.data.put('repetitions', self.data.get('adaptive_repetitions.max', None))
 
     def _set_default_value(self, key, default):
         val = self.data.get(key, default)
@@ -64,6 +131,15 @@ class Config():
         # TODO: Complete checks, e.g. check existence of all mandatory properties
         require(self.data, "Parsing configuration file failed")
 
+        if self.get('adaptive_repetitions', None):
+            minimum = self.get_int('adaptive_repetitions.min', None)
+            maximum = self.get_int('adaptive_repetitions.max', None)
+            require(minimum and minimum >= 2, "Property 'adaptive_repetitions.min' must be at least 2")
+            require(maximum and maximum >= minimum, "Property 'adaptive_repetitions.max' must be at least 'adaptive_repetitions.min'")
+            require(self.get_float('adaptive_repetitions.target_ci_width', 0) > 0,
+                    "Property 'adaptive_repetitions.target_ci_width' must be positive")
+            require(0 < self.get_float('adaptive_repetitions.confidence') < 1,
+                    "Property 'adaptive_repetitions.confidence' must be between 0 and 1")
         require(self.get_int('repetitions', None), "Mandatory property 'repetitions' not found")
         require(self.get_int('timeout', None), "Mandatory property 'timeout' not found")
         require(self.get_config('results', None), "Mandatory property 'results' not found")
@@ -78,14 +154,162 @@ class Config():
         require(test_options == 1, "Exactly one of 'test_folder' and 'test_files_in_file' must be set")
         require(not self.get('ignore_files', []) or self.get_string('test_folder', ""), "'ignore_files' can only be set if 'test_folder' is true")
 
+        if self.get_string('cache.path', ""):
+            artifacts = list(self.get('cache.artifacts', []))
+            for run_config in self.get('run_configurations'):
+                artifacts.extend(run_config.get('artifacts', []))
+            for artifact in artifacts:
+                require(os.path.isfile(artifact), "Cache artifact '{}' does not exist".format(artifact))
+
+        for run_config in self.get('run_configurations'):
+            if run_config.get('warmup', None):
+                self._check_warmup(run_config)
+            if run_config.get('batch', None):
+                self._check_batch(run_config)
+            else:
+                require(not any(PLACEHOLDER_FILES in part for part in run_config.get('command')),
+                        "Placeholder {} in run configuration '{}' requires a 'batch' property"
+                        .format(PLACEHOLDER_FILES, run_config.get('name')))
+            if run_config.get('server', None):
+                require(run_config.get('server.command', None) and run_config.get('server.check_command', None),
+                        "Server of run configuration '{}' requires 'command' and 'check_command'"
+                        .format(run_config.get('name')))
+
+        require(self.get_string('containment') in ['auto', 'cgroup', 'process_group', 'none'],
+                "Property 'containment' must be one of 'auto', 'cgroup', 'process_group' and 'none'")
+        memory_limits = [self.get('memory_limit', None)] + \
+                        [run_config.get('memory_limit', None) for run_config in self.get('run_configurations')]
+        require(self.get_string('containment') != 'none' or not any(memory_limits),
+                "Memory limits require 'containment' other than 'none'")
+
+        require(self.get_float('timeline_interval') > 0, "Property 'timeline_interval' must be positive")
+
+        require(self.get_string('schedule.order') in ['sequential', 'longest_first', 'interleaved', 'random'],
+                "Property 'schedule.order' must be one of 'sequential', 'longest_first', 'interleaved' and 'random'")
+        require(self.get_string('schedule.order') not in ['interleaved', 'random'] or
+                not self.get('adaptive_repetitions', None),
+                "Adaptive repetitions cannot be combined with an interleaved or random order")
+        for history_file in self.get_list('schedule.history', []):
+            require(os.path.exists(history_file), "History file '{}' does not exist".format(history_file))
+
+        if self.get('sample', None):
+            require(bool(self.get_int('sample.size', 0)) != bool(self.get_float('sample.fraction', 0)),
+                    "Exactly one of 'sample.size' and 'sample.fraction' must be set")
+            require(self.get_int('sample.size', 0) >= 0 and 0 <= self.get_float('sample.fraction', 0) <= 1,
+                    "Property 'sample.size' must be positive and 'sample.fraction' between 0 and 1")
+            require(self.get_int('sample.runtime_buckets') >= 1, "Property 'sample.runtime_buckets' must be at least 1")
+            for history_file in self.get_list('sample.history'):
+                require(os.path.exists(history_file), "History file '{}' does not exist".format(history_file))
+
+        if self.get('metrics', None):
+            require(self.get_string('metrics.textfile', "") or self.get_int('metrics.http_port', 0),
+                    "At least one of 'metrics.textfile' and 'metrics.http_port' must be set")
+            require(0 <= self.get_int('metrics.http_port', 0) < 65536, "Property 'metrics.http_port' must be a port")
+
+        if self.get('shard', None):
+            index, count = Config.parse_shard(self.get_string('shard'))
+            require(count >= 1 and 1 <= index <= count,
+                    "Shard '{}' must have the form i/n with 1 <= i <= n".format(self.get_string('shard')))
+
+        jobs = self.get_int('jobs')
+        require(jobs >= 1, "Property 'jobs' must be at least 1")
+        if jobs > 1 and self.get_bool('pin_cpus'):
+            if not Scheduler.can_pin_cpus():
+                print("Warning: CPU pinning is not supported on this platform, job slots will not be pinned")
+                self.data.put('pin_cpus', False)
+            else:
+                n_cpus = len(Scheduler.available_cpus())
+                require(jobs <= n_cpus, "Cannot pin {} job slots to {} CPUs; lower 'jobs' or disable 'pin_cpus'".format(jobs, n_cpus))
+
+    def _check_warmup(self, run_config):
+        name = run_config.get('name')
+        detection = run_config.get('warmup.detection', 'fixed')
+        require(detection in WARMUP_DETECTIONS, "Warmup detection of run configuration '{}' must be one of {}"
+                .format(name, ", ".join("'{}'".format(d) for d in WARMUP_DETECTIONS)))
+        if detection == 'fixed':
+            runs = run_config.get_int('warmup.runs', 0)
+            require(0 < runs < self.get_int('repetitions'),
+                    "Property 'warmup.runs' of run configuration '{}' must be positive and less than 'repetitions'"
+                    .format(name))
+            require(not self.get('adaptive_repetitions', None) or runs < self.get_int('adaptive_repetitions.min'),
+                    "Property 'warmup.runs' of run configuration '{}' must be less than 'adaptive_repetitions.min'"
+                    .format(name))
+        else:
+            # Adaptive repetitions would stop based on the runtimes of undetected warmup runs
+            require(not self.get('adaptive_repetitions', None),
+                    "Warmup detection of run configuration '{}' cannot be combined with adaptive repetitions"
+                    .format(name))
+            require(run_config.get_int('warmup.window', 3) >= 2,
+                    "Property 'warmup.window' of run configuration '{}' must be at least 2".format(name))
+
+    def _check_batch(self, run_config):
+        name = run_config.get('name')
+        require(run_config.get_int('batch.size', 0) >= 1,
+                "Property 'batch.size' of run configuration '{}' must be at least 1".format(name))
+        require(any(PLACEHOLDER_FILES in part for part in run_config.get('command')),
+                "Command of run configuration '{}' must contain the placeholder {}".format(name, PLACEHOLDER_FILES))
+        try:
+            groups = re.compile(run_config.get_string('batch.pattern', "")).groupindex
+        except re.error as err:
+            groups = {}
+            require(False, "Property 'batch.pattern' of run configuration '{}' is no regular expression: {}"
+                    .format(name, err))
+        require('file' in groups and 'time' in groups,
+                "Property 'batch.pattern' of run configuration '{}' must have the named groups 'file' and 'time'"
+                .format(name))
+        require('outcome' not in groups or run_config.get_list('batch.success', []),
+                "Property 'batch.success' of run configuration '{}' must list the successful outcomes"
+                .format(name))
+        require(run_config.get_string('batch.time_unit', 's') in TIME_UNITS,
+                "Property 'batch.time_unit' of run configuration '{}' must be one of {}"
+                .format(name, ", ".join("'{}'".format(unit) for unit in TIME_UNITS)))
+        require(run_config.get('batch.timeout', None) is None or run_config.get_float('batch.timeout') > 0,
+                "Property 'batch.timeout' of run configuration '{}' must be positive".format(name))
+        # Adaptive repetitions decide per file when to stop, but a batch runs all its files
+        require(not self.get('adaptive_repetitions', None),
+                "Batch run configuration '{}' cannot be combined with adaptive repetitions".format(name))
+        # The results of a batch depend on the other files of the batch, hence are not cached
+        require(not self.get_string('cache.path', "") or run_config.get_bool('always_rerun', False),
+                "Batch run configuration '{}' does not use the result cache and requires 'always_rerun = true'"
+                .format(name))
+        # The process tree of an invocation is shared by all its files
+        require(not self.get_string('results.timelines', ""),
+                "Batch run configuration '{}' cannot be combined with 'results.timelines'".format(name))
+
+    @staticmethod
+    def parse_shard(shard):
+        """
+        :param shard: string of the form "i/n"
+        :return: pair (i, n), or (0, 0) if the string is malformed
+        """
+        parts = shard.split("/")
+        if len(parts) != 2 or not parts[0].strip().isdigit() or not parts[1].strip().isdigit():
+            return 0, 0
+        return int(parts[0]), int(parts[1])
+
     def _replace_placeholders(self):
         self._transform_string('results.path', replace_placeholders)
+        self._transform_string('results.journal', replace_placeholders)
+        self._transform_string('results.schedule', replace_placeholders)
+        self._transform_string('results.output_archive', replace_placeholders)
+        self._transform_string('results.paired_comparison', replace_placeholders)
+        self._transform_string('results.calibration', replace_placeholders)
+        self._transform_string('results.sample', replace_placeholders)
+        self._transform_string('results.plan', replace_placeholders)
+        self._transform_string('results.warmup', replace_placeholders)
+        self._transform_string('results.timelines', replace_placeholders)
         self._transform_string('results.individual_timings', replace_placeholders)
         self._transform_string('results.per_config_timings', replace_placeholders)
         self._transform_string('results.avg_per_config_timings', replace_placeholders)
+        self._transform_string('metrics.textfile', replace_placeholders)
         self._transform_string('stdout_file', replace_placeholders)
         self._transform_string('stderr_file', replace_placeholders)
 
+        # Shards and workers write to their own subfolder, unless resuming from it
+        subfolder = self.get('results.subfolder', None)
+        if subfolder and os.path.basename(os.path.normpath(self.get_string('results.path'))) != subfolder:
+            self.data.put('results.path', os.path.join(self.get_string('results.path'), subfolder))
+
     def _transform_string(self, key, func):
         pre_value = self.data.get(key, None)
         if not pre_value == None:
@@ -0,0 +1,481 @@
+import atexit
+import itertools
+import os
+import select
+import signal
+import threading
+import time
+import psutil
+
+"""
+Containment of the process trees of benchmark jobs: each job runs in its own process
+group, or in its own cgroup v2 leaf if a writable cgroup is available. Killing a job
+then reliably kills its whole tree, and processes that survive a job are detected.
+
+Since jobs run in their own session, they do not receive the SIGINT of Ctrl-C in the
+terminal. Closing the containment, which also happens when the runner exits, kills
+the jobs that are still running.
+"""
+
+# Shell snippet that moves itself into the cgroup whose cgroup.procs file is passed as $0,
+# and then executes the actual command. Hence, no process of the job runs outside the cgroup.
+CGROUP_EXEC_SNIPPET = 'echo $$ > "$0" && exec "$@"'
+
+# Time in seconds to wait for killed processes to disappear
+KILL_GRACE_PERIOD = 2.0
+
+# Maximum time in seconds to wait for the wrapper of a job to move it into its cgroup
+WRAPPER_START_LIMIT = 2.0
+
+# Interval in seconds at which it is checked whether the wrapper exited before moving the job into its cgroup
+WRAPPER_EXIT_CHECK_INTERVAL = 0.01
+
+
+def create_containment(mode, cgroup_root=None, memory_limits=False):
+    """
+    :param mode: one of "auto", "cgroup", "process_group" and "none"
+    :param cgroup_root: writable cgroup v2 folder to create job cgroups in, defaults to the runner's own cgroup
+    :param memory_limits: whether any job has a memory limit, which the kernel then enforces if possible
+    :return: containment object, or None for the legacy behaviour of killing the process tree found by psutil
+    """
+    if mode == "none" or os.name != 'posix':
+        return None
+    if mode in ["auto", "cgroup"]:
+        root = cgroup_root or CgroupContainment.own_cgroup()
+        if root and os.access(root, os.W_OK):
+            try:
+                return CgroupContainment(root, memory_limits)
+            except OSError as err:
+                print("Cannot create cgroups in '{}': {}".format(root, err))
+        if mode == "cgroup":
+            print("Warning: no writable cgroup v2 found, falling back to process groups")
+    return ProcessGroupContainment()
+
+
+class JobAborted(Exception):
+    """
+    Raised for a job that was killed because its containment was closed, e.g. since the
+    runner was interrupted while the job ran in another job slot.
+    """
+    pass
+
+
+def close_at_exit(containment):
+    """
+    Closes the containment when the runner exits, also if it is terminated by SIGTERM,
+    which is then turned into SystemExit such that the runner cleans up as on Ctrl-C.
+    Must be called by the main thread to handle SIGTERM.
+    :return: None
+    """
+    atexit.register(containment.close)
+    if threading.current_thread() is threading.main_thread() and \
+            signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, _exit_on_signal)
+
+
+def _exit_on_signal(signum, frame):
+    raise SystemExit(128 + signum)
+
+
+def _kill(processes):
+    for process in processes:
+        try:
+            process.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+
+
+class _ActiveJobs:
+    """
+    The jobs of a containment that have not been cleaned up yet, such that they can be
+    killed when the containment is closed. Thread-safe, since job slots start jobs concurrently.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.jobs = set()
+        self.closed = False
+
+    def add(self, job):
+        with self.lock:
+            if self.closed:
+                raise JobAborted("The containment is closed")
+            self.jobs.add(job)
+        return job
+
+    def remove(self, job):
+        with self.lock:
+            self.jobs.discard(job)
+
+    def abort(self):
+        """
+        Kills all active jobs and waits for the job slots to clean them up.
+        :return: the jobs that were not cleaned up in time
+        """
+        with self.lock:
+            self.closed = True
+            jobs = list(self.jobs)
+        for job in jobs:
+            job.abort()
+        deadline = time.perf_counter() + KILL_GRACE_PERIOD
+        while time.perf_counter() < deadline:
+            with self.lock:
+                if not self.jobs:
+                    return []
+            time.sleep(0.01)
+        with self.lock:
+            return list(self.jobs)
+
+
+class ProcessGroupContainment:
+    """
+    Runs each job in a new session and thus in its own process group.
+
+    Memory limits are enforced by the runner, based on the sampled RSS of the process tree.
+    """
+
+    name = "process group"
+
+    def __init__(self):
+        self.active_jobs = _ActiveJobs()
+
+    def new_job(self, memory_limit):
+        """
+        :param memory_limit: maximum memory of the job's process tree in bytes, or None
+        """
+        return self.active_jobs.add(ProcessGroupJob(memory_limit, self.active_jobs))
+
+    def close(self):
+        """
+        Kills the jobs that are still running. Can be called repeatedly.
+        :return: None
+        """
+        if not self.active_jobs.closed:
+            for job in self.active_jobs.abort():
+                job.cleanup([])
+
+
+class ProcessGroupJob:
+    def __init__(self, memory_limit, active_jobs):
+        self.memory_limit = memory_limit
+        self.active_jobs = active_jobs
+        self.pgid = None
+        # Whether the job was killed because its containment was closed
+        self.aborted = False
+
+    def command(self, command):
+        return command
+
+    def popen_kwargs(self):
+        return {'start_new_session': True}
+
+    def started(self, process):
+        """
+        :return: None, since the job is contained from the start
+        """
+        self.pgid = process.pid
+        return None
+
+    def memory_exceeded(self, tracker):
+        return bool(self.memory_limit) and tracker.tree_rss > self.memory_limit
+
+    def kill(self, tracker):
+        """
+        Kills the whole process group at once, plus descendants that left it.
+        :return: None
+        """
+        try:
+            os.killpg(self.pgid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass
+        _kill(tracker.surviving_descendants())
+
+    def abort(self):
+        """
+        Kills all processes of the job, independently of the thread running it.
+        :return: None
+        """
+        self.aborted = True
+        if self.pgid is not None:
+            try:
+                os.killpg(self.pgid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+
+    def oom_killed(self):
+        return False
+
+    def cleanup(self, survivors):
+        """
+        Kills the processes of the job that outlived it.
+        :param survivors: descendants of the job's root process that are still running
+        :return: the number of processes that had to be killed
+        """
+        self.active_jobs.remove(self)
+        if self.pgid is None:
+            return 0
+        members = set(survivors)
+        try:
+            os.killpg(self.pgid, 0)
+            members.update(p for p in psutil.process_iter() if ProcessGroupJob._pgid(p) == self.pgid)
+        except (ProcessLookupError, PermissionError):
+            pass
+        if members:
+            try:
+                os.killpg(self.pgid, signal.SIGKILL)
+            except (ProcessLookupError, PermissionError):
+                pass
+            _kill(members)
+        return len(members)
+
+    @staticmethod
+    def _pgid(process):
+        try:
+            return os.getpgid(process.pid)
+        except OSError:
+            return None
+
+
+class CgroupContainment:
+    """
+    Runs each job in its own cgroup v2 leaf below a cgroup created for this runner.
+
+    Memory limits are enforced by the kernel if the memory controller can be enabled
+    for the job cgroups; otherwise they are enforced like for process groups. Without
+    memory limits, the memory controller is left alone.
+    """
+
+    name = "cgroup"
+
+    def __init__(self, root, memory_limits=False):
+        """
+        :param memory_limits: whether any job has a memory limit
+        """
+        self.root = root
+        self.parent = os.path.join(root, "viper-runner-{}".format(os.getpid()))
+        self.runner_cgroup = None
+        os.mkdir(self.parent)
+        self.counter = itertools.count()
+        self.memory_supported = memory_limits and self._enable_memory_controller()
+        self.active_jobs = _ActiveJobs()
+
+    @staticmethod
+    def mount_point():
+        """
+        :return: the mount point of the cgroup v2 hierarchy, or None
+        """
+        try:
+            with open("/proc/self/mounts") as fh:
+                for line in fh:
+                    fields = line.split()
+                    if len(fields) > 2 and fields[2] == "cgroup2":
+                        return fields[1]
+        except OSError:
+            pass
+        return None
+
+    @staticmethod
+    def own_cgroup():
+        """
+        :return: the folder of the runner's own cgroup v2, or None
+        """
+        mount_point = CgroupContainment.mount_point()
+        if not mount_point:
+            return None
+        try:
+            with open("/proc/self/cgroup") as fh:
+                for line in fh:
+                    if line.startswith("0::"):
+                        return os.path.join(mount_point, line[3:].strip().lstrip("/"))
+        except OSError:
+            pass
+        return None
+
+    def _enable_memory_controller(self):
+        """
+        Enables the memory controller for the job cgroups. If necessary, and if the
+        runner is the only process in the root cgroup, the runner moves itself into a
+        leaf, since cgroups with enabled controllers must not contain processes.
+        :return: True if memory limits can be set for job cgroups
+        """
+        try:
+            if "memory" not in CgroupContainment._read(self.root, "cgroup.controllers").split():
+                return False
+            if "memory" not in CgroupContainment._read(self.root, "cgroup.subtree_control").split():
+                processes = CgroupContainment._read(self.root, "cgroup.procs").split()
+                if processes != [str(os.getpid())]:
+                    return False
+                self.runner_cgroup = os.path.join(self.parent, "runner")
+                os.mkdir(self.runner_cgroup)
+                CgroupContainment._write(self.runner_cgroup, "cgroup.procs", str(os.getpid()))
+                CgroupContainment._write(self.root, "cgroup.subtree_control", "+memory")
+            CgroupContainment._write(self.parent, "cgroup.subtree_control", "+memory")
+            return True
+        except OSError:
+            return False
+
+    def new_job(self, memory_limit):
+        """
+        :param memory_limit: maximum memory of the job's process tree in bytes, or None
+        """
+        if self.active_jobs.closed:
+            raise JobAborted("The containment is closed")
+        return self.active_jobs.add(CgroupJob(os.path.join(self.parent, "job-{}".format(next(self.counter))),
+                                              memory_limit, self.memory_supported, self.active_jobs))
+
+    def close(self):
+        """
+        Kills the jobs that are still running and removes the cgroups. Can be called repeatedly.
+        :return: None
+        """
+        if self.active_jobs.closed:
+            return
+        for job in self.active_jobs.abort():
+            job.cleanup([])
+        try:
+            if self.runner_cgroup:
+                CgroupContainment._write(self.root, "cgroup.subtree_control", "-memory")
+                CgroupContainment._write(self.root, "cgroup.procs", str(os.getpid()))
+                os.rmdir(self.runner_cgroup)
+            os.rmdir(self.parent)
+        except OSError as err:
+            print("Unable to remove cgroup '{}': {}".format(self.parent, err))
+
+    @staticmethod
+    def _read(cgroup, filename):
+        with open(os.path.join(cgroup, filename)) as fh:
+            return fh.read()
+
+    @staticmethod
+    def _write(cgroup, filename, value):
+        with open(os.path.join(cgroup, filename), "w") as fh:
+            fh.write(value)
+
+
+class CgroupJob:
+    def __init__(self, path, memory_limit, memory_supported, active_jobs):
+        self.path = path
+        self.memory_limit = memory_limit
+        self.memory_supported = memory_supported
+        self.active_jobs = active_jobs
+        # Whether the job was killed because its containment was closed
+        self.aborted = False
+        os.mkdir(path)
+        if memory_limit and memory_supported:
+            CgroupContainment._write(path, "memory.max", str(int(memory_limit)))
+            if os.path.exists(os.path.join(path, "memory.swap.max")):
+                CgroupContainment._write(path, "memory.swap.max", "0")
+
+    def command(self, command):
+        return ["/bin/sh", "-c", CGROUP_EXEC_SNIPPET, os.path.join(self.path, "cgroup.procs")] + list(command)
+
+    def popen_kwargs(self):
+        return {'start_new_session': True}
+
+    def started(self, process):
+        """
+        Waits until the wrapper moved the job into its cgroup, such that the measured runtime
+        starts there and does not include the start-up of the wrapper's shell.
+        :return: the time (see time.perf_counter) at which the job was found in its cgroup, or
+                 None if it exited before or the cgroup does not report whether it is populated
+        """
+        deadline = time.perf_counter() + WRAPPER_START_LIMIT
+        try:
+            with open(os.path.join(self.path, "cgroup.events")) as fh:
+                poller = select.poll()
+                # The file is modified, which is signalled as POLLPRI, when the cgroup gets populated
+                poller.register(fh, select.POLLPRI)
+                while time.perf_counter() < deadline:
+                    fh.seek(0)
+                    if "populated 1" in fh.read().splitlines():
+                        return time.perf_counter()
+                    # Check without reaping whether the wrapper exited, e.g. because it failed
+                    if os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None:
+                        return None
+                    poller.poll(WRAPPER_EXIT_CHECK_INTERVAL * 1000)
+        except OSError:
+            pass
+        return None
+
+    def memory_exceeded(self, tracker):
+        # The kernel enforces the limit if the memory controller is available
+        return bool(self.memory_limit) and not self.memory_supported and tracker.tree_rss > self.memory_limit
+
+    def kill(self, tracker):
+        """
+        Kills all processes in the cgroup at once where supported (cgroup.kill, Linux 5.14),
+        otherwise one by one until the cgroup is empty.
+        :return: None
+        """
+        self._kill_members()
+        _kill(tracker.surviving_descendants())
+
+    def abort(self):
+        """
+        Kills all processes of the job, independently of the thread running it.
+        :return: None
+        """
+        self.aborted = True
+        try:
+            self._kill_members()
+        except OSError:
+            # The job was cleaned up in the meantime
+            pass
+
+    def _kill_members(self):
+        if os.path.exists(os.path.join(self.path, "cgroup.kill")):
+            CgroupContainment._write(self.path, "cgroup.kill", "1")
+        else:
+            deadline = time.perf_counter() + KILL_GRACE_PERIOD
+            while self._pids() and time.perf_counter() < deadline:
+                for pid in self._pids():
+                    try:
+                        os.kill(pid, signal.SIGKILL)
+                    except ProcessLookupError:
+                        pass
+
+    def oom_killed(self):
+        if not self.memory_supported:
+            return False
+        try:
+            for line in CgroupContainment._read(self.path, "memory.events").splitlines():
+                key, value = line.split()
+                if key == "oom_kill" and int(value) > 0:
+                    return True
+        except (OSError, ValueError):
+            pass
+        return False
+
+    def cleanup(self, survivors):
+        """
+        Kills the processes of the job that outlived it and removes the job's cgroup.
+        :param survivors: descendants of the job's root process that are still running
+        :return: the number of processes that had to be killed
+        """
+        members = set(self._pids()) | set(process.pid for process in survivors)
+        if members:
+            for pid in self._pids():
+                try:
+                    os.kill(pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            _kill(survivors)
+
+        deadline = time.perf_counter() + KILL_GRACE_PERIOD
+        while True:
+            try:
+                os.rmdir(self.path)
+                break
+            except OSError as err:
+                if time.perf_counter() > deadline:
+                    print("Unable to remove cgroup '{}': {}".format(self.path, err))
+                    break
+                time.sleep(0.01)
+        self.active_jobs.remove(self)
+        return len(members)
+
+    def _pids(self):
+        try:
+            return [int(pid) for pid in CgroupContainment._read(self.path, "cgroup.procs").split()]
+        except OSError:
+            return []
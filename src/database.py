@@ -0,0 +1,142 @@
+import os
+import sqlite3
+from src.result import USAGE_ATTRIBUTES
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id INTEGER PRIMARY KEY,
+    results_path TEXT NOT NULL UNIQUE,
+    date TEXT NOT NULL,
+    host TEXT,
+    config_file TEXT,
+    config_text TEXT
+);
+CREATE TABLE IF NOT EXISTS runs (
+    campaign_id INTEGER NOT NULL REFERENCES campaigns(id) ON DELETE CASCADE,
+    input_file TEXT NOT NULL,
+    config_name TEXT NOT NULL,
+    repetition INTEGER,
+    time_elapsed REAL,
+    return_code INTEGER,
+    timeout_occurred INTEGER,
+    out_of_memory INTEGER,
+    cached INTEGER,
+    leftover_processes INTEGER,
+    user_time REAL,
+    system_time REAL,
+    peak_rss INTEGER,
+    voluntary_context_switches INTEGER,
+    involuntary_context_switches INTEGER,
+    average_parallelism REAL,
+    max_threads INTEGER,
+    max_children INTEGER
+);
+CREATE INDEX IF NOT EXISTS runs_by_file_and_config ON runs (input_file, config_name, campaign_id);
+CREATE INDEX IF NOT EXISTS runs_by_campaign ON runs (campaign_id);
+CREATE INDEX IF NOT EXISTS campaigns_by_date ON campaigns (date);
+"""
+
+RUN_COLUMNS = ['input_file', 'config_name', 'repetition', 'time_elapsed', 'return_code', 'timeout_occurred',
+               'out_of_memory', 'cached', 'leftover_processes'] + USAGE_ATTRIBUTES
+
+
+class ResultDatabase:
+    """
+    SQLite database of the results of many benchmarks (campaigns), e.g. of nightly runs.
+
+    Each campaign is identified by its results folder; storing a campaign again, e.g.
+    after resuming it, replaces its earlier results but keeps its original date.
+    """
+
+    def __init__(self, filename):
+        directory = os.path.dirname(filename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.connection = sqlite3.connect(filename)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def store_campaign(self, results_path, date, host, config_file, config_text, results):
+        """
+        Stores a campaign and all its single run results in one transaction.
+        :param results: iterable of SingleRunResult
+        :return: the id of the campaign
+        """
+        results_path = os.path.abspath(results_path)
+        with self.connection:
+            previous = self.connection.execute("SELECT date FROM campaigns WHERE results_path = ?",
+                                               (results_path,)).fetchone()
+            if previous:
+                date = previous[0]
+            self.connection.execute("DELETE FROM campaigns WHERE results_path = ?", (results_path,))
+            cursor = self.connection.execute(
+                "INSERT INTO campaigns (results_path, date, host, config_file, config_text) VALUES (?, ?, ?, ?, ?)",
+                (results_path, date, host, config_file, config_text))
+            campaign_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO runs (campaign_id, {}) VALUES (?, {})".format(", ".join(RUN_COLUMNS),
+                                                                        ", ".join("?" * len(RUN_COLUMNS))),
+                ([campaign_id] + [ResultDatabase._value(getattr(result, column)) for column in RUN_COLUMNS]
+                 for result in results))
+        return campaign_id
+
+    @staticmethod
+    def _value(value):
+        if isinstance(value, bool):
+            return int(value)
+        return value
+
+    def campaigns(self):
+        """
+        :return: list of (id, results path, date, host, number of runs) tuples, oldest first
+        """
+        return self.connection.execute(
+            "SELECT c.id, c.results_path, c.date, c.host, COUNT(r.campaign_id) FROM campaigns c "
+            "LEFT JOIN runs r ON r.campaign_id = c.id GROUP BY c.id ORDER BY c.date").fetchall()
+
+    def config_text(self, campaign_id):
+        row = self.connection.execute("SELECT config_text FROM campaigns WHERE id = ?", (campaign_id,)).fetchone()
+        return row[0] if row else None
+
+    def time_series(self, input_file=None, config_name=None, last=None, runs=False):
+        """
+        Queries the runtimes of the matching runs, per campaign.
+        :param input_file: SQL LIKE pattern of the input files, or None for all files
+        :param config_name: name of the run configuration, or None for all run configurations
+        :param last: only the last campaigns, or None for all campaigns
+        :param runs: if True, one row per run, otherwise aggregated per campaign, file and run configuration
+        :return: pair (column names, list of rows), in chronological order
+        """
+        conditions = []
+        parameters = []
+        if input_file is not None:
+            conditions.append("r.input_file LIKE ?")
+            parameters.append(input_file)
+        if config_name is not None:
+            conditions.append("r.config_name = ?")
+            parameters.append(config_name)
+        if last is not None:
+            conditions.append("c.id IN (SELECT id FROM campaigns ORDER BY date DESC LIMIT ?)")
+            parameters.append(last)
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+        if runs:
+            columns = ["date", "input_file", "config_name", "repetition", "time_elapsed", "return_code",
+                       "timeout_occurred", "out_of_memory", "cached"]
+            query = ("SELECT c.date, r.input_file, r.config_name, r.repetition, r.time_elapsed, r.return_code, "
+                     "r.timeout_occurred, r.out_of_memory, r.cached FROM runs r JOIN campaigns c "
+                     "ON r.campaign_id = c.id {} ORDER BY c.date, r.input_file, r.config_name, r.repetition")
+        else:
+            columns = ["date", "input_file", "config_name", "runs", "valid_runs", "timeouts",
+                       "average_runtime", "min_runtime", "max_runtime"]
+            valid = "COALESCE(r.timeout_occurred, 0) = 0 AND COALESCE(r.out_of_memory, 0) = 0"
+            query = ("SELECT c.date, r.input_file, r.config_name, COUNT(*), "
+                     "SUM(CASE WHEN {valid} THEN 1 ELSE 0 END), SUM(r.timeout_occurred), "
+                     "AVG(CASE WHEN {valid} THEN r.time_elapsed END), MIN(CASE WHEN {valid} THEN r.time_elapsed END), "
+                     "MAX(CASE WHEN {valid} THEN r.time_elapsed END) FROM runs r JOIN campaigns c "
+                     "ON r.campaign_id = c.id {{}} GROUP BY c.id, r.input_file, r.config_name "
+                     "ORDER BY c.date, r.input_file, r.config_name").format(valid=valid)
+        return columns, self.connection.execute(query.format(where), parameters).fetchall()
+
+    def close(self):
+        self.connection.close()
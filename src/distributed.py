@@ -0,0 +1,227 @@
+import collections
+import json
+import socket
+import threading
+import time
+import queue
+from src.result import SingleRunResult
+
+"""
+Distributed execution of a benchmark: a coordinator serves the rounds of the benchmark
+to workers, which run them and send the results back. Workers are runner processes on
+the same or other hosts, connected over plain TCP; each job slot of a worker has its own
+connection and pulls the next round when it is idle.
+
+Messages are JSON objects, one per line:
+  worker:      {"type": "hello", "run_configurations": [...], "repetitions": n}
+  coordinator: {"type": "welcome"} or {"type": "error", "message": ...}
+  worker:      {"type": "request"}
+  coordinator: {"type": "round", "id": ..., "round": {...}, "total_jobs": ..., "remaining_jobs": ...},
+               where "round" is a RoundPlan (see src.plan) as dictionary
+               or {"type": "done"} once all rounds are completed
+  worker:      {"type": "results", "id": ..., "results": [...]}, followed by the next request
+"""
+
+# Time in seconds a worker keeps trying to connect to the coordinator
+CONNECT_TIMEOUT = 60.0
+
+
+def parse_address(address, default_host=""):
+    """
+    :param address: string of the form "host:port" or "port"
+    :return: pair (host, port)
+    """
+    host, _, port = address.rpartition(":")
+    return host or default_host, int(port)
+
+
+class Connection:
+    def __init__(self, sock):
+        self.socket = sock
+        self.reader = sock.makefile("r", encoding="utf-8")
+        self.writer = sock.makefile("w", encoding="utf-8")
+
+    def send(self, message):
+        self.writer.write(json.dumps(message) + "\n")
+        self.writer.flush()
+
+    def receive(self):
+        """
+        :return: the next message, or None if the connection was closed
+        """
+        line = self.reader.readline()
+        if not line:
+            return None
+        return json.loads(line)
+
+    def close(self):
+        for resource in [self.reader, self.writer, self.socket]:
+            try:
+                resource.close()
+            except OSError:
+                pass
+
+
+class Coordinator:
+    """
+    Serves rounds to workers in the order of the schedule. Rounds of workers that
+    disconnect before sending their results are served again.
+    """
+
+    def __init__(self, address, rounds, total_jobs, remaining_jobs, config_names, repetitions):
+        """
+        :param address: pair (host, port) to listen on
+        """
+        self.address = address
+        self.rounds = rounds
+        self.total_jobs = total_jobs
+        self.remaining_jobs = remaining_jobs
+        self.config_names = config_names
+        self.repetitions = repetitions
+        self.pending = collections.deque(range(len(rounds)))
+        self.completed = queue.Queue()
+        self.done = False
+        self.condition = threading.Condition()
+
+    def run(self):
+        """
+        Listens for workers until all rounds are completed.
+        :return: generator of the results of the rounds, in the order in which they are completed
+        """
+        server = socket.create_server(self.address)
+        print("Waiting for workers on port {}".format(server.getsockname()[1]))
+        threading.Thread(target=self._accept, args=(server,), daemon=True).start()
+        try:
+            for _ in range(len(self.rounds)):
+                yield self.completed.get()
+        finally:
+            with self.condition:
+                self.done = True
+                self.condition.notify_all()
+            server.close()
+
+    def _accept(self, server):
+        while True:
+            try:
+                sock, peer = server.accept()
+            except OSError:
+                # The server socket was closed
+                return
+            threading.Thread(target=self._serve, args=(Connection(sock), peer), daemon=True).start()
+
+    def _serve(self, connection, peer):
+        current = None
+        try:
+            hello = connection.receive()
+            if hello is None:
+                return
+            if hello.get('run_configurations') != self.config_names or hello.get('repetitions') != self.repetitions:
+                connection.send({'type': 'error',
+                                 'message': "Run configurations or repetitions differ from the coordinator's"})
+                return
+            connection.send({'type': 'welcome'})
+            print("Worker {}:{} connected".format(*peer[:2]))
+
+            while True:
+                message = connection.receive()
+                if message is None:
+                    return
+                if message['type'] == 'results':
+                    self.completed.put([SingleRunResult.from_dict(data) for data in message['results']])
+                    current = None
+                    continue
+                current = self._next_round()
+                if current is None:
+                    connection.send({'type': 'done'})
+                    return
+                rnd = self.rounds[current]
+                connection.send({'type': 'round', 'id': current, 'round': rnd.to_dict(),
+                                 'total_jobs': self.total_jobs, 'remaining_jobs': self.remaining_jobs})
+        except (OSError, ValueError) as err:
+            print("Connection to worker {}:{} failed: {}".format(peer[0], peer[1], err))
+        finally:
+            connection.close()
+            if current is not None:
+                print("Worker {}:{} disconnected, serving its round again".format(*peer[:2]))
+                with self.condition:
+                    self.pending.appendleft(current)
+                    self.condition.notify()
+
+    def _next_round(self):
+        """
+        Waits for a round to serve; rounds of failed workers may become available again.
+        :return: index of the round, or None once all rounds are completed
+        """
+        with self.condition:
+            while not self.pending and not self.done:
+                self.condition.wait()
+            if self.done:
+                return None
+            return self.pending.popleft()
+
+
+class Worker:
+    """
+    Runs rounds received from a coordinator, one connection per job slot.
+    """
+
+    def __init__(self, address, config_names, repetitions):
+        """
+        :param address: pair (host, port) of the coordinator
+        """
+        self.address = address
+        self.config_names = config_names
+        self.repetitions = repetitions
+
+    def run(self, scheduler, execute):
+        """
+        :param scheduler: Scheduler whose job slots (and CPU pinning) are used
+        :param execute: function taking a round message and a slot index and returning the results of the round
+        :return: None
+        """
+        errors = []
+        threads = [threading.Thread(target=self._run_slot, args=(scheduler, slot, execute, errors))
+                   for slot in range(scheduler.jobs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def _run_slot(self, scheduler, slot, execute, errors):
+        try:
+            scheduler.pin_current_thread(slot)
+            connection = self._connect()
+            try:
+                connection.send({'type': 'hello', 'run_configurations': self.config_names,
+                                 'repetitions': self.repetitions})
+                reply = connection.receive()
+                if reply is None or reply['type'] == 'error':
+                    raise ConnectionError("Coordinator refused the worker: {}".format(
+                        reply['message'] if reply else "connection closed"))
+                connection.send({'type': 'request'})
+                while True:
+                    message = connection.receive()
+                    if message is None:
+                        raise ConnectionError("Connection to the coordinator was closed")
+                    if message['type'] == 'done':
+                        return
+                    results = execute(message, slot)
+                    connection.send({'type': 'results', 'id': message['id'],
+                                     'results': [result.to_dict() for result in results]})
+                    connection.send({'type': 'request'})
+            finally:
+                connection.close()
+        except Exception as err:
+            errors.append(err)
+
+    def _connect(self):
+        deadline = time.perf_counter() + CONNECT_TIMEOUT
+        while True:
+            try:
+                return Connection(socket.create_connection(self.address))
+            except OSError:
+                if time.perf_counter() > deadline:
+                    raise
+                time.sleep(0.5)
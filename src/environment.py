@@ -1,12 +1,33 @@
+import math
 import sys
 import time
 import os
+import random
+import shutil
+import subprocess
+from statistics import median
 from src.process_runner import ProcessRunner
 from src.config import Config
 from src.result import RunResult, SingleRunResult
+from src.journal import ResultJournal
+from src.cache import ResultCache
+from src.adaptive import AdaptiveRepetitions
+from src.batch import BatchRunner
+from src.history import RuntimeHistory
+from src.filewriter import FileWriter
+from src.server_pool import ServerPool
+from src.containment import close_at_exit, create_containment
+from src.exit_waiter import install_child_handler
+from src.metrics import ProgressMetrics
+from src.distributed import Coordinator, Worker
+from src.output_archive import OutputArchive
+from src.resource_usage import TimelineArchive
+from src.plan import ExecutionPlan, RoundPlan
 from src.result_processor import ResultProcessor
+from src.sampling import StratifiedSampler
+from src.scheduler import Round, RoundCommandLock, Scheduler
 from src.getch import getch
-from src.util import abort
+from src.util import abort, replace_placeholders
 
 class Environment:
     """
@@ -19,31 +40,190 @@ class Environment:
         self.config = Config()
         self.files = []
         self.file_writer = None
-        self.results = RunResult()
+        self.results = None
+        self.cache = None
+        self.adaptive = None
+        self.server_pool = None
+        self.round_command_lock = RoundCommandLock()
+        self.containment = None
+        self.output_archive = None
+        self.timelines = None
+        self.metrics = None
         self.analyzer = None
         self.start_time = 0.0
         self.end_time = 0.0
         self.total_jobs = 0
+        self.remaining_jobs = 0
+        self.resume = False
+        self.completed_jobs = {}
+        self.plan = None
+        self.rounds = []
+        self.overhead = None
         self.process_stdout_fh = None
         self.process_stderr_fh = None
 
-    def exec(self, config_file_name):
-        self._init_env(config_file_name)
-        self._collect_test_files()
+    def exec(self, config_file_name, overrides=None, resume=False, coordinator=None, plan=None, dry_run=False):
+        """
+        Runs the benchmark.
+        :param config_file_name: the configuration file, or the file of 'plan'
+        :param overrides: configuration properties overriding those from the configuration file
+        :param resume: if true, jobs already recorded in the journal of the results folder are not run again
+        :param coordinator: pair (host, port) to serve the rounds to workers on, instead of running them locally
+        :param plan: ExecutionPlan to execute, instead of expanding the configuration file
+        :param dry_run: if true, only the execution plan is saved to 'results.plan'
+        :return: None
+        """
+        self.resume = resume
+        self._init_env(config_file_name, overrides, plan)
+        if plan is None:
+            self._collect_test_files()
+        else:
+            self.files = list(plan.files)
         self.total_jobs = len(self.files) * len(self.config.get('run_configurations')) * self.config.get('repetitions')
+        if self.resume:
+            self.completed_jobs = self.results.completed_jobs()
+        if plan is None:
+            self.plan = self._compile_plan(self._order_rounds(self._expand_rounds()))
+            self.rounds = self.plan.rounds
+        else:
+            self.plan = plan
+            self.rounds = plan.remaining_rounds(self.completed_jobs, self.adaptive) if self.resume else plan.rounds
+        self.remaining_jobs = sum(len(rnd.jobs) * rnd.results_per_job for rnd in self.rounds)
+        if dry_run:
+            self._save_plan()
+            return
         self.start_time = time.perf_counter()
         self._print_start_info()
+        if not self.resume:
+            # Only once the start is confirmed; when resuming, the plan of the interrupted benchmark is kept
+            self._save_plan()
         self._check_files_accessible()
         self._open_process_output_files()
-        self._run_processes()
+        self._write_schedule()
+        # A coordinator runs no jobs, hence neither contains nor calibrates them
+        self._start_services(contain=coordinator is None)
+        self._start_metrics()
+        try:
+            if coordinator is not None:
+                self._serve_rounds(coordinator)
+            else:
+                self._calibrate()
+                self._run_processes()
+        finally:
+            self._stop_services()
+        self.results.journal.close()
         self._close_process_output_files()
         self.end_time = time.perf_counter()
 
-    def _init_env(self, config_file):
-        self.config.read_config_file(config_file)
+    def work(self, config_file_name, coordinator, overrides=None, plan=None, worker_index=0):
+        """
+        Runs rounds received from a coordinator, see exec, and sends their results back.
+        :param coordinator: pair (host, port) of the coordinator
+        :param plan: ExecutionPlan whose configuration is used, instead of the configuration file
+        :param worker_index: index of the worker among those on this machine, whose servers
+                             listen on ports after those of the workers before it
+        :return: None
+        """
+        # The coordinator records the results, the worker only writes the archives of the runs' output, if any
+        self._init_env(config_file_name, overrides, plan, create_copy=False)
+        self._open_process_output_files()
+        self._start_services(worker_index * self.config.get_int('jobs'))
+        try:
+            worker = Worker(coordinator, [c.get('name') for c in self.config.get('run_configurations')],
+                            self.config.get_int('repetitions'))
+            scheduler = Scheduler(self.config.get_int('jobs'), self.config.get_bool('pin_cpus'))
+            worker.run(scheduler, self._run_received_round)
+        finally:
+            self._stop_services()
+        self._close_process_output_files()
+
+    def _run_received_round(self, message, slot):
+        """
+        Runs a round received from the coordinator.
+        :param message: the round, see Coordinator
+        :return: list of single run results
+        """
+        rnd = RoundPlan.from_dict(message['round'])
+        self.total_jobs = message['total_jobs']
+        self.remaining_jobs = message['remaining_jobs']
+        return self._run_round(rnd, slot)
+
+    def _start_services(self, port_offset=0, contain=True):
+        """
+        Creates the verifier server pool and the containment of the jobs.
+        :param port_offset: offset of the servers' ports from 'server_base_port'
+        :param contain: if false, no containment is created
+        :return: None
+        """
+        self.server_pool = ServerPool(self.config.get_int('server_base_port') + port_offset,
+                                      self.process_stdout_fh, self.process_stderr_fh)
+        install_child_handler()
+        if not contain:
+            return
+        memory_limits = [self.config.get('memory_limit', None)] + \
+                        [run_config.get('memory_limit', None) for run_config in self.config.get('run_configurations')]
+        self.containment = create_containment(self.config.get_string('containment'),
+                                              self.config.get_string('cgroup_root', None), any(memory_limits))
+        if self.containment is not None:
+            print("Running each job in its own {}".format(self.containment.name))
+            close_at_exit(self.containment)
+
+    def _stop_services(self):
+        self.server_pool.shutdown()
+        if self.containment is not None:
+            self.containment.close()
+        if self.output_archive is not None:
+            self.output_archive.close()
+        if self.timelines is not None:
+            self.timelines.close()
+        if self.metrics is not None:
+            self.metrics.close()
+
+    def _start_metrics(self):
+        """
+        Starts reporting progress metrics, if 'metrics' is set.
+        :return: None
+        """
+        if not self.config.get('metrics', None):
+            return
+        remaining = {run_config.get('name'): 0 for run_config in self.config.get('run_configurations')}
+        for rnd in self.rounds:
+            remaining[rnd.config_name] += len(rnd.jobs) * rnd.results_per_job
+        textfile = self.config.get_string('metrics.textfile', None)
+        self.metrics = ProgressMetrics(self.config.get_string('results.path'), self.total_jobs, remaining,
+                                       self.config.get_int('jobs'), textfile)
+        if textfile:
+            print("Writing progress metrics to '{}'".format(textfile))
+        if self.config.get_int('metrics.http_port', 0):
+            self.metrics.serve(self.config.get_string('metrics.http_host'), self.config.get_int('metrics.http_port'))
+
+    def _init_env(self, config_file, overrides, plan=None, create_copy=True):
+        if plan is None:
+            self.config.read_config_file(config_file, overrides, create_copy)
+        else:
+            self.config.read_plan_config(config_file, plan.config, overrides, plan.config_file, create_copy)
+        journal_file = os.path.join(self.config.get('results.path'), self.config.get('results.journal'))
+        self.results = RunResult(ResultJournal(journal_file))
+        self._init_cache()
+        if self.config.get('adaptive_repetitions', None):
+            self.adaptive = AdaptiveRepetitions(
+                minimum=self.config.get_int('adaptive_repetitions.min'),
+                maximum=self.config.get_int('adaptive_repetitions.max'),
+                target_ci_width=self.config.get_float('adaptive_repetitions.target_ci_width'),
+                confidence=self.config.get_float('adaptive_repetitions.confidence'))
+
+    def _init_cache(self):
+        if not self.config.get('cache.path', None):
+            return
+        self.cache = ResultCache(os.path.expanduser(self.config.get_string('cache.path')),
+                                 max_size=self.config.get_float('cache.max_size', 0) * 1024 * 1024,
+                                 max_age=self.config.get_float('cache.max_age', 0) * 24 * 60 * 60)
+        removed = self.cache.evict()
+        print("Using result cache in '{}', evicted {} entries".format(self.cache.path, removed))
 
     def analyze(self):
-        self.analyzer = ResultProcessor(self.results, self.config)
+        # Concurrent jobs are journaled as they finish, but listed in the order of the plan
+        self.analyzer = ResultProcessor(self.results, self.config, self.plan.job_order())
         self.analyzer.write_result_files()
 
     def _print_start_info(self):
@@ -52,14 +232,24 @@ class Environment:
         print("  configurations = {}".format(len(self.config.get('run_configurations'))))
         print("  repetitions = {}".format(self.config.get('repetitions')))
         print("  files = {}".format(len(self.files)))
-        print("  jobs = {}".format(self.total_jobs))
+        if self.adaptive:
+            print("  jobs = at most {} (adaptive repetitions)".format(self.total_jobs))
+        else:
+            print("  jobs = {}".format(self.total_jobs))
+        if self.resume:
+            print("  jobs already completed = {}".format(self.total_jobs - self.remaining_jobs))
+            print("  jobs remaining = {}".format(self.remaining_jobs))
+        print("  concurrent job slots = {}".format(self.config.get('jobs')))
         self._confirm_or_quit()
         self._print_file_list()
+        self._print_schedule()
         
     def print_end_info(self):
         formattedElapsed = time.strftime("%Hh:%Mm:%Ss", time.gmtime(self.end_time - self.start_time))
         print("Collected " + str(self.results.n_measurements) + " data points")
         print("Elapsed time " + formattedElapsed)
+        if self.overhead is not None:
+            print("Harness overhead per run (null command) {:.2f} ms".format(self.overhead * 1000))
 
     def _collect_test_files(self):
         """
@@ -85,6 +275,80 @@ class Environment:
         else:
           raise Exception("Neither 'test_folder' nor 'test_files_in_file' are set.")
 
+        if self.config.get('sample', None):
+            self._select_sample()
+        if self.config.get('shard', None):
+            self._select_shard()
+
+    def _select_sample(self):
+        """
+        Restricts the files to a stratified random subset, see StratifiedSampler. The subset
+        is saved to 'results.sample', and for each pair of run configurations with known
+        runtimes, it is reported how well the subset tracks the runtime ratio on all files.
+        :return: None
+        """
+        config_names = [run_config.get('name') for run_config in self.config.get('run_configurations')]
+        history = None
+        weights = None
+        if self.config.get_list('sample.history', []):
+            history = RuntimeHistory(self.config.get('timeout'))
+            history.load(self.config.get_list('sample.history'))
+            weights = {file: sum(history.estimate(file, name) for name in config_names) for file in self.files}
+
+        base_dir = self.config.get('test_folder', None) or os.path.commonpath(self.files or [os.curdir])
+        sampler = StratifiedSampler(self.files, base_dir, weights, self.config.get_int('sample.runtime_buckets'),
+                                    self.config.get_int('sample.directory_depth'))
+        size = self.config.get_int('sample.size', 0) or \
+            max(1, round(self.config.get_float('sample.fraction') * len(sampler.files)))
+        seed = self.config.get_int('sample.seed')
+        selected = sampler.draw(size, random.Random(seed))
+        n_files = len(self.files)
+        self.files = [file for file in self.files if file in selected]
+        print("Running a sample of {} of {} files from {} strata (seed {})"
+              .format(len(self.files), n_files, len(sampler.strata), seed))
+
+        if history is not None:
+            full_time = sum(weights.values())
+            print("  estimated runtime: {:.1f} s of {:.1f} s".format(sum(weights[f] for f in selected), full_time))
+            for i, name_a in enumerate(config_names):
+                for name_b in config_names[i + 1:]:
+                    log_ratios = {file: math.log(history.estimate(file, name_b) / history.estimate(file, name_a))
+                                  for file in sampler.files
+                                  if history.knows(file, name_a) and history.knows(file, name_b)
+                                  and history.estimate(file, name_a) > 0 and history.estimate(file, name_b) > 0}
+                    tracking = sampler.tracking(selected, size, seed, log_ratios)
+                    if tracking is None:
+                        continue
+                    full, subset, error, (lower, upper) = tracking
+                    print("  runtime ratio {}/{}: {:.3f} on the sample, {:.3f} on all files (error {:+.1%}); "
+                          "95% of samples are within {:+.1%} and {:+.1%}"
+                          .format(name_b, name_a, subset, full, error, lower, upper))
+
+        data = [["input file", "stratum", "runtime bucket", "estimated runtime [s]"]]
+        for file in self.files:
+            directory, bucket = sampler.stratum_of[file]
+            data.append([file, directory, str(bucket), str(weights[file]) if weights else ""])
+        filename = os.path.join(self.config.get('results.path'), self.config.get('results.sample'))
+        with FileWriter(filename) as writer:
+            writer.write_csv_data(data)
+
+    def _select_shard(self):
+        """
+        Restricts the files to those of this shard. If 'schedule.history' is set, the shards
+        are balanced by the estimated runtimes of the files, otherwise by their number.
+        :return: None
+        """
+        index, count = Config.parse_shard(self.config.get_string('shard'))
+        weights = None
+        if self.config.get_list('schedule.history', []):
+            history = RuntimeHistory(self.config.get('timeout'))
+            history.load(self.config.get_list('schedule.history'))
+            config_names = [run_config.get('name') for run_config in self.config.get('run_configurations')]
+            weights = {file: sum(history.estimate(file, name) for name in config_names) for file in self.files}
+        n_files = len(self.files)
+        self.files = Scheduler.shard_files(self.files, index - 1, count, weights)
+        print("Running shard {} of {}: {} of {} files".format(index, count, len(self.files), n_files))
+
     def _print_file_list(self):
         if self.config.get('list_files'):
             print()
@@ -121,6 +385,13 @@ class Environment:
         self.process_stdout_fh = out
         self.process_stderr_fh = err
 
+        if self.config.get('results.output_archive', None):
+            self.output_archive = OutputArchive(
+                os.path.join(self.config.get('results.path'), self.config.get('results.output_archive')))
+        if self.config.get('results.timelines', None):
+            self.timelines = TimelineArchive(
+                os.path.join(self.config.get('results.path'), self.config.get('results.timelines')))
+
     def _close_process_output_files(self):
         if self.process_stdout_fh != sys.stdout:
             self.process_stdout_fh.close()
@@ -133,7 +404,8 @@ class Environment:
             if not os.path.exists(os.path.dirname(filepath)):
                 os.makedirs(os.path.dirname(filepath))
         
-            fh = open(filepath, "w")
+            # Keep the output of the interrupted benchmark when resuming it
+            fh = open(filepath, "a" if self.resume else "w")
         except IOError as err:
             print("Unable to open output file. Aborting.")
             print(err)
@@ -141,43 +413,296 @@ class Environment:
 
         return fh
 
+    def _calibrate(self):
+        """
+        Measures the overhead of the runner itself, i.e. of starting, containing and waiting for
+        a process, by repeatedly running a command that does nothing. The runtimes are saved to
+        'results.calibration', their median is reported at the end.
+        :return: None
+        """
+        runs = self.config.get_int('calibration_runs')
+        if runs <= 0:
+            return
+        null_command = [shutil.which("true")] if shutil.which("true") else [sys.executable, "-c", ""]
+        times = []
+        for _ in range(0, runs):
+            result = ProcessRunner.run(null_command, 0, subprocess.DEVNULL, subprocess.DEVNULL, self.containment)
+            times.append(result.time_elapsed)
+        self.overhead = median(times)
+        print("Harness overhead per run (null command '{}'): median {:.2f} ms, minimum {:.2f} ms"
+              .format(" ".join(null_command), self.overhead * 1000, min(times) * 1000))
+        print()
+
+        filename = os.path.join(self.config.get('results.path'), self.config.get('results.calibration'))
+        previous_rows = self._previous_rows(filename)
+        data = [] if previous_rows else [["repetition", "runtime [s]"]]
+        data.extend([str(i), str(t)] for i, t in enumerate(times, previous_rows))
+        with FileWriter(filename, append=previous_rows > 0) as writer:
+            writer.write_csv_data(data)
+
+    def _previous_rows(self, filename):
+        """
+        :param filename: a CSV file of the results folder
+        :return: number of data rows the interrupted benchmark wrote to the file, which the rows
+                 of the resumed benchmark are appended to; 0 if not resuming
+        """
+        if not self.resume or not os.path.exists(filename):
+            return 0
+        with open(filename) as fh:
+            return max(0, sum(1 for _ in fh) - 1)
+
     def _run_processes(self):
         """
         Runs all the benchmarks.
         :return: None
         """
-        timeout = self.config.get('timeout')
+        scheduler = Scheduler(self.config.get_int('jobs'), self.config.get_bool('pin_cpus'))
+        # Each result is journaled as soon as its run completes, see _run_round
+        for _ in scheduler.run(self.rounds, lambda rnd, slot: self._run_round(rnd, slot, self.results)):
+            pass
+
+    def _serve_rounds(self, address):
+        """
+        Serves all rounds to workers and collects their results.
+        :param address: pair (host, port) to listen on
+        :return: None
+        """
+        coordinator = Coordinator(address, self.rounds, self.total_jobs, self.remaining_jobs,
+                                  [c.get('name') for c in self.config.get('run_configurations')],
+                                  self.config.get_int('repetitions'))
+        for round_results in coordinator.run():
+            self.results.add_results(round_results)
+            if self.metrics is not None:
+                for result in round_results:
+                    self.metrics.job_finished(None, result)
+
+    def _expand_rounds(self):
+        """
+        Expands the benchmark into rounds, i.e. (file, run configuration) pairs, in
+        the order in which a sequential benchmark executes them. Repetitions that
+        have already been completed are omitted, as are rounds without repetitions left.
+        The batch rounds of run configurations with a 'batch' property come last.
+        :return: list of rounds
+        """
         repetitions = self.config.get('repetitions')
-        i = 1
-        processed_files = 0
+        rounds = []
         for file in self.files:
             for run_config in self.config.get('run_configurations'):
-                for pre_round_cmd in run_config.get('pre_round_commands', []):
-                    print("Executing pre_round_cmd '{}'".format(pre_round_cmd))
-                    result = ProcessRunner.run(pre_round_cmd, timeout, self.process_stdout_fh, self.process_stderr_fh)
-                    assert not result.timeout_occurred, "Pre-round commands must not time out"
-
-                result = \
-                    ProcessRunner.run_as_benchmark(
-                        command=run_config.get('command'), 
-                        file=file, 
-                        config_name=run_config.get('name'),
-                        next_job=i,
-                        total_jobs=self.total_jobs,
-                        repetitions=repetitions,
-                        timeout=timeout,
-                        stdout_fh=self.process_stdout_fh,
-                        stderr_fh=self.process_stderr_fh)
-
-                self.results.add_results(result)
-                i += repetitions
-
-                for post_round_cmd in run_config.get('post_round_commands', []):
-                    print("Executing post_round_cmd '{}'".format(post_round_cmd))
-                    result = ProcessRunner.run(post_round_cmd, timeout, self.process_stdout_fh, self.process_stderr_fh)
-                    assert not result.timeout_occurred, "Post-round commands must not time out"
-
-            processed_files += 1
+                if run_config.get('batch', None):
+                    continue
+                jobs = [(file, run_config.get('name'), rep) for rep in range(0, repetitions)]
+                missing = [job[2] for job in jobs if job not in self.completed_jobs]
+                previous = [self.completed_jobs[job] for job in jobs if job in self.completed_jobs]
+                if self.adaptive and self.adaptive.done(len(previous), [t for t in previous if t is not None]):
+                    continue
+                if missing:
+                    rounds.append(Round(file, run_config, missing, previous))
+        for run_config in self.config.get('run_configurations'):
+            if run_config.get('batch', None):
+                rounds.extend(self._expand_batch_rounds(run_config))
+        return rounds
+
+    def _expand_batch_rounds(self, run_config):
+        """
+        Splits the files into batches of up to 'batch.size' files, whose jobs run all files
+        of the batch in one invocation. Files are omitted from the repetitions they have
+        already completed; repetitions with different files left form separate rounds.
+        :return: list of rounds
+        """
+        name = run_config.get('name')
+        size = run_config.get_int('batch.size')
+        rounds = []
+        for start in range(0, len(self.files), size):
+            missing_to_reps = {}
+            for rep in range(0, self.config.get('repetitions')):
+                missing = tuple(file for file in self.files[start:start + size]
+                                if (file, name, rep) not in self.completed_jobs)
+                if missing:
+                    missing_to_reps.setdefault(missing, []).append(rep)
+            for missing, reps in missing_to_reps.items():
+                rounds.append(Round(" ".join(missing), run_config, reps, files=list(missing)))
+        return rounds
+
+    def _order_rounds(self, rounds):
+        """
+        Orders the rounds according to the configured schedule and numbers their jobs.
+        :return: list of rounds, in the order in which they are dispatched
+        """
+        if self.config.get('schedule.order') == 'longest_first':
+            history = RuntimeHistory(self.config.get('timeout'))
+            history.load(self.config.get_list('schedule.history', []))
+            rounds = Scheduler.order_longest_first(rounds, history)
+        elif self.config.get('schedule.order') == 'interleaved':
+            rounds = Scheduler.order_interleaved(rounds)
+        elif self.config.get('schedule.order') == 'random':
+            if self.config.get('schedule.seed', None) is None:
+                self.config.data.put('schedule.seed', random.SystemRandom().randrange(2 ** 32))
+            seed = self.config.get_int('schedule.seed')
+            print("Randomizing the order of jobs with seed {}".format(seed))
+            rounds = Scheduler.order_interleaved(rounds, random.Random(seed))
+        Scheduler.number_jobs(rounds)
+        return rounds
+
+    def _print_schedule(self):
+        if self.config.get('schedule.order') == 'sequential':
+            return
+        print()
+        print("Rounds are executed in the following order ({}):".format(self.config.get('schedule.order')))
+        for rnd in self.rounds:
+            info = "    {}, {}, repetitions {}".format(rnd.file, rnd.config_name,
+                                                   " ".join(str(rep) for rep in rnd.repetitions))
+            if rnd.estimate is not None:
+                info += " (estimated {:.3f} s)".format(rnd.estimate)
+            print(info)
+        print()
+
+    def _write_schedule(self):
+        """
+        Saves the order in which the rounds are executed to the results folder.
+        :return: None
+        """
+        filename = os.path.join(self.config.get('results.path'), self.config.get('results.schedule'))
+        # When resuming, the rounds left to run follow the schedule of the interrupted benchmark
+        previous_rows = self._previous_rows(filename)
+        header = ["position", "input file", "run configuration", "repetitions", "estimated runtime [s]"]
+        data = [] if previous_rows else [header]
+        for position, rnd in enumerate(self.rounds, previous_rows + 1):
+            data.append([str(position),
+                         rnd.file,
+                         rnd.config_name,
+                         " ".join(str(rep) for rep in rnd.repetitions),
+                         "" if rnd.estimate is None else str(rnd.estimate)])
+
+        with FileWriter(filename, append=previous_rows > 0) as writer:
+            writer.write_csv_data(data)
+
+        if self.config.get('schedule.seed', None) is not None:
+            # Record the seed, such that the order can be reproduced
+            with FileWriter(os.path.splitext(filename)[0] + "_seed.txt") as writer:
+                writer.write_line(str(self.config.get('schedule.seed')))
+
+    def _compile_plan(self, rounds):
+        """
+        Compiles the ordered rounds into an execution plan, substituting all placeholders
+        except @port@ once instead of for every job.
+        :return: ExecutionPlan
+        """
+        source = self.config.source
+        if self.config.get('schedule.seed', None) is not None:
+            # Executing the plan does not order the rounds again, but the seed documents the order
+            source.setdefault('schedule', {})['seed'] = self.config.get('schedule.seed')
+        round_plans = [RoundPlan.compile(rnd, self.config.get_int('repetitions'), self.config.get('timeout'),
+                                         self.config.get('memory_limit', None), self.config.get('cache.artifacts', []))
+                       for rnd in rounds]
+        return ExecutionPlan(source, self.files, round_plans, os.path.basename(self.config.config_copy_filename))
+
+    def _save_plan(self):
+        filename = os.path.join(self.config.get('results.path'), self.config.get('results.plan'))
+        self.plan.save(filename)
+        print("Saved the execution plan ({} jobs in {} rounds) to '{}'"
+              .format(sum(len(rnd.jobs) * rnd.results_per_job for rnd in self.plan.rounds), len(self.plan.rounds),
+                      filename))
+
+    def _run_round(self, rnd, slot, results=None):
+        """
+        Runs the pre round commands, all repetitions and the post round commands of a round.
+        :param rnd: RoundPlan
+        :param results: RunResult to record each single run result in as soon as it completes, or None
+        :return: list of single run results
+        """
+        server = None
+        if rnd.server:
+            server = self.server_pool.server(slot, rnd.server)
+
+        self._run_round_commands(rnd.pre_round_commands, "pre", rnd, server)
+        with self.round_command_lock.shared():
+            round_results = self._run_jobs(rnd, slot, server, results)
+        self._run_round_commands(rnd.post_round_commands, "post", rnd, server)
+
+        return round_results
+
+    def _run_round_commands(self, commands, kind, rnd, server):
+        """
+        Runs the pre or post round commands of a round. They do not run concurrently with the
+        jobs of other slots, since they may affect them, e.g. by killing all solver instances.
+        :param kind: "pre" or "post"
+        :return: None
+        """
+        if not commands:
+            return
+        with self.round_command_lock.exclusive():
+            for command in commands:
+                command = self._round_command(command, server)
+                print("Executing {}_round_cmd '{}'".format(kind, command))
+                result = ProcessRunner.run(command, rnd.timeout, self.process_stdout_fh, self.process_stderr_fh)
+                assert not result.timeout_occurred, "{}-round commands must not time out".format(kind.capitalize())
+
+    def _run_jobs(self, rnd, slot, server, results):
+        """
+        Runs all repetitions of a round, see _run_round.
+        :return: list of single run results
+        """
+        cache = None if rnd.always_rerun else self.cache
+        if rnd.batch is not None:
+            round_results = \
+                BatchRunner.run_as_benchmark(
+                    jobs=rnd.jobs,
+                    batch=rnd.batch,
+                    config_name=rnd.config_name,
+                    next_job=rnd.first_job,
+                    total_jobs=self.total_jobs,
+                    repetitions=rnd.max_repetitions,
+                    timeout=rnd.timeout,
+                    stdout_fh=self.process_stdout_fh,
+                    stderr_fh=self.process_stderr_fh,
+                    remaining_jobs=self.remaining_jobs,
+                    server=server,
+                    containment=self.containment,
+                    memory_limit=rnd.memory_limit,
+                    output_archive=self.output_archive,
+                    metrics=self.metrics,
+                    slot=slot,
+                    results=results)
+        else:
+            round_results = \
+                ProcessRunner.run_as_benchmark(
+                    jobs=rnd.jobs,
+                    file=rnd.file,
+                    config_name=rnd.config_name,
+                    next_job=rnd.first_job,
+                    total_jobs=self.total_jobs,
+                    repetitions=rnd.max_repetitions,
+                    timeout=rnd.timeout,
+                    stdout_fh=self.process_stdout_fh,
+                    stderr_fh=self.process_stderr_fh,
+                    remaining_jobs=self.remaining_jobs,
+                    cache=cache,
+                    artifacts=rnd.artifacts,
+                    adaptive=self.adaptive,
+                    previous_results=rnd.previous_results,
+                    server=server,
+                    containment=self.containment,
+                    memory_limit=rnd.memory_limit,
+                    output_archive=self.output_archive,
+                    metrics=self.metrics,
+                    slot=slot,
+                    timelines=self.timelines,
+                    timeline_interval=self.config.get_float('timeline_interval'),
+                    results=results)
+        return round_results
+
+    @staticmethod
+    def _round_command(command, server):
+        """
+        :param command: a pre or post round command of a RoundPlan, a string or a tuple
+        :return: the command, with the port of the server substituted for @port@ if there is one
+        """
+        if server is not None:
+            port = str(server.port)
+            if isinstance(command, str):
+                return replace_placeholders(command, port=port)
+            return [replace_placeholders(part, port=port) for part in command]
+        return command if isinstance(command, str) else list(command)
 
     def _confirm_or_quit(self):
         if self.config.get('confirm_start'):
@@ -0,0 +1,155 @@
+import os
+import selectors
+import signal
+import threading
+import time
+
+"""
+Event-driven waiting for the exit of a child process: the waiting thread wakes up as
+soon as the process exits, instead of polling with sleeps, so that the measured runtime
+is not prolonged by the polling interval.
+
+On Linux 5.3 and newer, a pidfd of the process becomes readable when it exits. Elsewhere
+on POSIX, SIGCHLD wakes all waiting threads; since signal handlers can only be installed
+by the main thread, it is installed by install_child_handler. If neither is available,
+e.g. on Windows, the waiter falls back to polling.
+
+The signal handler itself does nothing: it may interrupt the main thread while that holds
+the lock of an event, so setting events there could deadlock. Instead, the signal is
+written to a self-pipe (signal.set_wakeup_fd), on which a dispatcher thread selects and
+then wakes the waiting threads.
+"""
+
+# Events of all threads currently waiting for a SIGCHLD
+_child_events = set()
+_child_events_lock = threading.Lock()
+_child_handler_installed = False
+
+# Maximum sleep when polling, as in subprocess.Popen.wait
+MAX_POLL_DELAY = 0.05
+
+
+def _on_child_signal(signum, frame):
+    # The signal was already written to the wakeup fd, see the module docstring
+    pass
+
+
+def _dispatch_child_signals(wakeup_fd):
+    selector = selectors.DefaultSelector()
+    selector.register(wakeup_fd, selectors.EVENT_READ)
+    while True:
+        selector.select()
+        try:
+            while os.read(wakeup_fd, 512):
+                pass
+        except BlockingIOError:
+            pass
+        with _child_events_lock:
+            events = list(_child_events)
+        for event in events:
+            event.set()
+
+
+def install_child_handler():
+    """
+    Installs the SIGCHLD handler used if pidfds are not available. Must be called by the main thread.
+    :return: None
+    """
+    global _child_handler_installed
+    if _child_handler_installed or ExitWaiter.pidfd_supported() or not hasattr(signal, 'SIGCHLD'):
+        return
+    if threading.current_thread() is not threading.main_thread():
+        return
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(read_fd, False)
+    os.set_blocking(write_fd, False)
+    previous_fd = signal.set_wakeup_fd(write_fd, warn_on_full_buffer=False)
+    if previous_fd != -1:
+        # The wakeup fd is used by someone else, e.g. an asyncio event loop; poll instead
+        signal.set_wakeup_fd(previous_fd)
+        os.close(read_fd)
+        os.close(write_fd)
+        return
+    signal.signal(signal.SIGCHLD, _on_child_signal)
+    threading.Thread(target=_dispatch_child_signals, args=(read_fd,), name="sigchld-dispatcher", daemon=True).start()
+    _child_handler_installed = True
+
+
+class ExitWaiter:
+    """
+    Waits for a single child process. Use as a context manager, and call wait in a loop
+    until the process has been reaped: wait may return early, e.g. when another child exits.
+    """
+
+    _pidfd_supported = None
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.selector = None
+        self.pidfd = None
+        self.event = None
+        self.delay = 0.0005
+
+    @staticmethod
+    def pidfd_supported():
+        if ExitWaiter._pidfd_supported is None:
+            supported = hasattr(os, 'pidfd_open')
+            if supported:
+                try:
+                    os.close(os.pidfd_open(os.getpid()))
+                except OSError:
+                    supported = False
+            ExitWaiter._pidfd_supported = supported
+        return ExitWaiter._pidfd_supported
+
+    def __enter__(self):
+        if ExitWaiter.pidfd_supported():
+            try:
+                self.pidfd = os.pidfd_open(self.pid)
+                self.selector = selectors.DefaultSelector()
+                self.selector.register(self.pidfd, selectors.EVENT_READ)
+            except ProcessLookupError:
+                # Already exited and reaped; the caller notices when reaping
+                self.pidfd = None
+        elif _child_handler_installed:
+            self.event = threading.Event()
+            with _child_events_lock:
+                _child_events.add(self.event)
+        return self
+
+    def prepare(self):
+        """
+        Called before checking whether the process exited, such that an exit after the check is not missed.
+        :return: None
+        """
+        if self.event is not None:
+            self.event.clear()
+
+    def wait(self, seconds):
+        """
+        Blocks until the process exits or the given time passed, whichever comes first.
+        :param seconds: maximum time to wait, may be infinite
+        :return: None
+        """
+        if seconds <= 0:
+            return
+        if self.selector is not None:
+            self.selector.select(None if seconds == float('inf') else seconds)
+        elif self.event is not None:
+            self.event.wait(None if seconds == float('inf') else seconds)
+        elif self.pidfd is None and ExitWaiter.pidfd_supported():
+            # The process was gone before the pidfd could be opened
+            return
+        else:
+            self.delay = min(self.delay * 2, seconds, MAX_POLL_DELAY)
+            time.sleep(self.delay)
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        if self.selector is not None:
+            self.selector.close()
+        if self.pidfd is not None:
+            os.close(self.pidfd)
+        if self.event is not None:
+            with _child_events_lock:
+                _child_events.discard(self.event)
+        return False
@@ -5,8 +5,12 @@ class FileWriter:
     Writes the various result files of the benchmark.
     """
 
-    def __init__(self, filename):
+    def __init__(self, filename, append=False):
+        """
+        :param append: if true, the data is appended to the file instead of replacing it
+        """
         self.filename = filename
+        self.append = append
         self.file_open = False
         self.file = None
 
@@ -15,7 +19,7 @@ class FileWriter:
             directory = os.path.dirname(self.filename)
             if directory and not os.path.exists(directory):
                 os.makedirs(os.path.dirname(self.filename))
-            self.file = open(self.filename, "w+")
+            self.file = open(self.filename, "a" if self.append else "w+")
             self.file_open = True
         except IOError as err:
             print("Unable to open file '" + self.filename + "'.")
@@ -43,13 +47,23 @@ class FileWriter:
         self.file.write(line)
 
     def write_csv_data(self, data):
-        length = 0
-        if data:
-            length = len(data[0])
-        for values in data:
-            if len(values) != length:
+        self.write_csv_rows(data)
+
+    def write_csv_rows(self, rows):
+        """
+        Writes the rows one by one as they are generated, e.g. by a generator, such that
+        they need not be kept in memory.
+        :param rows: iterable of lists of strings, starting with the header
+        """
+        length = None
+        for values in rows:
+            if length is None:
+                length = len(values)
+            elif len(values) != length:
                 raise IOError("Inconsistent data length, invalid CSV data.")
-            self.write_line(";".join(values))
+            self.write_raw(";".join(values) + "\n")
+        if self.file_open:
+            self.file.flush()
 
     def __enter__(self):
         if not self.file_open:
@@ -58,4 +72,5 @@ class FileWriter:
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.finalize()
-        return True
+        # Errors raised while writing, e.g. by the generator of the rows, are not swallowed
+        return False
@@ -0,0 +1,87 @@
+import csv
+import json
+import os
+from statistics import mean, median
+from src.journal import results_folder_file
+
+
+class RuntimeHistory:
+    """
+    Runtimes of earlier benchmarks, used to estimate how long a job will take.
+
+    The history is read from individual timings CSV files or journals of earlier
+    benchmarks. Runs that timed out (or ran out of memory) count with the current timeout.
+    """
+
+    def __init__(self, timeout):
+        self.timeout = timeout
+        self.pair_to_times = {}
+        self.estimates = {}
+        self.config_to_default = {}
+        self.default = None
+
+    def load(self, paths):
+        """
+        Reads the given result files; a results folder stands for its journal, or its
+        individual timings CSV file if there is no journal, see results_folder_file.
+        :return: None
+        """
+        for path in paths:
+            if os.path.isdir(path):
+                path = results_folder_file(path)
+            if path.endswith(".jsonl"):
+                self._load_journal(path)
+            else:
+                self._load_csv(path)
+        self._compute_estimates()
+
+    def _load_journal(self, filename):
+        with open(filename) as fh:
+            for line in fh:
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    continue
+                self._add(data['input_file'], data['config_name'], data['time_elapsed'],
+                          data['timeout_occurred'] or data.get('out_of_memory', False))
+
+    def _load_csv(self, filename):
+        with open(filename, newline='') as fh:
+            reader = csv.reader(fh, delimiter=";")
+            next(reader, None)  # skip header
+            for line in reader:
+                if len(line) < 5:
+                    continue
+                self._add(line[1], line[2], float(line[0]), line[4] == "True")
+
+    def _add(self, file, config_name, time_elapsed, killed):
+        if killed and self.timeout > 0:
+            time_elapsed = self.timeout
+        key = (os.path.normpath(file), config_name)
+        if key not in self.pair_to_times:
+            self.pair_to_times[key] = []
+        self.pair_to_times[key].append(time_elapsed)
+
+    def _compute_estimates(self):
+        self.estimates = {key: mean(times) for key, times in self.pair_to_times.items()}
+        config_to_estimates = {}
+        for (file, config_name), estimate in self.estimates.items():
+            config_to_estimates.setdefault(config_name, []).append(estimate)
+        self.config_to_default = {config_name: median(estimates)
+                                  for config_name, estimates in config_to_estimates.items()}
+        self.default = median(self.estimates.values()) if self.estimates else 0.0
+
+    def knows(self, file, config_name):
+        return (os.path.normpath(file), config_name) in self.estimates
+
+    def estimate(self, file, config_name):
+        """
+        Estimates the runtime of a single run. Unknown files are estimated with the median
+        of all known files under the same run configuration, or of all runs if the run
+        configuration is unknown as well.
+        :return: estimated runtime in seconds
+        """
+        key = (os.path.normpath(file), config_name)
+        if key in self.estimates:
+            return self.estimates[key]
+        return self.config_to_default.get(config_name, self.default)
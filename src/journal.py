@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+from src.result import SingleRunResult
+from src.util import find_results_file, require
+
+# Default name of the journal in the results folder, see the property 'results.journal'
+JOURNAL_DEFAULT = "journal.jsonl"
+
+
+class ResultJournal:
+    """
+    Append-only journal of single run results, stored as one JSON object per line.
+
+    Results are flushed to disk as soon as they are appended, so that the results of
+    an interrupted benchmark are not lost. Job slots may append concurrently.
+    """
+
+    # Size of the blocks in which the end of the journal is searched for its last complete line
+    BLOCK_SIZE = 4096
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = None
+        self.lock = threading.Lock()
+
+    def append(self, results):
+        """
+        Appends the given single run results and forces them to disk.
+        :return: None
+        """
+        lines = "".join(json.dumps(result.to_dict()) + "\n" for result in results)
+        with self.lock:
+            if self.file is None:
+                directory = os.path.dirname(self.filename)
+                if directory and not os.path.exists(directory):
+                    os.makedirs(directory)
+                self._discard_partial_line()
+                self.file = open(self.filename, "a")
+
+            self.file.write(lines)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def _discard_partial_line(self):
+        """
+        Truncates the journal after its last complete line. The line after it was cut short
+        when the runner was killed, and the next result appended would be joined to it.
+        :return: None
+        """
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename, "rb+") as fh:
+            size = fh.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                start = max(0, end - ResultJournal.BLOCK_SIZE)
+                fh.seek(start)
+                newline = fh.read(end - start).rfind(b"\n")
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end < size:
+                print("Discarding the incomplete last line of journal '{}'".format(self.filename))
+                fh.truncate(end)
+
+    def read(self):
+        """
+        Reads all results recorded in the journal, in the order in which they were appended.
+        :return: generator of SingleRunResult
+        """
+        if not os.path.exists(self.filename):
+            return
+        with open(self.filename) as fh:
+            for line_number, line in enumerate(fh, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError:
+                    # Most likely the last line, cut short when the runner was killed
+                    print("Skipping corrupt line {} in journal '{}'".format(line_number, self.filename))
+                    continue
+                yield SingleRunResult.from_dict(data)
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+def results_folder_file(results_dir):
+    """
+    :return: the journal of the results folder, named as in the copy of the configuration file
+             in it, or its individual timings CSV file if there is no journal
+    """
+    journal = find_results_file(results_dir, 'results.journal', JOURNAL_DEFAULT)
+    if journal is not None:
+        return journal
+    timings = find_results_file(results_dir, 'results.individual_timings', "timings.csv")
+    require(timings is not None, "Neither a journal nor an individual timings file found in '{}'".format(results_dir))
+    return timings
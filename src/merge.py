@@ -0,0 +1,65 @@
+from pyhocon import ConfigFactory
+from src.journal import JOURNAL_DEFAULT, ResultJournal
+from src.util import find_config_copy, find_results_file, require
+
+
+def _signature(config_file):
+    """
+    :return: the properties that must agree between shards of the same benchmark
+    """
+    data = ConfigFactory.parse_file(config_file)
+    run_configs = sorted((c.get('name'), list(c.get('command'))) for c in data.get('run_configurations'))
+    # With adaptive repetitions, 'repetitions' is the maximum number of repetitions, see Config
+    repetitions = data.get('adaptive_repetitions.max', None) or data.get('repetitions')
+    return {'repetitions': repetitions, 'timeout': data.get('timeout'), 'run_configurations': run_configs}
+
+
+def merge_journals(results_dirs, journal):
+    """
+    Merges the journals of the shards of a benchmark into one journal, checking that the
+    shards agree on run configurations, repetitions and timeout, and do not overlap.
+    :param results_dirs: the results folders of the shards, each with a journal and a configuration copy
+    :param journal: the ResultJournal to append the merged results to
+    :return: the configuration copy of the first shard
+    """
+    config_files = [find_config_copy(results_dir) for results_dir in results_dirs]
+    signature = _signature(config_files[0])
+    for results_dir, config_file in zip(results_dirs[1:], config_files[1:]):
+        other = _signature(config_file)
+        for key in signature:
+            require(other[key] == signature[key],
+                    "Property '{}' of '{}' differs from that of '{}'".format(key, results_dir, results_dirs[0]))
+
+    repetitions = signature['repetitions']
+    config_names = set(name for name, _ in signature['run_configurations'])
+    file_to_shard = {}
+    jobs = set()
+    n_results = 0
+    for results_dir in results_dirs:
+        journal_file = find_results_file(results_dir, 'results.journal', JOURNAL_DEFAULT)
+        require(journal_file is not None, "Cannot find the journal in '{}'".format(results_dir))
+        results = list(ResultJournal(journal_file).read())
+        for result in results:
+            require(result.config_name in config_names,
+                    "Unknown run configuration '{}' in '{}'".format(result.config_name, results_dir))
+            shard = file_to_shard.setdefault(result.input_file, results_dir)
+            require(shard == results_dir,
+                    "File '{}' was run in both '{}' and '{}'".format(result.input_file, shard, results_dir))
+            if result.repetition is not None:
+                require(0 <= result.repetition < repetitions,
+                        "Repetition {} of '{}' in '{}' exceeds 'repetitions'"
+                        .format(result.repetition, result.input_file, results_dir))
+                job = (result.input_file, result.config_name, result.repetition)
+                require(job not in jobs, "Job {} was recorded twice in '{}'".format(job, results_dir))
+                jobs.add(job)
+        journal.append(results)
+        n_results += len(results)
+        print("Merged {} results from '{}'".format(len(results), results_dir))
+
+    incomplete = [(file, name) for file in file_to_shard for name in config_names
+                  if not any((file, name, rep) in jobs for rep in range(0, repetitions))]
+    if incomplete:
+        print("Warning: {} pairs of file and run configuration have no results, e.g. {}"
+              .format(len(incomplete), incomplete[0]))
+    print("Merged {} results of {} files".format(n_results, len(file_to_shard)))
+    return config_files[0]
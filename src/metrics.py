@@ -0,0 +1,229 @@
+import collections
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+"""
+Live progress metrics of a benchmark in the Prometheus text exposition format, see
+  https://prometheus.io/docs/instrumenting/exposition_formats/
+The metrics are written to a file after each job, which the textfile collector of the
+node exporter picks up, and optionally served over HTTP.
+"""
+
+# Number of most recently finished jobs the throughput is computed from
+THROUGHPUT_WINDOW = 50
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels):
+    return "{" + ",".join("{}=\"{}\"".format(key, _escape(value)) for key, value in labels.items()) + "}"
+
+
+class ProgressMetrics:
+    """
+    Progress of the jobs run (or, as coordinator, served) by this runner. Thread-safe,
+    since job slots report concurrently.
+    """
+
+    def __init__(self, results_path, total_jobs, remaining_jobs, slots, textfile=None):
+        """
+        :param total_jobs: number of jobs of the benchmark, including those completed before resuming
+        :param remaining_jobs: dictionary from run configuration name to the number of jobs left to run
+        :param slots: number of concurrent job slots
+        :param textfile: file to write the metrics to after each job, or None
+        """
+        self.results_path = results_path
+        self.total_jobs = total_jobs
+        self.remaining = dict(remaining_jobs)
+        self.jobs_done = total_jobs - sum(remaining_jobs.values())
+        self.slots = slots
+        self.textfile = textfile
+        self.timeouts = 0
+        self.out_of_memory = 0
+        self.nonzero_exits = 0
+        self.cached = 0
+        self.config_to_durations = {name: [0, 0.0] for name in remaining_jobs}
+        self.finish_times = collections.deque(maxlen=THROUGHPUT_WINDOW)
+        self.slot_to_job = {}
+        self.start_time = time.time()
+        self.last_update = self.start_time
+        self.lock = threading.Lock()
+        # Serializes writing the textfile, such that an older rendering never replaces a newer one
+        self.textfile_lock = threading.Lock()
+        self.http_server = None
+        self._write_textfile()
+
+    def job_started(self, slot, file, config_name, command):
+        with self.lock:
+            self.slot_to_job[slot] = (file, config_name, " ".join(command), time.time())
+            self.last_update = time.time()
+        self._write_textfile()
+
+    def job_finished(self, slot, result):
+        """
+        :param slot: the job slot that ran the job, or None if it is unknown, e.g. for a coordinator
+        :param result: SingleRunResult of the job
+        """
+        self.jobs_finished(slot, [result])
+
+    def jobs_finished(self, slot, results):
+        """
+        Called once per started job, with the results it yielded, e.g. those of the files of a batch.
+        :param slot: the job slot that ran the job, or None if it is unknown, e.g. for a coordinator
+        :param results: list of SingleRunResults of the job, may be empty
+        """
+        with self.lock:
+            now = time.time()
+            self.slot_to_job.pop(slot, None)
+            for result in results:
+                self.jobs_done += 1
+                self.remaining[result.config_name] = max(0, self.remaining.get(result.config_name, 0) - 1)
+                self.timeouts += int(bool(result.timeout_occurred))
+                self.out_of_memory += int(bool(result.out_of_memory))
+                self.nonzero_exits += int(result.is_valid() and bool(result.return_code))
+                self.cached += int(bool(result.cached))
+                if not result.cached:
+                    durations = self.config_to_durations.setdefault(result.config_name, [0, 0.0])
+                    durations[0] += 1
+                    durations[1] += result.time_elapsed
+                self.finish_times.append(now)
+            self.last_update = now
+        self._write_textfile()
+
+    def jobs_skipped(self, config_name, count):
+        """
+        Called if jobs are not run after all, e.g. when adaptive repetitions stop early.
+        """
+        with self.lock:
+            self.remaining[config_name] = max(0, self.remaining.get(config_name, 0) - count)
+            self.total_jobs -= count
+            self.last_update = time.time()
+        self._write_textfile()
+
+    def eta(self):
+        """
+        :return: estimated time in seconds until all jobs are done, from the mean observed
+                 runtime per run configuration, or None if no runtime was observed yet
+        """
+        count = sum(n for n, _ in self.config_to_durations.values())
+        if count == 0:
+            return 0.0 if not any(self.remaining.values()) else None
+        overall_mean = sum(total for _, total in self.config_to_durations.values()) / count
+        work = 0.0
+        for name, remaining in self.remaining.items():
+            n, total = self.config_to_durations.get(name, (0, 0.0))
+            work += remaining * (total / n if n else overall_mean)
+        return work / self.slots
+
+    def throughput(self):
+        """
+        :return: jobs per second over the most recently finished jobs
+        """
+        if not self.finish_times:
+            return 0.0
+        # Until the window is full, measure from the start, such that the first job counts
+        start = self.finish_times[0] if len(self.finish_times) == THROUGHPUT_WINDOW else self.start_time
+        count = len(self.finish_times) - 1 if len(self.finish_times) == THROUGHPUT_WINDOW else len(self.finish_times)
+        elapsed = time.time() - start
+        return count / elapsed if elapsed > 0 else 0.0
+
+    def render(self):
+        """
+        :return: the metrics in the Prometheus text format
+        """
+        with self.lock:
+            eta = self.eta()
+            lines = []
+
+            def metric(name, kind, help_text, samples):
+                lines.append("# HELP viper_runner_{} {}".format(name, help_text))
+                lines.append("# TYPE viper_runner_{} {}".format(name, kind))
+                for labels, value in samples:
+                    lines.append("viper_runner_{}{} {}".format(name, labels, value))
+
+            metric("info", "gauge", "Results folder of the benchmark.",
+                   [(_labels(results_path=self.results_path), 1)])
+            metric("jobs_total", "gauge", "Number of jobs of the benchmark.", [("", self.total_jobs)])
+            metric("jobs_done", "gauge", "Number of jobs done, including cached results.", [("", self.jobs_done)])
+            metric("jobs_remaining", "gauge", "Number of jobs left to run, per run configuration.",
+                   [(_labels(config=name), count) for name, count in sorted(self.remaining.items())])
+            metric("jobs_cached", "counter", "Number of jobs whose result was reused from the cache.",
+                   [("", self.cached)])
+            metric("timeouts", "counter", "Number of jobs killed due to the timeout.", [("", self.timeouts)])
+            metric("out_of_memory", "counter", "Number of jobs killed due to the memory limit.",
+                   [("", self.out_of_memory)])
+            metric("nonzero_exits", "counter", "Number of completed jobs with a non-zero exit code.",
+                   [("", self.nonzero_exits)])
+            metric("throughput_jobs_per_second", "gauge",
+                   "Jobs per second over the last {} finished jobs.".format(THROUGHPUT_WINDOW),
+                   [("", "{:.6f}".format(self.throughput()))])
+            metric("eta_seconds", "gauge", "Estimated time until all jobs are done, NaN if unknown.",
+                   [("", "NaN" if eta is None else "{:.3f}".format(eta))])
+            metric("running_job", "gauge", "Job currently running in a slot, with its start time as value.",
+                   [(_labels(slot=slot, file=file, config=name, command=command), "{:.3f}".format(started))
+                    for slot, (file, name, command, started) in sorted(self.slot_to_job.items())])
+            metric("start_time_seconds", "gauge", "Unix time the benchmark was started.",
+                   [("", "{:.3f}".format(self.start_time))])
+            metric("last_update_time_seconds", "gauge", "Unix time a job was last started or finished.",
+                   [("", "{:.3f}".format(self.last_update))])
+            return "\n".join(lines) + "\n"
+
+    def _write_textfile(self):
+        if not self.textfile:
+            return
+        with self.textfile_lock:
+            directory = os.path.dirname(self.textfile)
+            if directory and not os.path.exists(directory):
+                os.makedirs(directory)
+            # Replace the file atomically, such that the collector never reads a partial file
+            fd, temporary = tempfile.mkstemp(prefix=os.path.basename(self.textfile) + ".",
+                                             suffix=".tmp", dir=directory or ".")
+            try:
+                with os.fdopen(fd, "w") as fh:
+                    fh.write(self.render())
+                # mkstemp creates the file readable by the owner only
+                os.chmod(temporary, 0o644)
+                os.replace(temporary, self.textfile)
+            except BaseException:
+                os.remove(temporary)
+                raise
+
+    def serve(self, host, port):
+        """
+        Serves the metrics at http://host:port/metrics in a background thread.
+        :return: None
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ["/", "/metrics"]:
+                    self.send_error(404)
+                    return
+                body = metrics.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Do not interleave requests with the output of the benchmark
+                pass
+
+        self.http_server = ThreadingHTTPServer((host, port), Handler)
+        self.http_server.daemon_threads = True
+        threading.Thread(target=self.http_server.serve_forever, daemon=True).start()
+        print("Serving progress metrics at http://{}:{}/metrics".format(host, self.http_server.server_address[1]))
+
+    def close(self):
+        if self.http_server is not None:
+            self.http_server.shutdown()
+            self.http_server.server_close()
+            self.http_server = None
+        self._write_textfile()
@@ -0,0 +1,159 @@
+import gzip
+import json
+import os
+import threading
+import zlib
+
+# Number of bytes read from a pipe at once
+READ_SIZE = 64 * 1024
+
+# Time in seconds to wait for the output of a process after it exited. Processes that
+# outlived it may still hold the pipes open.
+DRAIN_TIMEOUT = 5.0
+
+
+def _unpin_current_thread():
+    """
+    Moves the current thread off the CPUs of its job slot, which it inherited from the
+    thread that started it (see Scheduler.pin_current_thread), onto the other CPUs of the
+    runner, such that it does not compete with the job. Unchanged if there are none.
+    :return: None
+    """
+    if not hasattr(os, 'sched_setaffinity'):
+        return
+    # The main thread, whose ID is that of the process, is never pinned
+    others = os.sched_getaffinity(os.getpid()) - os.sched_getaffinity(0)
+    if others:
+        os.sched_setaffinity(0, others)
+
+
+class StreamReader:
+    """
+    Drains a pipe in a background thread, so that the writing process never blocks,
+    and compresses the data on the fly into a gzip member. The thread does not run on
+    the CPUs of the job slot.
+    """
+
+    def __init__(self, pipe):
+        self.pipe = pipe
+        self.compressor = zlib.compressobj(wbits=31)  # gzip format
+        self.chunks = []
+        self.size = 0
+        self.abandoned = False
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._drain, daemon=True)
+        self.thread.start()
+
+    def _drain(self):
+        _unpin_current_thread()
+        fd = self.pipe.fileno()
+        while True:
+            data = os.read(fd, READ_SIZE)
+            if not data:
+                break
+            with self.lock:
+                if self.abandoned:
+                    break
+                self.size += len(data)
+                self.chunks.append(self.compressor.compress(data))
+
+    def finish(self):
+        """
+        Waits until the pipe is closed, but at most DRAIN_TIMEOUT seconds.
+        :return: pair (compressed data, uncompressed size)
+        """
+        self.thread.join(DRAIN_TIMEOUT)
+        with self.lock:
+            if self.thread.is_alive():
+                print("Warning: output still open after the process exited, archiving it truncated")
+                self.abandoned = True
+            self.chunks.append(self.compressor.flush())
+        if not self.thread.is_alive():
+            self.pipe.close()
+        return b"".join(self.chunks), self.size
+
+
+class OutputArchive:
+    """
+    Archive of the stdout and stderr output of all runs of a benchmark.
+
+    The output of each run and stream is stored as a separate gzip member; the
+    concatenation of all members is a valid gzip file. An index in JSON Lines format
+    records the position of each member, such that the output of a single run can be
+    extracted without decompressing the whole archive.
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: the archive file; the index is stored next to it, with extension .index.jsonl
+        """
+        self.filename = filename
+        self.index_filename = OutputArchive.index_filename_of(filename)
+        self.lock = threading.Lock()
+        self.file = None
+        self.index_file = None
+
+    @staticmethod
+    def index_filename_of(filename):
+        base = filename[:-3] if filename.endswith(".gz") else filename
+        return base + ".index.jsonl"
+
+    def add(self, file, config_name, repetition, stream, data, size):
+        """
+        Appends the compressed output of one stream of one run.
+        :param data: a gzip member, see StreamReader
+        :param size: the uncompressed size of the output
+        :return: None
+        """
+        self.add_shared([file], config_name, repetition, stream, data, size)
+
+    def add_shared(self, files, config_name, repetition, stream, data, size):
+        """
+        Appends the compressed output of one stream of an invocation that yielded the runs
+        of several files, e.g. a batch. The output is stored once and indexed for each file.
+        :param files: the input files of the runs
+        :return: None
+        """
+        with self.lock:
+            if self.file is None:
+                directory = os.path.dirname(self.filename)
+                if directory and not os.path.exists(directory):
+                    os.makedirs(directory)
+                self.file = open(self.filename, "ab")
+                self.index_file = open(self.index_filename, "a")
+            offset = self.file.seek(0, os.SEEK_END)
+            self.file.write(data)
+            self.file.flush()
+            for file in files:
+                entry = {'input_file': file, 'config_name': config_name, 'repetition': repetition,
+                         'stream': stream, 'offset': offset, 'length': len(data), 'size': size}
+                self.index_file.write(json.dumps(entry) + "\n")
+            self.index_file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.index_file.close()
+                self.file = None
+                self.index_file = None
+
+    @staticmethod
+    def entries(filename):
+        """
+        :return: generator of the index entries of the archive
+        """
+        with open(OutputArchive.index_filename_of(filename)) as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+
+    @staticmethod
+    def read(filename, entry):
+        """
+        :param entry: an index entry of the archive
+        :return: the uncompressed output
+        """
+        with open(filename, "rb") as fh:
+            fh.seek(entry['offset'])
+            return gzip.decompress(fh.read(entry['length']))
@@ -0,0 +1,194 @@
+import collections
+import json
+from src.util import PLACEHOLDER_REP, replace_placeholders, require
+
+"""
+The execution plan of a benchmark: the configuration expanded once into immutable
+rounds of jobs whose commands have all placeholders substituted, except for @port@,
+which depends on the job slot a round runs in, and @files@ of batch rounds, which
+depends on the files of each invocation (see src.batch). Plans can be saved as JSON
+and executed later, e.g. on another machine.
+"""
+
+PLAN_VERSION = 1
+
+# A single repetition of a round and its command
+JobRecord = collections.namedtuple('JobRecord', ['repetition', 'command'])
+
+_ROUND_FIELDS = ['file', 'config_name', 'jobs', 'first_job', 'estimate', 'previous_results', 'max_repetitions',
+                 'timeout', 'memory_limit', 'always_rerun', 'artifacts', 'server',
+                 'pre_round_commands', 'post_round_commands', 'batch']
+
+
+class RoundPlan(collections.namedtuple('RoundPlan', _ROUND_FIELDS)):
+    """
+    A round (see scheduler.Round) with everything needed to execute it.
+    """
+
+    __slots__ = ()
+
+    @property
+    def repetitions(self):
+        return [job.repetition for job in self.jobs]
+
+    @property
+    def results_per_job(self):
+        """
+        :return: number of single run results of each job, i.e. the number of files of a batch round
+        """
+        return len(self.batch['files']) if self.batch else 1
+
+    @staticmethod
+    def compile(rnd, max_repetitions, timeout, memory_limit, artifacts):
+        """
+        :param rnd: scheduler.Round, with its jobs numbered
+        :param memory_limit: default memory limit in MB, or None
+        :param artifacts: cache artifacts shared by all run configurations
+        :return: RoundPlan
+        """
+        run_config = rnd.run_config
+        name = run_config.get('name')
+        command = list(run_config.get('command'))
+        # The files of a batch round replace @files@ when its jobs run, see src.batch
+        file = "" if rnd.files else rnd.file
+        jobs = tuple(JobRecord(rep, tuple(replace_placeholders(part, file=file, repetition=rep, config_name=name)
+                                          for part in command))
+                     for rep in rnd.repetitions)
+
+        # @rep@ is only defined in pre and post round commands if the round has a single repetition
+        round_rep = rnd.repetitions[0] if len(rnd.repetitions) == 1 else PLACEHOLDER_REP
+
+        def substitute(commands):
+            substituted = []
+            for cmd in commands:
+                if isinstance(cmd, str):
+                    substituted.append(replace_placeholders(cmd, file=file, repetition=round_rep, config_name=name))
+                else:
+                    substituted.append(tuple(replace_placeholders(part, file=file, repetition=round_rep,
+                                                                  config_name=name) for part in cmd))
+            return tuple(substituted)
+
+        memory_limit = run_config.get('memory_limit', memory_limit)
+        server = run_config.get('server', None)
+        batch = None
+        if rnd.files:
+            batch = {'files': list(rnd.files),
+                     'pattern': run_config.get_string('batch.pattern'),
+                     'time_unit': run_config.get_string('batch.time_unit', 's'),
+                     'success': list(run_config.get_list('batch.success', [])),
+                     'timeout': run_config.get('batch.timeout', None)}
+        return RoundPlan(file=rnd.file,
+                         config_name=name,
+                         jobs=jobs,
+                         first_job=rnd.first_job,
+                         estimate=rnd.estimate,
+                         previous_results=tuple(rnd.previous_results),
+                         max_repetitions=max_repetitions,
+                         timeout=timeout,
+                         memory_limit=memory_limit * 1024 * 1024 if memory_limit else None,
+                         always_rerun=bool(run_config.get('always_rerun', False)),
+                         artifacts=tuple(artifacts) + tuple(run_config.get('artifacts', [])),
+                         server=server.as_plain_ordered_dict() if server else None,
+                         pre_round_commands=substitute(run_config.get('pre_round_commands', [])),
+                         post_round_commands=substitute(run_config.get('post_round_commands', [])),
+                         batch=batch)
+
+    def to_dict(self):
+        data = self._asdict()
+        data['jobs'] = [{'repetition': job.repetition, 'command': list(job.command)} for job in self.jobs]
+        return data
+
+    @staticmethod
+    def from_dict(data):
+        data = dict(data)
+        data['jobs'] = tuple(JobRecord(job['repetition'], tuple(job['command'])) for job in data['jobs'])
+        data['previous_results'] = tuple(data['previous_results'])
+        data['artifacts'] = tuple(data['artifacts'])
+        # Plans saved before batch rounds existed
+        data.setdefault('batch', None)
+        for key in ['pre_round_commands', 'post_round_commands']:
+            data[key] = tuple(cmd if isinstance(cmd, str) else tuple(cmd) for cmd in data[key])
+        return RoundPlan(**data)
+
+    def remaining_batch_rounds(self, completed_jobs):
+        """
+        Removes the files completed by an interrupted benchmark from the jobs of a batch round.
+        :param completed_jobs: see RunResult.completed_jobs
+        :return: list of RoundPlan, one per distinct set of files left to run
+        """
+        missing_to_jobs = {}
+        for job in self.jobs:
+            missing = tuple(file for file in self.batch['files']
+                            if (file, self.config_name, job.repetition) not in completed_jobs)
+            if missing:
+                missing_to_jobs.setdefault(missing, []).append(job)
+        return [self._replace(file=" ".join(missing), jobs=tuple(jobs), batch=dict(self.batch, files=list(missing)))
+                for missing, jobs in missing_to_jobs.items()]
+
+
+class ExecutionPlan:
+    """
+    The configuration, the input files and the rounds of a benchmark, in the order in
+    which the rounds are dispatched.
+    """
+
+    def __init__(self, config, files, rounds, config_file=None):
+        """
+        :param config: the configuration as plain dictionary, with unsubstituted results path
+        :param rounds: list of RoundPlan
+        :param config_file: name of the copy of the configuration file in the results folder, or None
+        """
+        self.config = config
+        self.files = files
+        self.rounds = rounds
+        self.config_file = config_file
+
+    def save(self, filename):
+        with open(filename, "w") as fh:
+            json.dump({'version': PLAN_VERSION, 'config': self.config, 'config_file': self.config_file,
+                       'files': self.files, 'rounds': [rnd.to_dict() for rnd in self.rounds]}, fh, indent=1)
+
+    @staticmethod
+    def load(filename):
+        with open(filename) as fh:
+            data = json.load(fh)
+        require(data.get('version') == PLAN_VERSION,
+                "Unsupported version {} of plan '{}'".format(data.get('version'), filename))
+        return ExecutionPlan(data['config'], data['files'], [RoundPlan.from_dict(rnd) for rnd in data['rounds']],
+                             data.get('config_file'))
+
+    def job_order(self):
+        """
+        :return: dictionary from (input file, run configuration name, repetition) triples to the
+                 position of the job in the plan, which the result files are sorted by
+        """
+        order = {}
+        for rnd in self.rounds:
+            for job in rnd.jobs:
+                for file in rnd.batch['files'] if rnd.batch else [rnd.file]:
+                    order.setdefault((file, rnd.config_name, job.repetition), len(order))
+        return order
+
+    def remaining_rounds(self, completed_jobs, adaptive=None):
+        """
+        Removes jobs completed by an interrupted benchmark from the rounds, and numbers the remaining jobs.
+        :param completed_jobs: see RunResult.completed_jobs
+        :param adaptive: AdaptiveRepetitions, or None
+        :return: list of RoundPlan
+        """
+        rounds = []
+        next_job = 1
+        for rnd in self.rounds:
+            if rnd.batch is not None:
+                for remaining in rnd.remaining_batch_rounds(completed_jobs):
+                    rounds.append(remaining._replace(first_job=next_job))
+                    next_job += len(remaining.jobs) * remaining.results_per_job
+                continue
+            keys = [(rnd.file, rnd.config_name, rep) for rep in range(0, rnd.max_repetitions)]
+            previous = tuple(completed_jobs[key] for key in keys if key in completed_jobs)
+            jobs = tuple(job for job in rnd.jobs if (rnd.file, rnd.config_name, job.repetition) not in completed_jobs)
+            if not jobs or (adaptive and adaptive.done(len(previous), [t for t in previous if t is not None])):
+                continue
+            rounds.append(rnd._replace(jobs=jobs, previous_results=previous, first_job=next_job))
+            next_job += len(jobs)
+        return rounds
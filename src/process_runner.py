@@ -6,42 +6,145 @@ import psutil
 
 from src.util import replace_placeholders
 from src.result import SingleRunResult
+from src.resource_usage import ProcessTreeTracker, ResourceTimeline
+from src.output_archive import StreamReader
+from src.exit_waiter import ExitWaiter
+from src.containment import JobAborted
+
+# Interval in seconds at which the process tree of a running process is sampled
+TREE_SAMPLING_INTERVAL = 0.1
 
 class ProcessRunnerResult:
     def __init__(self):
         self.timeout_occurred = None
         self.return_code = None
         self.time_elapsed = None
+        self.usage = None
+        self.out_of_memory = False
+        self.leftover_processes = 0
+        # ResourceTimeline of the process tree, if requested
+        self.timeline = None
+        # Stream name to pair (compressed data, uncompressed size), if the output was captured
+        self.output = None
 
 class ProcessRunner:
     @staticmethod
-    def run_as_benchmark(command, file, config_name, next_job, total_jobs, repetitions, timeout, stdout_fh, stderr_fh):
+    def run_as_benchmark(jobs, file, config_name, next_job, total_jobs, repetitions, timeout, stdout_fh, stderr_fh,
+                         remaining_jobs=None, cache=None, artifacts=(),
+                         adaptive=None, previous_results=(), server=None, containment=None, memory_limit=None,
+                         output_archive=None, metrics=None, slot=None, timelines=None, timeline_interval=None,
+                         results=None):
+        """
+        Runs the jobs of a round, i.e. the command on the file repeatedly.
+        :param jobs: the repetitions to run, as JobRecords (see src.plan) with substituted commands
+        :param remaining_jobs: number of jobs left to run in this benchmark, defaults to 'total_jobs'
+        :param cache: ResultCache to reuse results from, or None to always run the command
+        :param artifacts: files the results depend on in addition to the input file, e.g. the verifier's jar
+        :param adaptive: AdaptiveRepetitions deciding when to stop repeating, or None to run all repetitions
+        :param previous_results: runtimes (None for timeouts) of earlier repetitions, considered by 'adaptive'
+        :param server: VerifierServer the command connects to via the @port@ placeholder, or None
+        :param containment: containment (see src.containment) to run each repetition in, or None
+        :param memory_limit: maximum memory of a repetition in bytes, or None
+        :param output_archive: OutputArchive to store the output of each repetition in, instead of writing
+                               it to 'stdout_fh' and 'stderr_fh'
+        :param metrics: ProgressMetrics to report each job to, or None
+        :param slot: the job slot running the jobs, reported to 'metrics'
+        :param timelines: TimelineArchive to store the resource timeline of each repetition in, or None
+        :param timeline_interval: time in seconds between the samples of the timelines
+        :param results: RunResult to add each single run result to as soon as it completes, or None
+        :return: list of single run results
+        """
         run_results = []
 
-        for i in range(0, repetitions):
-            # Replace placeholders in command
-            concrete_command = \
-                [replace_placeholders(part, file=file, repetition=i, config_name=config_name)
-                 for part in command]
+        if remaining_jobs is None:
+            remaining_jobs = total_jobs
+        jobs_info = str(remaining_jobs)
+        if remaining_jobs != total_jobs:
+            jobs_info += " remaining (" + str(total_jobs) + " in total)"
+
+        n_runs = len(previous_results)
+        times = [t for t in previous_results if t is not None]
+        max_info = ("at most " if adaptive is not None else "") + str(repetitions)
+
+        for job_offset, (i, cache_command) in enumerate(jobs):
+            if adaptive is not None and adaptive.done(n_runs, times):
+                print("Stopping after " + str(n_runs) + " repetitions of config " + config_name + " on " + file)
+                print()
+                if metrics is not None:
+                    metrics.jobs_skipped(config_name, len(jobs) - job_offset)
+                break
+
+            # The port of the server is irrelevant for caching
+            concrete_command = list(cache_command)
+            if server is not None:
+                concrete_command = [replace_placeholders(part, port=str(server.port)) for part in cache_command]
 
             # Print information about next repetition
             print(datetime.datetime.now().strftime("%d.%m.%Y, %H:%M:%S") +
-                  ": running job " + str(next_job + i) +
-                  " of " + str(total_jobs) + ", repetition " +
-                  str(i + 1) + " of " + str(repetitions) + "...")
+                  ": running job " + str(next_job + job_offset) +
+                  " of " + jobs_info + ", repetition " +
+                  str(i + 1) + " of " + max_info + "...")
             print("Command: '" + " ".join(concrete_command))
+            if metrics is not None:
+                metrics.job_started(slot, file, config_name, concrete_command)
+
+            cache_key = None
+            if cache is not None:
+                try:
+                    cache_key = cache.key(file, cache_command, artifacts, timeout, memory_limit,
+                                          containment.name if containment is not None else None, i)
+                except OSError as err:
+                    print("Not using the result cache: " + str(err))
+
+            run_result = cache.lookup(cache_key) if cache_key else None
+            if run_result is not None:
+                print("Reusing cached result")
+                run_result.config_name = config_name
+                run_result.input_file = file
+                run_result.repetition = i
+                run_result.cached = True
+            else:
+                if server is not None:
+                    server.ensure_ready()
+
+                # Run command to benchmark
+                interval = timeline_interval if timelines is not None else None
+                if output_archive is not None:
+                    process_result = ProcessRunner.run(concrete_command, timeout, subprocess.PIPE, subprocess.PIPE,
+                                                       containment, memory_limit, interval)
+                    for stream, (data, size) in process_result.output.items():
+                        output_archive.add(file, config_name, i, stream, data, size)
+                else:
+                    process_result = ProcessRunner.run(concrete_command, timeout, stdout_fh, stderr_fh,
+                                                       containment, memory_limit, interval)
+                if process_result.timeline is not None:
+                    timelines.add(file, config_name, i, process_result.timeline)
 
-            # Run command to benchmark
-            process_result = ProcessRunner.run(concrete_command, timeout, stdout_fh, stderr_fh)
+                if server is not None:
+                    server.job_done()
 
-            # Create and initialize a run result, and append it to the list of recorded run results
-            run_result = SingleRunResult(config_name, file)
+                # Create and initialize a run result, and append it to the list of recorded run results
+                run_result = SingleRunResult(config_name, file)
 
-            run_result.timeout_occurred = process_result.timeout_occurred
-            run_result.return_code = process_result.return_code
-            run_result.time_elapsed = process_result.time_elapsed
+                run_result.repetition = i
+                run_result.timeout_occurred = process_result.timeout_occurred
+                run_result.out_of_memory = process_result.out_of_memory
+                run_result.leftover_processes = process_result.leftover_processes
+                run_result.return_code = process_result.return_code
+                run_result.time_elapsed = process_result.time_elapsed
+                run_result.set_usage(process_result.usage)
+
+                if cache_key:
+                    cache.store(cache_key, run_result)
 
             run_results.append(run_result)
+            if results is not None:
+                results.add_results([run_result])
+            if metrics is not None:
+                metrics.job_finished(slot, run_result)
+            n_runs += 1
+            if run_result.is_valid():
+                times.append(run_result.time_elapsed)
 
             print()
             print("Time elapsed: " + "{:.3f}".format(run_result.time_elapsed) + " seconds")
@@ -50,37 +153,171 @@ class ProcessRunner:
         return run_results
 
     @staticmethod
-    def run(command, timeout, stdout_fh, stderr_fh):
+    def run(command, timeout, stdout_fh, stderr_fh, containment=None, memory_limit=None, timeline_interval=None):
+        """
+        Runs the command and waits until it exits, but at most 'timeout' seconds.
+        :param containment: containment (see src.containment) to run the command in, or None
+        :param memory_limit: maximum memory of the command's process tree in bytes, or None; requires containment
+        :param timeline_interval: if set, the resource usage of the process tree is recorded at this interval
+        :return: ProcessRunnerResult; if 'stdout_fh' and 'stderr_fh' are subprocess.PIPE, including the output
+        """
         return_code = -1
         timeout_occurred = False
+        out_of_memory = False
+        killed = False
+        rusage = None
+        survivors = []
+        job = containment.new_job(memory_limit) if containment is not None else None
+        popen_kwargs = {}
+        if job is not None:
+            command = job.command(command)
+            popen_kwargs = job.popen_kwargs()
         start_time = time.perf_counter()
-        
-        # Run the actual process
-        process = subprocess.Popen(command, stdout=stdout_fh, stderr=stderr_fh)
+
+        process = None
+        tracker = None
+        reaped = False
         try:
-            return_code = process.wait(timeout=timeout)
-        except subprocess.TimeoutExpired:
-            timeout_occurred = True
-            
-            # Kill process and all its children
-            try:
-                parent = psutil.Process(process.pid)
-                for child in parent.children(recursive=True):
-                    child.kill()
-                parent.kill()
-                print("Process was killed due to timeout!")
-            except psutil.NoSuchProcess:
-                # Ignore this exception: it just means that the process barely made it
-                pass
-            except psutil.AccessDenied:
-                # Ignore this exception
-                pass
-        finally:
+            # Run the actual process
+            process = subprocess.Popen(command, stdout=stdout_fh, stderr=stderr_fh, **popen_kwargs)
+            if job is not None:
+                contained = job.started(process)
+                if contained is not None:
+                    # Do not measure the start-up of the containment's wrapper
+                    start_time = contained
+            readers = {}
+            if stdout_fh == subprocess.PIPE:
+                readers['stdout'] = StreamReader(process.stdout)
+            if stderr_fh == subprocess.PIPE:
+                readers['stderr'] = StreamReader(process.stderr)
+            timeline = ResourceTimeline(timeline_interval) if timeline_interval else None
+            sampling_interval = timeline_interval or TREE_SAMPLING_INTERVAL
+            tracker = ProcessTreeTracker(process.pid, timeline)
+            deadline = start_time + timeout if timeout > 0 else float('inf')
+            next_sample = start_time + sampling_interval
+            with ExitWaiter(process.pid) as waiter:
+                while True:
+                    waiter.prepare()
+                    exited, return_code, rusage = ProcessRunner._reap(process, block=False)
+                    if exited:
+                        reaped = True
+                        break
+                    now = time.perf_counter()
+                    if now >= next_sample:
+                        tracker.sample()
+                        next_sample = now + sampling_interval
+                        out_of_memory = job is not None and job.memory_exceeded(tracker)
+                    if now >= deadline or out_of_memory:
+                        timeout_occurred = not out_of_memory
+                        killed = True
+                        return_code = -1
+                        tracker.sample()
+                        survivors = tracker.surviving_descendants()
+                        if job is not None:
+                            job.kill(tracker)
+                        else:
+                            ProcessRunner._kill_tree(process)
+                        if out_of_memory:
+                            print("Process was killed because it exceeded the memory limit!")
+                        else:
+                            print("Process was killed due to timeout!")
+                        _, _, rusage = ProcessRunner._reap(process, block=True)
+                        reaped = True
+                        break
+                    # Wakes up as soon as the process exits
+                    waiter.wait(min(deadline, next_sample) - now)
             end_time = time.perf_counter()
+            if job is not None and job.aborted:
+                raise JobAborted("Job '{}' was killed since its containment was closed".format(" ".join(command)))
+        except BaseException:
+            # E.g. Ctrl-C, which does not reach the job since it runs in its own session
+            ProcessRunner._abort(process, reaped, job, tracker)
+            raise
+
+        if not killed:
+            # Descendants that outlived the process are not covered by its rusage
+            survivors = tracker.surviving_descendants()
 
         process_result = ProcessRunnerResult()
+        process_result.usage = tracker.usage(rusage, survivors)
+
+        if job is not None:
+            if not killed and job.oom_killed():
+                out_of_memory = True
+                print("Process was killed by the kernel because it exceeded the memory limit!")
+            # Make sure that no process of the job survives it
+            leftovers = job.cleanup([] if killed else survivors)
+            if not killed:
+                process_result.leftover_processes = leftovers
+            if process_result.leftover_processes:
+                print("Killed {} processes that outlived the job".format(process_result.leftover_processes))
+
+        if readers:
+            process_result.output = {stream: reader.finish() for stream, reader in readers.items()}
+
         process_result.return_code = return_code
         process_result.timeout_occurred = timeout_occurred
+        process_result.out_of_memory = out_of_memory
         process_result.time_elapsed = end_time - start_time
+        process_result.timeline = timeline
+        usage = process_result.usage
+        if usage.user_time is not None and process_result.time_elapsed > 0:
+            usage.average_parallelism = (usage.user_time + usage.system_time) / process_result.time_elapsed
 
         return process_result
+
+    @staticmethod
+    def _abort(process, reaped, job, tracker):
+        """
+        Kills and reaps the process, if it was started and not reaped yet, and cleans up its job.
+        :return: None
+        """
+        if process is not None and not reaped:
+            if job is not None:
+                job.abort()
+            else:
+                ProcessRunner._kill_tree(process)
+            # The process may not have joined its job yet
+            try:
+                process.kill()
+            except OSError:
+                pass
+            process.wait()
+        if job is not None:
+            job.cleanup(tracker.surviving_descendants() if tracker is not None else [])
+
+    @staticmethod
+    def _reap(process, block):
+        """
+        Waits for the process to exit, collecting its resource usage where os.wait4 is available.
+        :return: triple (exited, return code, rusage or None)
+        """
+        if not hasattr(os, 'wait4'):
+            if block:
+                process.wait()
+            else:
+                process.poll()
+            return process.returncode is not None, process.returncode, None
+
+        pid, status, rusage = os.wait4(process.pid, 0 if block else os.WNOHANG)
+        if pid == 0:
+            return False, None, None
+
+        # Let the Popen object know that the process has been reaped
+        process.returncode = os.waitstatus_to_exitcode(status)
+        return True, process.returncode, rusage
+
+    @staticmethod
+    def _kill_tree(process):
+        # Kill process and all its children
+        try:
+            parent = psutil.Process(process.pid)
+            for child in parent.children(recursive=True):
+                child.kill()
+            parent.kill()
+        except psutil.NoSuchProcess:
+            # Ignore this exception: it just means that the process barely made it
+            pass
+        except psutil.AccessDenied:
+            # Ignore this exception
+            pass
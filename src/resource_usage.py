@@ -0,0 +1,232 @@
+import array
+import json
+import os
+import sys
+import threading
+import time
+import psutil
+
+# Bytes per unit of the rusage's ru_maxrss, which is in kilobytes except on macOS
+RU_MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+
+
+class ResourceUsage:
+    """
+    Small value object to store the resources consumed by the process tree of a single run.
+    """
+
+    def __init__(self):
+        self.user_time = None
+        self.system_time = None
+        self.peak_rss = None
+        self.voluntary_context_switches = None
+        self.involuntary_context_switches = None
+        # CPU time of the tree over its runtime, i.e. the average number of busy CPUs
+        self.average_parallelism = None
+        # Maxima over the samples of a ResourceTimeline
+        self.max_threads = None
+        self.max_children = None
+
+
+class ResourceTimeline:
+    """
+    Samples of the resource usage of the process tree of a single run. The samples are
+    kept in typed arrays, which take a few bytes per value instead of a Python object.
+    """
+
+    def __init__(self, interval):
+        """
+        :param interval: time in seconds between samples
+        """
+        self.interval = interval
+        # Time of each sample in seconds since the start of the run
+        self.times = array.array('f')
+        # CPU usage of the tree since the previous sample, in percent of one CPU
+        self.cpu_percent = array.array('f')
+        self.rss = array.array('q')
+        self.threads = array.array('l')
+        # Number of processes of the tree other than the root
+        self.children = array.array('l')
+
+    def add(self, elapsed, cpu_percent, rss, threads, children):
+        self.times.append(elapsed)
+        self.cpu_percent.append(cpu_percent)
+        self.rss.append(rss)
+        self.threads.append(threads)
+        self.children.append(children)
+
+    def to_dict(self):
+        return {'interval': self.interval, 'time': [round(t, 4) for t in self.times],
+                'cpu_percent': [round(c, 1) for c in self.cpu_percent], 'rss': self.rss.tolist(),
+                'threads': self.threads.tolist(), 'children': self.children.tolist()}
+
+
+class TimelineArchive:
+    """
+    Resource timelines of all runs of a benchmark, stored as one JSON object per line.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.file = None
+
+    def add(self, file, config_name, repetition, timeline):
+        """
+        Appends the timeline of one run.
+        :param timeline: ResourceTimeline
+        :return: None
+        """
+        entry = {'input_file': file, 'config_name': config_name, 'repetition': repetition}
+        entry.update(timeline.to_dict())
+        line = json.dumps(entry) + "\n"
+        with self.lock:
+            if self.file is None:
+                directory = os.path.dirname(self.filename)
+                if directory and not os.path.exists(directory):
+                    os.makedirs(directory)
+                self.file = open(self.filename, "a")
+            self.file.write(line)
+            self.file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class ProcessTreeTracker:
+    """
+    Keeps track of the descendants of a running process.
+
+    The rusage of a reaped process only covers the descendants it (transitively) waited
+    for. Descendants that outlive the root process, e.g. because they were orphaned or
+    because the tree is killed on timeout, are accounted for by sampling them with psutil.
+    """
+
+    def __init__(self, pid, timeline=None):
+        """
+        :param timeline: ResourceTimeline to record each sample in, or None
+        """
+        self.root = None
+        self.descendants = {}
+        self.tree_rss = 0
+        self.peak_tree_rss = 0
+        # Whether the tree was sampled at least once
+        self.sampled = False
+        self.timeline = timeline
+        self.start_time = time.perf_counter()
+        self.last_sample_time = self.start_time
+        self.pid_to_cpu_time = {}
+        try:
+            self.root = psutil.Process(pid)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+
+    def sample(self):
+        """
+        Records the current descendants of the root process and the total RSS of the tree.
+        :return: None
+        """
+        if self.root is None:
+            return
+        try:
+            processes = [self.root] + self.root.children(recursive=True)
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return
+
+        if self.timeline is not None:
+            self._sample_timeline(processes)
+            return
+
+        tree_rss = 0
+        for process in processes:
+            try:
+                tree_rss += process.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            if process.pid != self.root.pid:
+                self.descendants[process.pid] = process
+        self.tree_rss = tree_rss
+        self.peak_tree_rss = max(self.peak_tree_rss, tree_rss)
+        self.sampled = self.sampled or tree_rss > 0
+
+    def _sample_timeline(self, processes):
+        now = time.perf_counter()
+        tree_rss = 0
+        threads = 0
+        children = 0
+        cpu_time = 0.0
+        for process in processes:
+            try:
+                with process.oneshot():
+                    rss = process.memory_info().rss
+                    times = process.cpu_times()
+                    n_threads = process.num_threads()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            tree_rss += rss
+            threads += n_threads
+            total = times.user + times.system
+            # Processes started since the previous sample contribute all their CPU time
+            cpu_time += total - self.pid_to_cpu_time.get(process.pid, 0.0)
+            self.pid_to_cpu_time[process.pid] = total
+            if process.pid != self.root.pid:
+                self.descendants[process.pid] = process
+                children += 1
+        self.tree_rss = tree_rss
+        self.peak_tree_rss = max(self.peak_tree_rss, tree_rss)
+        self.sampled = self.sampled or tree_rss > 0
+        elapsed = now - self.last_sample_time
+        cpu_percent = 100 * max(cpu_time, 0.0) / elapsed if elapsed > 0 else 0.0
+        self.last_sample_time = now
+        self.timeline.add(now - self.start_time, cpu_percent, tree_rss, threads, children)
+
+    def surviving_descendants(self):
+        """
+        :return: the recorded descendants that are still running
+        """
+        return [process for process in self.descendants.values() if process.is_running()]
+
+    def usage(self, rusage, survivors):
+        """
+        Combines the rusage of the reaped root process with the current resource usage
+        of the given surviving descendants.
+        :param rusage: resource usage returned by os.wait4, or None if not available
+        :param survivors: descendants whose resources are not covered by 'rusage'
+        :return: ResourceUsage of the whole tree
+        """
+        usage = ResourceUsage()
+        # The rusage's ru_maxrss includes the RSS of the runner, which the child inherited
+        # before exec, hence the samples of the tree are preferred to it
+        usage.peak_rss = self.peak_tree_rss if self.sampled else None
+        if self.timeline is not None and len(self.timeline.times) > 0:
+            usage.max_threads = max(self.timeline.threads)
+            usage.max_children = max(self.timeline.children)
+
+        if rusage is None:
+            # Without rusage (e.g. on Windows), only the sampled memory usage is known
+            return usage
+
+        if not self.sampled:
+            # The run ended before the first sample; ru_maxrss is at least an upper bound of its peak
+            usage.peak_rss = rusage.ru_maxrss * RU_MAXRSS_UNIT
+        usage.user_time = rusage.ru_utime
+        usage.system_time = rusage.ru_stime
+        usage.voluntary_context_switches = rusage.ru_nvcsw
+        usage.involuntary_context_switches = rusage.ru_nivcsw
+
+        for process in survivors:
+            try:
+                with process.oneshot():
+                    times = process.cpu_times()
+                    switches = process.num_ctx_switches()
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            usage.user_time += times.user + getattr(times, 'children_user', 0.0)
+            usage.system_time += times.system + getattr(times, 'children_system', 0.0)
+            usage.voluntary_context_switches += switches.voluntary
+            usage.involuntary_context_switches += switches.involuntary
+
+        return usage
@@ -1,55 +1,286 @@
-from statistics import mean
+import array
+import math
+import threading
+import numpy
+from src.stats import RunningStats, summarize
+
+# Resource usage attributes of SingleRunResult that are averaged per run configuration
+USAGE_ATTRIBUTES = ['user_time', 'system_time', 'peak_rss',
+                    'voluntary_context_switches', 'involuntary_context_switches',
+                    'average_parallelism', 'max_threads', 'max_children']
+
+# Resource usage attributes with integer values
+INTEGER_USAGE_ATTRIBUTES = ['peak_rss', 'voluntary_context_switches', 'involuntary_context_switches',
+                            'max_threads', 'max_children']
+
+# Statistics of the runtimes of the valid runs per file and run configuration, see stats.summarize
+TIME_STATISTICS = ['mean', 'median', 'std_dev', 'min', 'cv', 'ci_lower', 'ci_upper']
+
+# Value of integer columns of ResultColumns for missing values, e.g. results recorded without repetition
+MISSING = -2 ** 63
+
+
+class ResultColumns:
+    """
+    Single run results stored column by column in typed arrays, with the names of the
+    input files and run configurations interned, instead of one Python object per run.
+    Missing values are NaN in floating point columns and MISSING in integer columns.
+    """
+
+    def __init__(self):
+        self.files = []
+        self.config_names = []
+        self._file_ids = {}
+        self._config_ids = {}
+        self.file = array.array('q')
+        self.config = array.array('q')
+        self.repetition = array.array('q')
+        self.time = array.array('d')
+        self.return_code = array.array('q')
+        self.leftover_processes = array.array('q')
+        self.timeout = array.array('b')
+        self.out_of_memory = array.array('b')
+        self.cached = array.array('b')
+        self.usage = {attribute: array.array('d') for attribute in USAGE_ATTRIBUTES}
+
+    def __len__(self):
+        return len(self.time)
+
+    def append(self, result):
+        """
+        :param result: SingleRunResult, which is not referenced afterwards
+        :return: None
+        """
+        file_id = self._file_ids.get(result.input_file)
+        if file_id is None:
+            file_id = self._file_ids[result.input_file] = len(self.files)
+            self.files.append(result.input_file)
+        config_id = self._config_ids.get(result.config_name)
+        if config_id is None:
+            config_id = self._config_ids[result.config_name] = len(self.config_names)
+            self.config_names.append(result.config_name)
+        self.file.append(file_id)
+        self.config.append(config_id)
+        self.repetition.append(MISSING if result.repetition is None else result.repetition)
+        self.time.append(math.nan if result.time_elapsed is None else result.time_elapsed)
+        self.return_code.append(MISSING if result.return_code is None else result.return_code)
+        self.leftover_processes.append(result.leftover_processes or 0)
+        self.timeout.append(bool(result.timeout_occurred))
+        self.out_of_memory.append(bool(result.out_of_memory))
+        self.cached.append(bool(result.cached))
+        for attribute, values in self.usage.items():
+            value = getattr(result, attribute, None)
+            values.append(math.nan if value is None else value)
+
+    def column(self, name):
+        """
+        :return: the column as numpy array, sharing the memory of the column
+        """
+        values = self.usage[name] if name in self.usage else getattr(self, name)
+        return numpy.frombuffer(values, dtype=values.typecode) if len(values) else numpy.array([], values.typecode)
+
+    def valid(self):
+        """
+        :return: boolean numpy array, true for the runs that completed, see SingleRunResult.is_valid
+        """
+        return (self.column('timeout') == 0) & (self.column('out_of_memory') == 0)
+
+    def row(self, i):
+        """
+        :return: the i-th result as SingleRunResult
+        """
+        result = SingleRunResult(self.config_names[self.config[i]], self.files[self.file[i]])
+        result.repetition = None if self.repetition[i] == MISSING else self.repetition[i]
+        result.time_elapsed = None if math.isnan(self.time[i]) else self.time[i]
+        result.return_code = None if self.return_code[i] == MISSING else self.return_code[i]
+        result.leftover_processes = self.leftover_processes[i]
+        result.timeout_occurred = bool(self.timeout[i])
+        result.out_of_memory = bool(self.out_of_memory[i])
+        result.cached = bool(self.cached[i])
+        for attribute, values in self.usage.items():
+            value = values[i]
+            if math.isnan(value):
+                value = None
+            elif attribute in INTEGER_USAGE_ATTRIBUTES:
+                value = int(value)
+            setattr(result, attribute, value)
+        return result
+
 
 class RunResult:
     """
     Collection of all results for a single run configuration.
+
+    Single run results are not kept in memory, but appended to a journal as soon as
+    they are added. The aggregated results are computed from the journal, which is
+    loaded into ResultColumns.
     """
 
-    def __init__(self):
-        self.file_to_result = {}
-        self.file_to_sorted_result = {}
-        self.file_to_result_avg = {}
+    def __init__(self, journal):
+        self.journal = journal
+        self.columns = None
+        # Rows of 'columns' in the job order, see process_timings
+        self.sorted_rows = None
+        # File to run configuration to the rows of its results in 'columns', sorted by repetition
+        self.file_to_sorted_rows = {}
+        self.file_to_statistics = {}
+        # Boolean arrays aligned with the rows of 'columns'
+        self.outlier = None
+        self.warmup = None
+        self.file_to_warmup_runs = {}
+        self.file_to_usage_avg = {}
         self.n_measurements = 0
         self.n_timeouts = 0
+        self.n_out_of_memory = 0
         self.n_errors = 0
+        self.lock = threading.Lock()
 
     def add_results(self, single_results):
-        for result in single_results:
-            self.n_measurements += 1
-            if result.timeout_occurred:
-                self.n_timeouts += 1
-            # if result.return_code:
-            #     self.n_errors += 1
-
-            if result.input_file not in self.file_to_result:
-                self.file_to_result[result.input_file] = []
-
-            self.file_to_result[result.input_file].append(result)
-
-    def process_timings(self):
-        # calculate per config timings and avg.
-        for file_name, data in self.file_to_result.items():
-            config_to_avg_time = {}
-            config_to_time = {}
-
-            # collect all timings required
-            for res in data:
-                if res.config_name not in config_to_avg_time:
-                    config_to_avg_time[res.config_name] = []
-                    config_to_time[res.config_name] = []
-                config_to_time[res.config_name].append(res)
-                if not res.timeout_occurred: # and not res.return_code:
-                    config_to_avg_time[res.config_name].append(res.time_elapsed)
-
-            self.file_to_sorted_result[file_name] = config_to_time
-            # take the average
-            for config_name in config_to_avg_time:
-                if config_to_avg_time[config_name]:
-                    processed_result = mean(config_to_avg_time[config_name])
-                else:
-                    processed_result = "No valid data."
-                config_to_avg_time[config_name] = processed_result
-            self.file_to_result_avg[file_name] = config_to_avg_time
+        """
+        Records the single run results in the journal. Called by the job slots concurrently,
+        as soon as each run completes.
+        :return: None
+        """
+        with self.lock:
+            for result in single_results:
+                self.n_measurements += 1
+                if result.timeout_occurred:
+                    self.n_timeouts += 1
+                if result.out_of_memory:
+                    self.n_out_of_memory += 1
+                # if result.return_code:
+                #     self.n_errors += 1
+
+        self.journal.append(single_results)
+
+    def completed_jobs(self):
+        """
+        Determines the jobs recorded in the journal, e.g. by an interrupted benchmark.
+        Results recorded without repetition index are numbered in the order of the journal.
+        :return: dictionary from (input file, run configuration name, repetition) triples
+                 to the runtime of the job, or None if it timed out
+        """
+        completed = {}
+        counts = {}
+        for result in self.results():
+            key = (result.input_file, result.config_name)
+            repetition = result.repetition
+            if repetition is None:
+                repetition = counts.get(key, 0)
+            counts[key] = counts.get(key, 0) + 1
+            completed[key + (repetition,)] = result.time_elapsed if result.is_valid() else None
+        return completed
+
+    def results(self):
+        """
+        :return: generator of all single run results, in the order in which they were added
+        """
+        return self.journal.read()
+
+    def process_timings(self, warmups=None, job_order=None):
+        """
+        Groups the results by file and run configuration and computes the statistics of
+        the runtimes of the valid runs, for all groups at once. Warmup runs are excluded.
+        Unlike the averages of the resource usage, the medians, bootstrap intervals and
+        outliers need the whole sample of a group, hence are not aggregated online.
+        :param warmups: dictionary from run configuration name to its Warmup, if it has one
+        :param job_order: dictionary from (input file, run configuration name, repetition) triples
+                          to the position of the job, see ExecutionPlan.job_order, or None to keep
+                          the order of the journal, in which concurrent jobs appear as they finish.
+                          Results of jobs not in it come first, e.g. those before resuming.
+        :return: None
+        """
+        columns = ResultColumns()
+        ranks = array.array('q')
+        for result in self.results():
+            rank = -1
+            if job_order is not None:
+                rank = job_order.get((result.input_file, result.config_name, result.repetition), -1)
+            ranks.append(rank)
+            columns.append(result)
+        self.columns = columns
+        self.sorted_rows = numpy.argsort(numpy.frombuffer(ranks, dtype='q') if len(ranks) else
+                                         numpy.array([], 'q'), kind='stable')
+
+        # group results by file, in the order of their first occurrence in 'sorted_rows', and sort them by repetition
+        files = columns.column('file')
+        configs = columns.column('config')
+        file_positions = numpy.full(len(columns.files), len(columns), dtype='q')
+        numpy.minimum.at(file_positions, files[self.sorted_rows], numpy.arange(len(columns)))
+        order = numpy.lexsort((columns.column('repetition'), configs, file_positions[files]))
+        sorted_files = files[order]
+        sorted_configs = configs[order]
+        changes = (sorted_files[1:] != sorted_files[:-1]) | (sorted_configs[1:] != sorted_configs[:-1])
+        starts = numpy.flatnonzero(numpy.concatenate([[True], changes])) if len(order) else numpy.array([], int)
+        ends = numpy.append(starts[1:], len(order))
+        groups = [(columns.files[sorted_files[start]], columns.config_names[sorted_configs[start]], order[start:end])
+                  for start, end in zip(starts, ends)]
+        for file_name, config_name, rows in groups:
+            self.file_to_sorted_rows.setdefault(file_name, {})[config_name] = rows
+
+        # flag the warmup runs, None if the steady state was not detected, in which case no run is excluded
+        valid = columns.valid()
+        times = columns.column('time')
+        repetitions = columns.column('repetition')
+        self.warmup = numpy.zeros(len(columns), dtype=bool)
+        for file_name, config_name, rows in groups:
+            warmup = (warmups or {}).get(config_name)
+            n_warmup = 0
+            if warmup is not None:
+                n_warmup = warmup.warmup_runs([None if rep == MISSING else int(rep) for rep in repetitions[rows]],
+                                              times[rows], valid[rows])
+            self.file_to_warmup_runs.setdefault(file_name, {})[config_name] = n_warmup
+            self.warmup[rows[:n_warmup or 0]] = True
+
+        measured = [rows[valid[rows] & ~self.warmup[rows]] for _, _, rows in groups]
+        statistics, outliers = summarize([times[rows] for rows in measured])
+
+        self.outlier = numpy.zeros(len(columns), dtype=bool)
+        timeouts = columns.column('timeout') != 0
+        for i, (file_name, config_name, rows) in enumerate(groups):
+            summary = {'valid_runs': len(measured[i]),
+                       'timeouts': int(timeouts[rows[~self.warmup[rows]]].sum()),
+                       'warmup_runs': self.file_to_warmup_runs[file_name][config_name] or 0,
+                       'outliers': int(statistics['outliers'][i])}
+            for name in TIME_STATISTICS:
+                value = float(statistics[name][i])
+                summary[name] = None if math.isnan(value) else value
+            self.file_to_statistics.setdefault(file_name, {})[config_name] = summary
+
+            # flag the outliers among the valid runs that are not warmup runs
+            self.outlier[measured[i]] = outliers[i][:len(measured[i])]
+            self.file_to_usage_avg.setdefault(file_name, {})[config_name] = \
+                RunResult._average_usage(columns, measured[i])
+
+    def sorted_results(self):
+        """
+        :return: generator of all single run results, in the order of the job order given to
+                 process_timings, which must have been called
+        """
+        for row in self.sorted_rows:
+            yield self.columns.row(row)
+
+    def measured_rows(self, file_name, config_name):
+        """
+        :return: the rows of the results of a file and run configuration that are not warmup runs,
+                 sorted by repetition
+        """
+        rows = self.file_to_sorted_rows[file_name].get(config_name, numpy.array([], int))
+        return rows[~self.warmup[rows]]
+
+    @staticmethod
+    def _average_usage(columns, rows):
+        averages = {}
+        for attribute in USAGE_ATTRIBUTES:
+            values = columns.column(attribute)[rows]
+            running = RunningStats()
+            running.add_all(values[~numpy.isnan(values)])
+            average = running.result()
+            if average is not None and attribute in INTEGER_USAGE_ATTRIBUTES and average.is_integer():
+                # Formatted like the values themselves
+                average = int(average)
+            averages[attribute] = average
+        return averages
 
 
 class SingleRunResult:
@@ -60,7 +291,41 @@ class SingleRunResult:
     def __init__(self, config_name, file_name):
         self.config_name = config_name
         self.input_file = file_name
+        self.repetition = None
 
         self.timeout_occurred = None
+        self.out_of_memory = False
         self.return_code = None
         self.time_elapsed = None
+        self.leftover_processes = 0
+
+        self.user_time = None
+        self.system_time = None
+        self.peak_rss = None
+        self.voluntary_context_switches = None
+        self.involuntary_context_switches = None
+        self.average_parallelism = None
+        self.max_threads = None
+        self.max_children = None
+
+        self.cached = False
+
+    def set_usage(self, usage):
+        for attribute in USAGE_ATTRIBUTES:
+            setattr(self, attribute, getattr(usage, attribute))
+
+    def is_valid(self):
+        """
+        :return: True if the run completed, i.e. was not killed due to a timeout or its memory usage
+        """
+        return not self.timeout_occurred and not self.out_of_memory
+
+    def to_dict(self):
+        return dict(self.__dict__)
+
+    @staticmethod
+    def from_dict(data):
+        result = SingleRunResult(data['config_name'], data['input_file'])
+        for attribute, value in data.items():
+            setattr(result, attribute, value)
+        return result
@@ -1,14 +1,38 @@
+import math
 import os
+import socket
+import numpy
+from src.database import ResultDatabase
 from src.filewriter import FileWriter
+from src.result import USAGE_ATTRIBUTES, TIME_STATISTICS
+from src.stats import RunningStats
+from src.util import CURR_DATE
+from src.warmup import Warmup
+
+# Column headers of the runtime statistics, in the order of TIME_STATISTICS
+TIME_STATISTICS_HEADERS = ["average runtime [s]", "median runtime [s]", "runtime std dev [s]", "min runtime [s]",
+                           "runtime coefficient of variation", "runtime 95% ci lower [s]", "runtime 95% ci upper [s]"]
+
+# Confidence level of the intervals in the paired comparison
+PAIRED_CONFIDENCE = 0.95
+
+# Column headers of the resource usage attributes, in the order of USAGE_ATTRIBUTES
+USAGE_HEADERS = ["user time [s]", "system time [s]", "peak RSS [MiB]",
+                 "voluntary context switches", "involuntary context switches",
+                 "parallelism", "max threads", "max child processes"]
 
 class ResultProcessor:
     """
     Object encapsulation the logic to make sense of the collected results.
     """
 
-    def __init__(self, run_result, config):
+    def __init__(self, run_result, config, job_order=None):
+        """
+        :param job_order: order of the jobs the results are listed in, see RunResult.process_timings
+        """
         self.run_result = run_result
         self.config = config
+        self.job_order = job_order
         self.results_processed = False
 
     def write_result_files(self):
@@ -16,7 +40,7 @@ class ResultProcessor:
         Writes the various result files.
         """
         if not self.results_processed:
-            self.run_result.process_timings()
+            self.run_result.process_timings(self._warmups(), self.job_order)
 
         if self.config.get('results.individual_timings', None):
             self.write_result_csv()
@@ -27,72 +51,256 @@ class ResultProcessor:
         if self.config.get('results.avg_per_config_timings', None):
             self.write_avg_result_file()
 
+        if self.config.get('results.paired_comparison', None):
+            self.write_paired_comparison_file()
+
+        if self.config.get('results.database', None):
+            self.write_database()
+
+        if self._warmups():
+            self.write_warmup_file()
+
+    def _warmups(self):
+        """
+        :return: dictionary from run configuration name to its Warmup, for those with a 'warmup' property
+        """
+        warmups = {c.get('name'): Warmup.from_config(c) for c in self.config.get('run_configurations')}
+        return {name: warmup for name, warmup in warmups.items() if warmup is not None}
+
     def write_result_csv(self):
-        header = ["runtime [s]", "input file", "run configuration", "exit code", "timeout"]
-        data = [header]
-
-        # collect data
-        for results_per_file in self.run_result.file_to_result.values():
-            for result in results_per_file:
-                data.append([str(result.time_elapsed),
-                             result.input_file,
-                             result.config_name,
-                             str(result.return_code),
-                             str(result.timeout_occurred)])
-
-        # write data
         filename = os.path.join(self.config.get('results.path'), 
                                 self.config.get('results.individual_timings'))
         with FileWriter(filename) as writer:
-            writer.write_csv_data(data)
+            writer.write_csv_rows(self._result_rows())
+
+    def _result_rows(self):
+        yield ["runtime [s]", "input file", "run configuration", "exit code", "timeout"] + USAGE_HEADERS + \
+              ["cached", "out of memory", "leftover processes"]
+
+        for result in self.run_result.sorted_results():
+            yield [str(result.time_elapsed),
+                   result.input_file,
+                   result.config_name,
+                   str(result.return_code),
+                   str(result.timeout_occurred)] + \
+                ResultProcessor._usage_values(result.__dict__) + \
+                [str(result.cached), str(result.out_of_memory), str(result.leftover_processes)]
 
     def writer_per_config_file(self):
+        filename = os.path.join(self.config.get('results.path'), 
+                                self.config.get('results.per_config_timings'))
+        with FileWriter(filename) as writer:
+            writer.write_csv_rows(self._per_config_rows())
+
+    def _per_config_rows(self):
         # Assemble file header
         header = [c.get('name') for c in self.config.get('run_configurations')]
         header.sort()
-        header = [[name + ", runtime [s]", name + ", exit condition", name + ", timeout"] for name in header]
+        header = [[name + ", runtime [s]", name + ", exit condition", name + ", timeout"] +
+                  [name + ", " + usage_header for usage_header in USAGE_HEADERS] +
+                  [name + ", cached", name + ", out of memory", name + ", leftover processes",
+                   name + ", outlier", name + ", warmup"]
+                  for name in header]
         # flatten
         header = [string for cfg_header in header for string in cfg_header]
         header.insert(0, "input file")
-        data = [header]
+        yield header
 
         config_names = [c.get('name') for c in self.config.get('run_configurations')]
         config_names.sort()
 
-        for file, cfg_dict in self.run_result.file_to_sorted_result.items():
-            for i in range(0, self.config.get('repetitions')):
+        columns_per_config = (len(header) - 1) // len(config_names)
+        columns = self.run_result.columns
+
+        for file, cfg_dict in self.run_result.file_to_sorted_rows.items():
+            # The number of repetitions may differ between configs, e.g. with adaptive repetitions
+            n_rows = max(len(rows) for rows in cfg_dict.values())
+            for i in range(0, n_rows):
                 values = [file]
                 for name in config_names:
-                    curr_result = cfg_dict[name][i]
+                    rows = cfg_dict.get(name, [])
+                    if i >= len(rows):
+                        values.extend([""] * columns_per_config)
+                        continue
+                    curr_result = columns.row(rows[i])
                     values.append(str(curr_result.time_elapsed))
                     values.append(str(curr_result.return_code))
                     values.append(str(curr_result.timeout_occurred))
-                data.append(values)
+                    values.extend(ResultProcessor._usage_values(curr_result.__dict__))
+                    values.append(str(curr_result.cached))
+                    values.append(str(curr_result.out_of_memory))
+                    values.append(str(curr_result.leftover_processes))
+                    values.append(str(bool(self.run_result.outlier[rows[i]])))
+                    values.append(str(bool(self.run_result.warmup[rows[i]])))
+                yield values
 
+    def write_avg_result_file(self):
         filename = os.path.join(self.config.get('results.path'), 
-                                self.config.get('results.per_config_timings'))
+                                self.config.get('results.avg_per_config_timings'))
         with FileWriter(filename) as writer:
-            writer.write_csv_data(data)
+            writer.write_csv_rows(self._avg_rows())
 
-    def write_avg_result_file(self):
+    def _avg_rows(self):
         header = [c.get('name') for c in self.config.get('run_configurations')]
         header.sort()
-        header = [name + ", average runtime [s]" for name in header]
+        header = [[name + ", valid runs", name + ", timeouts", name + ", warmup runs"] +
+                  [name + ", " + statistic_header for statistic_header in TIME_STATISTICS_HEADERS] +
+                  [name + ", outliers"] +
+                  [name + ", average " + usage_header for usage_header in USAGE_HEADERS]
+                  for name in header]
+        # flatten
+        header = [string for cfg_header in header for string in cfg_header]
         header.insert(0, "input file")
-        data = [header]
+        yield header
 
-        # write per config average timings csv
+        # write per config statistics csv
         config_names = [c.get('name') for c in self.config.get('run_configurations')]
         config_names.sort()
 
-        for file, cfg_dict in self.run_result.file_to_result_avg.items():
+        columns_per_config = (len(header) - 1) // len(config_names)
+
+        for file, cfg_dict in self.run_result.file_to_statistics.items():
             values = [file]
+            usage_dict = self.run_result.file_to_usage_avg[file]
             for name in config_names:
-                curr_result = cfg_dict[name]
-                values.append(str(curr_result))
-            data.append(values)
+                if name not in cfg_dict:
+                    values.extend([""] * columns_per_config)
+                    continue
+                statistics = cfg_dict[name]
+                values.append(str(statistics['valid_runs']))
+                values.append(str(statistics['timeouts']))
+                values.append(str(statistics['warmup_runs']))
+                values.extend("" if statistics[statistic] is None else str(statistics[statistic])
+                              for statistic in TIME_STATISTICS)
+                values.append(str(statistics['outliers']))
+                values.extend(ResultProcessor._usage_values(usage_dict[name]))
+            yield values
 
-        filename = os.path.join(self.config.get('results.path'), 
-                                self.config.get('results.avg_per_config_timings'))
+    def write_paired_comparison_file(self):
+        """
+        Compares each pair of run configurations A and B on the runs with the same file and
+        repetition, which are executed next to each other with an interleaved or random order.
+        Pairs with a warmup run are skipped.
+        Per file and over all files, the geometric mean of the runtime ratios B/A is reported
+        with a confidence interval, which is computed from the logarithms of the ratios.
+        """
+        filename = os.path.join(self.config.get('results.path'),
+                                self.config.get('results.paired_comparison'))
         with FileWriter(filename) as writer:
-            writer.write_csv_data(data)
+            writer.write_csv_rows(self._paired_comparison_rows())
+
+    def _paired_comparison_rows(self):
+        yield ["run configuration A", "run configuration B", "input file", "pairs",
+               "geometric mean ratio B/A", "ci lower", "ci upper"]
+
+        config_names = [c.get('name') for c in self.config.get('run_configurations')]
+        config_names.sort()
+
+        for i, name_a in enumerate(config_names):
+            for name_b in config_names[i + 1:]:
+                all_log_ratios = RunningStats()
+                for file in self.run_result.file_to_sorted_rows:
+                    log_ratios = RunningStats()
+                    log_ratios.add_all(self._paired_log_ratios(self.run_result.measured_rows(file, name_a),
+                                                               self.run_result.measured_rows(file, name_b)))
+                    all_log_ratios.merge(log_ratios)
+                    yield [name_a, name_b, file] + ResultProcessor._ratio_values(log_ratios)
+                yield [name_a, name_b, "all files"] + ResultProcessor._ratio_values(all_log_ratios)
+
+    def write_warmup_file(self):
+        """
+        Reports per file and run configuration with a 'warmup' property how many runs were
+        warmup runs, excluded from the statistics, and the repetition that reached the
+        steady state, i.e. the first one included.
+        """
+        filename = os.path.join(self.config.get('results.path'), self.config.get('results.warmup'))
+        with FileWriter(filename) as writer:
+            writer.write_csv_rows(self._warmup_rows())
+
+    def _warmup_rows(self):
+        yield ["input file", "run configuration", "warmup detection", "warmup runs",
+               "steady state repetition", "warmup runtimes [s]"]
+        warmups = self._warmups()
+        columns = self.run_result.columns
+
+        for file, cfg_dict in self.run_result.file_to_sorted_rows.items():
+            for name in sorted(warmups):
+                rows = cfg_dict.get(name, [])
+                if len(rows) == 0:
+                    continue
+                n_warmup = self.run_result.file_to_warmup_runs[file][name]
+                if n_warmup is None:
+                    # Not reached, all runs are included
+                    steady_state = "not reached"
+                elif n_warmup < len(rows):
+                    steady_state = str(columns.row(rows[n_warmup]).repetition)
+                else:
+                    steady_state = ""
+                yield [file, name, warmups[name].detection, str(n_warmup or 0), steady_state,
+                       " ".join(str(columns.time[row]) for row in rows[:n_warmup or 0])]
+
+    def write_database(self):
+        """
+        Stores the campaign, with a copy of its configuration file, and all single run results
+        in the results database.
+        """
+        filename = self.config.get('results.database')
+        config_file = self.config.config_copy_filename
+        config_text = None
+        if config_file:
+            with open(config_file) as fh:
+                config_text = fh.read()
+
+        database = ResultDatabase(filename)
+        try:
+            database.store_campaign(self.config.get('results.path'), CURR_DATE, socket.gethostname(),
+                                    os.path.basename(config_file or ""), config_text, self.run_result.results())
+        finally:
+            database.close()
+        print("Stored results in database '{}'".format(filename))
+
+    def _paired_log_ratios(self, rows_a, rows_b):
+        """
+        :return: numpy array of the logarithms of the runtime ratios B/A of the pairs of valid runs
+                 with the same repetition
+        """
+        columns = self.run_result.columns
+        times = columns.column('time')
+        repetitions = columns.column('repetition')
+        usable = columns.valid() & (times > 0)
+        rows_a = rows_a[usable[rows_a]]
+        rows_b = rows_b[usable[rows_b]]
+        _, pairs_a, pairs_b = numpy.intersect1d(repetitions[rows_a], repetitions[rows_b], return_indices=True)
+        return numpy.log(times[rows_b[pairs_b]] / times[rows_a[pairs_a]])
+
+    @staticmethod
+    def _ratio_values(log_ratios):
+        """
+        :param log_ratios: RunningStats of the logarithms of the runtime ratios
+        :return: number of pairs, geometric mean ratio and its confidence interval, as strings
+        """
+        if log_ratios.count == 0:
+            return ["0", "", "", ""]
+        values = [str(log_ratios.count), str(math.exp(log_ratios.mean))]
+        interval = log_ratios.confidence_interval(PAIRED_CONFIDENCE)
+        if interval is None:
+            return values + ["", ""]
+        return values + [str(math.exp(interval[0])), str(math.exp(interval[1]))]
+
+    @staticmethod
+    def _usage_values(usage):
+        """
+        Formats the resource usage attributes for the CSV files.
+        :param usage: dictionary from resource usage attributes to values
+        :return: list of strings, in the order of USAGE_HEADERS
+        """
+        values = []
+        for attribute in USAGE_ATTRIBUTES:
+            value = usage[attribute]
+            if value is None:
+                values.append("")
+            elif attribute == 'peak_rss':
+                values.append(str(value / 2**20))
+            else:
+                values.append(str(value))
+        return values
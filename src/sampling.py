@@ -0,0 +1,96 @@
+import math
+import os
+import random
+from statistics import mean
+
+# Number of alternative subsets drawn to estimate how well a subset tracks the full corpus
+TRACKING_DRAWS = 200
+
+
+class StratifiedSampler:
+    """
+    Selects a representative subset of the input files for a quick benchmark.
+
+    The files are divided into strata by their directory and, if runtimes of earlier
+    benchmarks are known, by runtime bucket (quantiles of the estimated runtime). Each
+    stratum contributes to the subset in proportion to its size, and at least one file
+    if the subset is large enough; the files within a stratum are drawn at random.
+    """
+
+    def __init__(self, files, base_dir, weights=None, buckets=4, depth=1):
+        """
+        :param base_dir: directory the directory strata are relative to
+        :param weights: dictionary from file to its estimated runtime, or None
+        :param buckets: number of runtime buckets, used if 'weights' is given
+        :param depth: number of directory levels that distinguish strata
+        """
+        self.files = sorted(set(files))
+        self.stratum_of = {}
+        bounds = []
+        if weights:
+            ordered = sorted(weights[file] for file in self.files)
+            bounds = [ordered[len(ordered) * i // buckets] for i in range(1, buckets)]
+        for file in self.files:
+            directory = os.path.relpath(os.path.dirname(file), base_dir)
+            parts = [] if directory == os.curdir else directory.split(os.sep)
+            bucket = sum(1 for bound in bounds if weights[file] >= bound) if weights else 0
+            self.stratum_of[file] = (os.sep.join(parts[:depth]), bucket)
+        self.strata = {}
+        for file in self.files:
+            self.strata.setdefault(self.stratum_of[file], []).append(file)
+
+    def draw(self, size, rng):
+        """
+        :param size: number of files of the subset
+        :param rng: random.Random to draw the files with
+        :return: set of the selected files
+        """
+        size = min(size, len(self.files))
+        keys = sorted(self.strata)
+        allocation = {key: 0 for key in keys}
+        if size >= len(keys):
+            allocation = {key: 1 for key in keys}
+        remaining = size - sum(allocation.values())
+        spare = {key: len(self.strata[key]) - allocation[key] for key in keys}
+        total_spare = sum(spare.values())
+        if remaining > 0 and total_spare > 0:
+            # Largest remainder method, proportional to the files not allocated yet
+            quotas = {key: remaining * spare[key] / total_spare for key in keys}
+            for key in keys:
+                allocation[key] += int(quotas[key])
+            leftover = size - sum(allocation.values())
+            for key in sorted(keys, key=lambda k: (-(quotas[k] - int(quotas[k])), k))[:leftover]:
+                allocation[key] += 1
+
+        selected = set()
+        for key in keys:
+            selected.update(rng.sample(self.strata[key], allocation[key]))
+        return selected
+
+    def tracking(self, selected, size, seed, log_ratios):
+        """
+        Estimates how well the geometric mean runtime ratio of two run configurations on
+        a subset tracks that on all files, by drawing alternative subsets the same way.
+        :param selected: the selected subset
+        :param log_ratios: dictionary from file to the logarithm of its runtime ratio, for the files where known
+        :return: None if no file of the subset has a known ratio, otherwise a tuple (ratio on
+                 all files, ratio on the subset, relative error of the subset, pair of the 2.5% and
+                 97.5% quantiles of the relative errors of alternative subsets)
+        """
+        if not any(file in log_ratios for file in selected):
+            return None
+        full = mean(log_ratios.values())
+
+        def relative_error(subset):
+            known = [log_ratios[file] for file in subset if file in log_ratios]
+            return math.exp(mean(known) - full) - 1 if known else None
+
+        errors = []
+        for draw in range(0, TRACKING_DRAWS):
+            error = relative_error(self.draw(size, random.Random(seed * 1000003 + draw + 1)))
+            if error is not None:
+                errors.append(error)
+        errors.sort()
+        quantiles = (errors[int(0.025 * (len(errors) - 1))], errors[int(0.975 * (len(errors) - 1))])
+        subset = [log_ratios[file] for file in selected if file in log_ratios]
+        return math.exp(full), math.exp(mean(subset)), relative_error(selected), quantiles
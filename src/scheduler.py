@@ -0,0 +1,230 @@
+import contextlib
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class Round:
+    """
+    The repetitions of one run configuration on one input file, surrounded by the
+    pre and post round commands of that run configuration.
+    """
+
+    def __init__(self, file, run_config, repetitions, previous_results=(), files=None):
+        self.file = file
+        self.run_config = run_config
+        # Input files of a batch round, each of whose jobs runs all of them in one invocation;
+        # 'file' then only labels the round
+        self.files = files
+        # Number of the round's first job, see Scheduler.number_jobs
+        self.first_job = None
+        self.repetitions = repetitions
+        # Runtimes (None for timeouts) of the repetitions completed by an interrupted benchmark
+        self.previous_results = previous_results
+        # Estimated runtime of all repetitions, if known
+        self.estimate = None
+
+
+class RoundCommandLock:
+    """
+    Serializes the pre and post round commands with the jobs of the other job slots: a
+    command, e.g. one killing all solver instances or restarting a server, runs exclusively,
+    i.e. after the running jobs finished and before further jobs start, while jobs share the
+    lock with each other. Waiting commands take precedence over jobs that want to start.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.jobs = 0
+        self.commands_waiting = 0
+        self.command_running = False
+
+    @contextlib.contextmanager
+    def shared(self):
+        with self.condition:
+            self.condition.wait_for(lambda: not self.command_running and not self.commands_waiting)
+            self.jobs += 1
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.jobs -= 1
+                self.condition.notify_all()
+
+    @contextlib.contextmanager
+    def exclusive(self):
+        with self.condition:
+            self.commands_waiting += 1
+            try:
+                self.condition.wait_for(lambda: not self.command_running and not self.jobs)
+            finally:
+                self.commands_waiting -= 1
+            self.command_running = True
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.command_running = False
+                self.condition.notify_all()
+
+
+class Scheduler:
+    """
+    Dispatches rounds to a fixed number of concurrent job slots.
+
+    A round is the unit of dispatch, hence pre and post round commands are always
+    executed around their own round, in the same slot. If requested, each slot is
+    pinned to a disjoint set of CPUs. Results are handed back as soon as their round
+    finishes, such that a long round does not hold back those after it.
+    """
+
+    def __init__(self, jobs, pin_cpus):
+        self.jobs = jobs
+        self.slot_cpus = [None] * jobs
+        if pin_cpus and jobs > 1:
+            self.slot_cpus = Scheduler.partition_cpus(jobs)
+
+    @staticmethod
+    def can_pin_cpus():
+        return hasattr(os, 'sched_setaffinity') and hasattr(os, 'sched_getaffinity')
+
+    @staticmethod
+    def available_cpus():
+        if hasattr(os, 'sched_getaffinity'):
+            return sorted(os.sched_getaffinity(0))
+        return list(range(os.cpu_count() or 1))
+
+    @staticmethod
+    def partition_cpus(slots):
+        """
+        Splits the CPUs available to this process into 'slots' disjoint, contiguous
+        sets of (almost) equal size.
+        :return: list of CPU sets, one per slot
+        """
+        cpus = Scheduler.available_cpus()
+        size, remainder = divmod(len(cpus), slots)
+        partition = []
+        start = 0
+        for slot in range(slots):
+            end = start + size + (1 if slot < remainder else 0)
+            partition.append(set(cpus[start:end]))
+            start = end
+        return partition
+
+    @staticmethod
+    def order_longest_first(rounds, history):
+        """
+        Estimates the runtime of each round from the history and sorts the rounds by
+        decreasing estimate, such that long rounds do not straggle at the end.
+        :param history: RuntimeHistory of earlier benchmarks
+        :return: the sorted rounds
+        """
+        for rnd in rounds:
+            rnd.estimate = sum(history.estimate(file, rnd.run_config.get('name'))
+                               for file in rnd.files or [rnd.file]) * len(rnd.repetitions)
+        return sorted(rounds, key=lambda rnd: rnd.estimate, reverse=True)
+
+    @staticmethod
+    def shard_files(files, index, count, weights=None):
+        """
+        Partitions the input files into 'count' shards deterministically, i.e. independently
+        of the order in which the files were found. Files are assigned by decreasing weight
+        to the shard with the least total weight, such that the shards take about equally long.
+        :param index: the shard to return, starting at 0
+        :param weights: dictionary from file to its estimated runtime, or None to balance the number of files
+        :return: the files of the shard, in their original order
+        """
+        loads = [0.0] * count
+        assignment = {}
+        for file in sorted(set(files), key=lambda f: (-(weights[f] if weights else 1.0), f)):
+            shard = loads.index(min(loads))
+            assignment[file] = shard
+            loads[shard] += weights[file] if weights else 1.0
+        return [file for file in files if assignment[file] == index]
+
+    @staticmethod
+    def order_interleaved(rounds, rng=None):
+        """
+        Splits the rounds into single repetitions and interleaves the run configurations:
+        for each file, the i-th repetitions of all run configurations form a block that is
+        executed back to back, i.e. A B A B ... Executing the runs of a block next to each
+        other cancels out drift, e.g. due to thermal throttling, when comparing them.
+        :param rng: random.Random to shuffle the files and the runs within each block, or None
+        :return: list of rounds with a single repetition each
+        """
+        file_to_blocks = {}
+        for rnd in rounds:
+            blocks = file_to_blocks.setdefault(rnd.file, {})
+            for rep in rnd.repetitions:
+                blocks.setdefault(rep, []).append(Round(rnd.file, rnd.run_config, [rep], rnd.previous_results,
+                                                        rnd.files))
+
+        files = list(file_to_blocks)
+        if rng is not None:
+            rng.shuffle(files)
+
+        interleaved = []
+        for file in files:
+            blocks = file_to_blocks[file]
+            for rep in sorted(blocks):
+                block = blocks[rep]
+                if rng is not None:
+                    rng.shuffle(block)
+                interleaved.extend(block)
+        return interleaved
+
+    @staticmethod
+    def number_jobs(rounds):
+        """
+        Numbers the jobs of the rounds consecutively, in the order of the rounds. A job of a
+        batch round counts once per file, like the results it yields.
+        :return: None
+        """
+        i = 1
+        for rnd in rounds:
+            rnd.first_job = i
+            i += len(rnd.repetitions) * (len(rnd.files) if rnd.files else 1)
+
+    def run(self, rounds, execute):
+        """
+        Executes all rounds and yields their results in the order in which the rounds finish.
+        :param rounds: the rounds to execute
+        :param execute: function taking a round and a slot index and returning the results of the round
+        :return: generator of round results
+        """
+        if self.jobs == 1:
+            for rnd in rounds:
+                yield execute(rnd, 0)
+            return
+
+        free_slots = queue.Queue()
+        for slot in range(self.jobs):
+            free_slots.put(slot)
+
+        def run_in_slot(rnd):
+            slot = free_slots.get()
+            try:
+                self.pin_current_thread(slot)
+                return execute(rnd, slot)
+            finally:
+                free_slots.put(slot)
+
+        executor = ThreadPoolExecutor(max_workers=self.jobs)
+        futures = [executor.submit(run_in_slot, rnd) for rnd in rounds]
+        try:
+            for future in as_completed(futures):
+                yield future.result()
+        finally:
+            # Only relevant if a round failed or the user interrupted the benchmark. The running
+            # rounds are not waited for; their jobs are killed when the containment is closed.
+            for future in futures:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    def pin_current_thread(self, slot):
+        # On Linux, the affinity mask is set per thread and inherited by all processes
+        # started from that thread.
+        cpus = self.slot_cpus[slot]
+        if cpus:
+            os.sched_setaffinity(0, cpus)
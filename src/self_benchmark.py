@@ -0,0 +1,419 @@
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from statistics import median
+import psutil
+from src.config import Config
+from src.containment import create_containment
+from src.filewriter import FileWriter
+from src.journal import ResultJournal
+from src.plan import JobRecord
+from src.process_runner import ProcessRunner
+from src.result import RunResult, SingleRunResult
+from src.result_processor import ResultProcessor
+from src.util import CURR_DATE, replace_placeholders, require
+
+"""
+Benchmarks of the runner itself: how long it takes to start, wait for and kill the
+processes of a job, how fast it substitutes placeholders and writes result files, and
+how many jobs per second it gets through. Synthetic commands are used throughout, such
+that the numbers reflect the harness and not a verifier.
+"""
+
+# Version of the JSON report
+REPORT_VERSION = 1
+
+# Shell script that starts a chain of $1 nested shells, each appending its PID to the file $2
+# and then sleeping; the script is passed on as $0 to start the next level
+FORK_TREE_SCRIPT = 'echo $$ >> "$2"; if [ "$1" -gt 0 ]; then sh -c "$0" "$0" "$(($1 - 1))" "$2" & fi; exec sleep 1000'
+
+# Shell script that keeps one CPU busy for $0 loop iterations
+CPU_SPINNER_SCRIPT = 'i=0; while [ $i -lt "$0" ]; do i=$((i + 1)); done'
+
+# Time in seconds to wait for the processes of a killed tree to disappear
+KILL_WAIT_LIMIT = 5.0
+
+# Changes of time metrics (in seconds) below this value are considered noise when comparing reports
+NOISE_FLOOR = 0.0005
+
+# Runs of each variant per sample of a metric relative to a reference run, see _interleaved_minima
+INTERLEAVED_RUNS = 3
+
+
+def _summary(samples, unit, better="lower"):
+    """
+    :param better: "lower" or "higher", the direction in which the metric improves
+    :return: dictionary describing the distribution of the samples
+    """
+    return {'unit': unit, 'better': better, 'samples': len(samples), 'median': median(samples),
+            'min': min(samples), 'max': max(samples)}
+
+
+def _interleaved_minima(variants, runs=INTERLEAVED_RUNS):
+    """
+    Runs each variant 'runs' times, rotating the order of the variants in each round, such
+    that neither always runs first, e.g. right after a cache-cold start, and drifts of the
+    machine affect all variants alike. The minimum is the least disturbed run of a variant.
+    :param variants: list of functions, each running a variant and returning its time in seconds
+    :return: list of the minimum time of each variant
+    """
+    minima = [float('inf')] * len(variants)
+    for i in range(runs):
+        for j in range(len(variants)):
+            variant = (i + j) % len(variants)
+            minima[variant] = min(minima[variant], variants[variant]())
+    return minima
+
+
+def _quiet():
+    """
+    :return: context manager that swallows the progress output of the runner
+    """
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+class SelfBenchmark:
+    """
+    Runs the benchmarks of the suite, see BENCHMARKS, and collects their metrics.
+    """
+
+    # Names of the benchmarks, in the order in which they are run
+    BENCHMARKS = ['spawn', 'exit_detection', 'kill', 'placeholders', 'csv', 'output_flood', 'cpu_spinner',
+                  'end_to_end']
+
+    def __init__(self, repetitions, containment_mode="auto", jobs=1):
+        """
+        :param repetitions: number of samples per metric
+        :param containment_mode: containment of the jobs, as the configuration property 'containment'
+        :param jobs: number of job slots of the end-to-end benchmark
+        """
+        require(os.name == 'posix', "The self-benchmark requires a POSIX system")
+        for program in ["sh", "sleep", "echo", "head", "true"]:
+            require(shutil.which(program), "The self-benchmark requires the program '{}'".format(program))
+        self.repetitions = repetitions
+        self.containment_mode = containment_mode
+        self.jobs = jobs
+        self.containment = None
+
+    def run(self, names=None):
+        """
+        :param names: names of the benchmarks to run, defaults to all
+        :return: the report, a JSON-serializable dictionary
+        """
+        with _quiet():
+            self.containment = create_containment(self.containment_mode)
+        metrics = {}
+        try:
+            for name in names or SelfBenchmark.BENCHMARKS:
+                print("Running self-benchmark '{}'...".format(name))
+                start = time.perf_counter()
+                metrics.update(getattr(self, "_" + name)())
+                print("  done in {:.1f} s".format(time.perf_counter() - start))
+        finally:
+            if self.containment is not None:
+                self.containment.close()
+
+        return {'version': REPORT_VERSION, 'date': CURR_DATE, 'host': socket.gethostname(),
+                'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count(),
+                'containment': self.containment.name if self.containment is not None else "none",
+                'repetitions': self.repetitions, 'metrics': metrics}
+
+    def _spawn(self):
+        """
+        Time from starting a job until the executed program runs, i.e. until 'echo' wrote
+        its first byte. Includes the containment's wrapper, e.g. moving into a cgroup.
+        """
+        samples = []
+        for _ in range(self.repetitions):
+            job = self.containment.new_job(None) if self.containment is not None else None
+            command = [shutil.which("echo"), "x"]
+            popen_kwargs = {}
+            if job is not None:
+                command = job.command(command)
+                popen_kwargs = job.popen_kwargs()
+            start = time.perf_counter()
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, **popen_kwargs)
+            process.stdout.read(1)
+            samples.append(time.perf_counter() - start)
+            if job is not None:
+                job.started(process)
+            process.stdout.close()
+            process.wait()
+            if job is not None:
+                job.cleanup([])
+        return {'spawn_to_exec_latency': _summary(samples, "s")}
+
+    def _exit_detection(self):
+        """
+        Delay until ProcessRunner.run notices that the process exited, measured against a
+        blocking wait for the same short-lived command, see _interleaved_minima. Also reports
+        the total time of a job running 'true', which is what the calibration runs of a
+        benchmark measure.
+        """
+        command = ["sleep", "0.05"]
+        delays = []
+        null_job_times = []
+
+        def reference():
+            start = time.perf_counter()
+            subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).wait()
+            return time.perf_counter() - start
+
+        def measured():
+            with _quiet():
+                return ProcessRunner.run(command, 0, subprocess.DEVNULL, subprocess.DEVNULL).time_elapsed
+
+        for _ in range(self.repetitions):
+            reference_time, measured_time = _interleaved_minima([reference, measured])
+            delays.append(measured_time - reference_time)
+            with _quiet():
+                null_result = ProcessRunner.run([shutil.which("true")], 0, subprocess.DEVNULL,
+                                                subprocess.DEVNULL, self.containment)
+            null_job_times.append(null_result.time_elapsed)
+        return {'exit_detection_delay': _summary(delays, "s"), 'null_job_time': _summary(null_job_times, "s")}
+
+    def _kill(self, depth=16, timeout=0.5):
+        """
+        Time from the timeout of a job until all processes of its tree, a chain of 'depth'
+        nested shells, are gone. Processes that survive the kill are counted.
+        """
+        latencies = []
+        tree_sizes = []
+        survivors = 0
+        with tempfile.TemporaryDirectory() as directory:
+            for i in range(self.repetitions):
+                pid_file = os.path.join(directory, "pids-{}".format(i))
+                command = ["sh", "-c", FORK_TREE_SCRIPT, FORK_TREE_SCRIPT, str(depth), pid_file]
+                with _quiet():
+                    result = ProcessRunner.run(command, timeout, subprocess.DEVNULL, subprocess.DEVNULL,
+                                               self.containment)
+                returned = time.perf_counter()
+                require(result.timeout_occurred, "The fork tree of the self-benchmark exited before the timeout")
+
+                with open(pid_file) as fh:
+                    pids = [int(line) for line in fh if line.strip()]
+                tree_sizes.append(len(pids))
+                processes = []
+                for pid in pids:
+                    try:
+                        processes.append(psutil.Process(pid))
+                    except psutil.NoSuchProcess:
+                        pass
+                while processes and time.perf_counter() - returned < KILL_WAIT_LIMIT:
+                    processes = [p for p in processes if SelfBenchmark._alive(p)]
+                    if processes:
+                        time.sleep(0.0005)
+                gone = time.perf_counter()
+                survivors += len(processes)
+                for process in processes:
+                    process.kill()
+                # The run returned right after its end time, which is 'timeout' after its start
+                latencies.append(gone - returned + result.time_elapsed - timeout)
+        return {'timeout_to_tree_killed': _summary(latencies, "s"),
+                'fork_tree_processes': _summary(tree_sizes, "processes", better="higher"),
+                'fork_tree_survivors': _summary([survivors], "processes")}
+
+    @staticmethod
+    def _alive(process):
+        try:
+            return process.is_running() and process.status() != psutil.STATUS_ZOMBIE
+        except psutil.NoSuchProcess:
+            return False
+
+    def _placeholders(self, calls=20000):
+        """
+        Throughput of replace_placeholders on the parts of a typical verifier command.
+        """
+        parts = ["java", "-Xss128m", "-jar", "silicon.jar", "--z3Exe", "z3", "@file_name@", "--port", "@port@",
+                 "--logLevel", "ERROR", "results/@date@/@config_name@/@path_name@-@rep@.log"]
+        samples = []
+        for _ in range(self.repetitions):
+            start = time.perf_counter()
+            for i in range(calls // len(parts)):
+                for part in parts:
+                    replace_placeholders(part, file="tests/all/issues/silicon/0123.vpr", repetition=i,
+                                         config_name="silicon")
+            samples.append((calls // len(parts)) * len(parts) / (time.perf_counter() - start))
+        return {'placeholder_throughput': _summary(samples, "calls/s", better="higher")}
+
+    def _csv(self, rows=20000, files=50, configs=2, repetitions=50):
+        """
+        Throughput of the CSV writer, and of processing a journal into all result files.
+        """
+        row = ["{:.6f}".format(0.123456 * i) for i in range(20)]
+        row_samples = []
+        result_samples = []
+        with tempfile.TemporaryDirectory() as directory:
+            for i in range(self.repetitions):
+                start = time.perf_counter()
+                with FileWriter(os.path.join(directory, "rows.csv")) as writer:
+                    writer.write_csv_rows(row for _ in range(rows))
+                row_samples.append(rows / (time.perf_counter() - start))
+
+            config = self._csv_config(directory, configs)
+            journal_file = os.path.join(directory, "journal.jsonl")
+            journal = ResultJournal(journal_file)
+            for file in range(files):
+                for config_name in ["config{}".format(c) for c in range(configs)]:
+                    journal.append([self._synthetic_result("tests/file{}.vpr".format(file), config_name, rep)
+                                    for rep in range(repetitions)])
+            journal.close()
+            n_results = files * configs * repetitions
+            for i in range(self.repetitions):
+                start = time.perf_counter()
+                with _quiet():
+                    ResultProcessor(RunResult(ResultJournal(journal_file)), config).write_result_files()
+                result_samples.append(n_results / (time.perf_counter() - start))
+        return {'csv_writer_throughput': _summary(row_samples, "rows/s", better="higher"),
+                'result_processing_throughput': _summary(result_samples, "results/s", better="higher")}
+
+    @staticmethod
+    def _csv_config(directory, configs):
+        config_file = os.path.join(directory, "csv.conf")
+        run_configurations = ", ".join('{{ name = "config{}", command = ["true"] }}'.format(c) for c in range(configs))
+        with open(config_file, "w") as fh:
+            fh.write('test_folder = "tests"\nrepetitions = 1\ntimeout = 1\npin_cpus = false\n'
+                     'results = {{ path = "{}", individual_timings = "timings.csv", per_config_timings = '
+                     '"per_config.csv", avg_per_config_timings = "avg.csv", paired_comparison = "paired.csv" }}\n'
+                     'run_configurations = [ {} ]\n'.format(os.path.join(directory, "results"), run_configurations))
+        config = Config()
+        with _quiet():
+            config.read_config_file(config_file)
+        return config
+
+    @staticmethod
+    def _synthetic_result(file, config_name, repetition):
+        result = SingleRunResult(config_name, file)
+        result.repetition = repetition
+        result.timeout_occurred = False
+        result.return_code = 0
+        result.time_elapsed = 1.0 + 0.01 * ((repetition * 7919 + len(file)) % 13)
+        result.user_time = 0.9
+        result.system_time = 0.05
+        result.peak_rss = 200 * 2**20
+        result.voluntary_context_switches = 100
+        result.involuntary_context_switches = 10
+        return result
+
+    def _output_flood(self, size=32 * 2**20):
+        """
+        Time of a job that writes 'size' bytes to stdout, discarded or captured (and
+        compressed) as for the output archive.
+        """
+        command = ["head", "-c", str(size), "/dev/zero"]
+        discarded = []
+        captured = []
+        for _ in range(self.repetitions):
+            with _quiet():
+                discarded.append(ProcessRunner.run(command, 0, subprocess.DEVNULL, subprocess.DEVNULL,
+                                                   self.containment).time_elapsed)
+                captured.append(ProcessRunner.run(command, 0, subprocess.PIPE, subprocess.PIPE,
+                                                  self.containment).time_elapsed)
+        return {'output_flood_discarded_throughput': _summary([size / 2**20 / t for t in discarded], "MiB/s",
+                                                              better="higher"),
+                'output_flood_captured_throughput': _summary([size / 2**20 / t for t in captured], "MiB/s",
+                                                             better="higher")}
+
+    def _cpu_spinner(self, iterations=100000, timeline_interval=0.01):
+        """
+        Slowdown of a CPU-bound job by the sampling of its process tree, with the default
+        sampling and with a fine-grained resource timeline, relative to a blocking wait,
+        see _interleaved_minima.
+        """
+        command = ["sh", "-c", CPU_SPINNER_SCRIPT, str(iterations)]
+        default_sampling = []
+        timeline_sampling = []
+
+        def reference():
+            start = time.perf_counter()
+            subprocess.Popen(command).wait()
+            return time.perf_counter() - start
+
+        def sampled(interval):
+            with _quiet():
+                return ProcessRunner.run(command, 0, subprocess.DEVNULL, subprocess.DEVNULL, self.containment,
+                                         timeline_interval=interval).time_elapsed
+
+        for _ in range(self.repetitions):
+            reference_time, default_time, timeline_time = _interleaved_minima(
+                [reference, lambda: sampled(None), lambda: sampled(timeline_interval)])
+            default_sampling.append(default_time / reference_time - 1)
+            timeline_sampling.append(timeline_time / reference_time - 1)
+        return {'cpu_spinner_sampling_slowdown': _summary(default_sampling, "ratio"),
+                'cpu_spinner_timeline_slowdown': _summary(timeline_sampling, "ratio")}
+
+    def _end_to_end(self, files=20, repetitions=5):
+        """
+        Jobs per second of the benchmark loop running 'true', and of a whole benchmark of
+        'true' with runner.py, including its start and the result files.
+        """
+        n_jobs = files * repetitions
+        loop_samples = []
+        runner_samples = []
+        runner = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runner.py")
+        with tempfile.TemporaryDirectory() as directory:
+            job_records = [JobRecord(rep, [shutil.which("true")]) for rep in range(n_jobs)]
+            for _ in range(self.repetitions):
+                start = time.perf_counter()
+                with _quiet():
+                    ProcessRunner.run_as_benchmark(job_records, "true", "null", 1, n_jobs, n_jobs, 0,
+                                                   subprocess.DEVNULL, subprocess.DEVNULL,
+                                                   containment=self.containment)
+                loop_samples.append(n_jobs / (time.perf_counter() - start))
+
+            os.makedirs(os.path.join(directory, "tests"))
+            for file in range(files):
+                open(os.path.join(directory, "tests", "file{}.vpr".format(file)), "w").close()
+            for i in range(self.repetitions):
+                # Each benchmark gets its own results folder
+                with open(os.path.join(directory, "end_to_end.conf"), "w") as fh:
+                    fh.write('test_folder = "tests"\nconfirm_start = false\nrepetitions = {}\ntimeout = 10\n'
+                             'jobs = {}\npin_cpus = false\ncalibration_runs = 0\ncontainment = "{}"\n'
+                             'results = {{ path = "results/{}", individual_timings = "timings.csv" }}\n'
+                             'run_configurations = [ {{ name = "null", command = ["true"] }} ]\n'
+                             .format(repetitions, self.jobs, self.containment_mode, i))
+                start = time.perf_counter()
+                process = subprocess.run([sys.executable, runner, "end_to_end.conf"], cwd=directory,
+                                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+                require(process.returncode == 0, "The end-to-end self-benchmark failed: {}"
+                        .format(process.stderr.decode(errors="replace")))
+                runner_samples.append(n_jobs / (time.perf_counter() - start))
+        return {'benchmark_loop_jobs_per_second': _summary(loop_samples, "jobs/s", better="higher"),
+                'runner_jobs_per_second': _summary(runner_samples, "jobs/s", better="higher")}
+
+
+def compare_reports(baseline, report, threshold):
+    """
+    Compares the medians of the metrics present in both reports.
+    :param threshold: relative change in the worse direction that is a regression, e.g. 0.2
+    :return: list of triples (metric name, baseline median, current median) of the regressions
+    """
+    regressions = []
+    for name, metric in sorted(report['metrics'].items()):
+        if name not in baseline['metrics']:
+            continue
+        before = baseline['metrics'][name]['median']
+        after = metric['median']
+        worse = after - before if metric['better'] == "lower" else before - after
+        if metric['unit'] == "s" and worse < NOISE_FLOOR:
+            continue
+        if worse > threshold * abs(before):
+            regressions.append((name, before, after))
+    return regressions
+
+
+def load_report(filename):
+    with open(filename) as fh:
+        report = json.load(fh)
+    require(report.get('version') == REPORT_VERSION,
+            "Self-benchmark report '{}' has version {}, expected {}".format(filename, report.get('version'),
+                                                                           REPORT_VERSION))
+    return report
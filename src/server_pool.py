@@ -0,0 +1,159 @@
+import json
+import subprocess
+import time
+import psutil
+from src.util import replace_placeholders
+
+
+class ServerError(Exception):
+    pass
+
+
+class VerifierServer:
+    """
+    A long-running verifier server, e.g. a Nailgun server hosting a verifier's fat jar,
+    listening on a fixed port.
+
+    The server is started and warmed up before its first job, health-checked before
+    each job, and restarted if it crashed, stopped responding, or served the
+    configured number of jobs.
+    """
+
+    def __init__(self, spec, port, stdout_fh, stderr_fh):
+        """
+        :param spec: the 'server' property of a run configuration
+        :param port: the port the server listens on, substituted for @port@
+        """
+        self.spec = spec
+        self.port = port
+        self.stdout_fh = stdout_fh
+        self.stderr_fh = stderr_fh
+        self.process = None
+        self.jobs_served = 0
+
+    def _command(self, key):
+        return [replace_placeholders(part, port=str(self.port)) for part in self.spec.get(key)]
+
+    def start(self):
+        command = self._command('command')
+        print("Starting server on port {}: '{}'".format(self.port, " ".join(command)))
+        self.process = subprocess.Popen(command, stdout=self.stdout_fh, stderr=self.stderr_fh)
+        self.jobs_served = 0
+
+        # Wait until the server is ready
+        deadline = time.perf_counter() + self.spec.get('startup_timeout', 60)
+        while not self.is_healthy():
+            if self.process.poll() is not None:
+                raise ServerError("Server on port {} exited with code {} during startup"
+                                  .format(self.port, self.process.returncode))
+            if time.perf_counter() > deadline:
+                self.stop()
+                raise ServerError("Server on port {} did not become ready in time".format(self.port))
+            time.sleep(0.1)
+
+        self._warm_up()
+
+    def _warm_up(self):
+        if not self.spec.get('warmup_command', None):
+            return
+        command = self._command('warmup_command')
+        for warmup_file in self.spec.get('warmup_files', []):
+            for _ in range(0, self.spec.get('warmup_repetitions', 1)):
+                print("Warming up server on port {} with '{}'".format(self.port, warmup_file))
+                return_code = subprocess.call(command + [warmup_file], stdout=self.stdout_fh, stderr=self.stderr_fh)
+                if return_code != 0:
+                    print("Warning: warmup of server on port {} with '{}' exited with code {}"
+                          .format(self.port, warmup_file, return_code))
+
+    def is_healthy(self):
+        """
+        :return: True if the server process is alive and the check command succeeds
+        """
+        if self.process is None or self.process.poll() is not None:
+            return False
+        try:
+            return_code = subprocess.call(self._command('check_command'),
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                          timeout=self.spec.get('check_timeout', 10))
+        except subprocess.TimeoutExpired:
+            return False
+        return return_code == 0
+
+    def ensure_ready(self):
+        """
+        Called before each job: (re)starts the server if necessary.
+        :return: None
+        """
+        restart_after_jobs = self.spec.get('restart_after_jobs', 0)
+        if self.process is None:
+            self.start()
+        elif restart_after_jobs > 0 and self.jobs_served >= restart_after_jobs:
+            print("Restarting server on port {} after {} jobs".format(self.port, self.jobs_served))
+            self.stop()
+            self.start()
+        elif not self.is_healthy():
+            print("Server on port {} crashed or is not responding, restarting it".format(self.port))
+            self.stop()
+            self.start()
+
+    def job_done(self):
+        self.jobs_served += 1
+
+    def stop(self):
+        if self.process is None:
+            return
+        if self.spec.get('stop_command', None) and self.process.poll() is None:
+            try:
+                subprocess.call(self._command('stop_command'), stdout=self.stdout_fh, stderr=self.stderr_fh,
+                                timeout=self.spec.get('check_timeout', 10))
+                self.process.wait(timeout=self.spec.get('check_timeout', 10))
+            except subprocess.TimeoutExpired:
+                pass
+        # Kill the server and all its children, should they still be running
+        try:
+            parent = psutil.Process(self.process.pid)
+            for child in parent.children(recursive=True):
+                child.kill()
+            parent.kill()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            pass
+        self.process.wait()
+        self.process = None
+
+
+class ServerPool:
+    """
+    One verifier server per job slot, on distinct ports.
+
+    A slot's server is replaced when a round requires a server with a different
+    specification, e.g. hosting a different fat jar.
+    """
+
+    def __init__(self, base_port, stdout_fh, stderr_fh):
+        self.base_port = base_port
+        self.stdout_fh = stdout_fh
+        self.stderr_fh = stderr_fh
+        self.slot_to_server = {}
+
+    def server(self, slot, spec):
+        """
+        :param spec: the 'server' property of a run configuration, as plain dictionary
+        :return: the server of the slot, matching the specification
+        """
+        server = self.slot_to_server.get(slot)
+        if server is not None and ServerPool._spec_key(server.spec) != ServerPool._spec_key(spec):
+            server.stop()
+            server = None
+        if server is None:
+            server = VerifierServer(spec, self.base_port + slot, self.stdout_fh, self.stderr_fh)
+            self.slot_to_server[slot] = server
+        return server
+
+    def shutdown(self):
+        for server in self.slot_to_server.values():
+            server.stop()
+        self.slot_to_server = {}
+
+    @staticmethod
+    def _spec_key(spec):
+        return json.dumps(spec, sort_keys=True)
@@ -0,0 +1,324 @@
+import math
+import warnings
+from statistics import NormalDist, mean, stdev
+import numpy
+
+# Number of bootstrap resamples per sample
+BOOTSTRAP_RESAMPLES = 1000
+
+# Confidence level of the bootstrap confidence intervals
+BOOTSTRAP_CONFIDENCE = 0.95
+
+# Maximum number of resampled values drawn at once, bounds the memory used for bootstrapping
+BOOTSTRAP_CHUNK_SIZE = 2 ** 22
+
+# Values whose modified z-score (Iglewicz and Hoaglin) exceeds this threshold are outliers
+OUTLIER_THRESHOLD = 3.5
+
+
+class RunningStats:
+    """
+    Count, mean, variance and minimum of a stream of values, updated online with
+    Welford's algorithm, without keeping the values. Batches of values are merged
+    with the parallel variant of Chan et al., such that they can be added at once.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        # Sum of squared deviations from the mean
+        self.m2 = 0.0
+        self.min = math.inf
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = min(self.min, value)
+
+    def add_all(self, values):
+        """
+        :param values: numpy array of values
+        """
+        if len(values) == 0:
+            return
+        batch = RunningStats()
+        batch.count = len(values)
+        batch.mean = float(values.mean())
+        batch.m2 = float(((values - batch.mean) ** 2).sum())
+        batch.min = float(values.min())
+        self.merge(batch)
+
+    def merge(self, other):
+        """
+        Adds the values aggregated by another RunningStats.
+        """
+        if other.count == 0:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+
+    def variance(self):
+        """
+        :return: sample variance, or None for less than two values
+        """
+        return self.m2 / (self.count - 1) if self.count >= 2 else None
+
+    def result(self):
+        """
+        :return: the mean, or None if there were no values
+        """
+        return self.mean if self.count else None
+
+    def confidence_interval(self, confidence):
+        """
+        Like confidence_interval, for the aggregated values.
+        :return: pair (lower bound, upper bound), or None for less than two values
+        """
+        if self.count < 2:
+            return None
+        half_width = t_quantile((1 + confidence) / 2, self.count - 1) * math.sqrt(self.variance() / self.count)
+        return self.mean - half_width, self.mean + half_width
+
+
+def t_quantile(p, df):
+    """
+    Quantile function of Student's t-distribution. Exact for one and two degrees of
+    freedom, otherwise the Cornish-Fisher expansion from Abramowitz and Stegun
+    (26.7.5), which is accurate to about 1% for three and more degrees of freedom.
+    :param p: probability, between 0 and 1
+    :param df: degrees of freedom, at least 1
+    :return: the p-quantile
+    """
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+    return z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+
+def confidence_interval(values, confidence):
+    """
+    Confidence interval of the mean of the values, based on the t-distribution.
+    :param values: at least two values
+    :param confidence: confidence level, e.g. 0.95
+    :return: pair (lower bound, upper bound)
+    """
+    n = len(values)
+    centre = mean(values)
+    half_width = t_quantile((1 + confidence) / 2, n - 1) * stdev(values) / math.sqrt(n)
+    return centre - half_width, centre + half_width
+
+
+def relative_ci_width(values, confidence):
+    """
+    :return: width of the confidence interval of the mean, relative to the mean
+    """
+    centre = mean(values)
+    if centre == 0:
+        return 0.0
+    lower, upper = confidence_interval(values, confidence)
+    return (upper - lower) / abs(centre)
+
+
+def steady_state_rolling_cv(times, window, max_cv, max_start):
+    """
+    Finds the first run of a timing series from which on the runtimes are stable: the
+    coefficient of variation of the window of runs starting there is at most 'max_cv'.
+    :param times: runtimes in the order of the repetitions
+    :param max_start: maximum number of runs before the steady state
+    :return: index of the first steady run, or None if no window is stable
+    """
+    for start in range(0, min(max_start, len(times) - window) + 1):
+        values = times[start:start + window]
+        centre = mean(values)
+        if centre == 0 or stdev(values) / centre <= max_cv:
+            return start
+    return None
+
+
+def steady_state_changepoint(times, min_slowdown, max_start, min_steady=2):
+    """
+    Splits a timing series at the single changepoint in the mean that minimizes the sum
+    of squared deviations from the means of both segments. The runs before it are warmup
+    runs if they were at least 'min_slowdown' (relative) slower than the runs after it.
+    :param times: runtimes in the order of the repetitions
+    :param max_start: maximum number of runs before the steady state
+    :param min_steady: minimum number of runs after the changepoint
+    :return: index of the first steady run, 0 if there is no warmup
+    """
+    values = numpy.asarray(times, dtype=float)
+    n = len(values)
+    last = min(max_start, n - min_steady)
+    if last < 1:
+        return 0
+    prefix = numpy.concatenate([[0.0], numpy.cumsum(values)])
+    prefix_squares = numpy.concatenate([[0.0], numpy.cumsum(values ** 2)])
+    splits = numpy.arange(1, last + 1)
+    # Sum of squared deviations of a segment: sum of squares minus square of sum over length
+    head = prefix_squares[splits] - prefix[splits] ** 2 / splits
+    tail = (prefix_squares[n] - prefix_squares[splits]) - (prefix[n] - prefix[splits]) ** 2 / (n - splits)
+    split = int(splits[numpy.argmin(head + tail)])
+    head_mean = prefix[split] / split
+    tail_mean = (prefix[n] - prefix[split]) / (n - split)
+    return split if head_mean > tail_mean * (1 + min_slowdown) else 0
+
+
+def summarize(samples, seed=0):
+    """
+    Computes descriptive statistics of many samples at once. The samples are padded
+    into a single matrix, such that each statistic is computed in one vectorized pass.
+    Statistics that are undefined for a sample, e.g. the standard deviation of a single
+    value, are NaN.
+    :param samples: list of samples, each a list of values; samples may be empty
+    :param seed: seed of the random generator used for bootstrapping
+    :return: pair (dictionary from statistic name to array with one entry per sample,
+             boolean matrix whose row i flags the outliers of sample i in its first entries)
+    """
+    counts = numpy.array([len(sample) for sample in samples], dtype=int)
+    width = max(int(counts.max(initial=0)), 1)
+    data = numpy.full((len(samples), width), numpy.nan)
+    for i, sample in enumerate(samples):
+        data[i, :len(sample)] = sample
+
+    with warnings.catch_warnings(), numpy.errstate(divide='ignore', invalid='ignore'):
+        # Empty samples and samples of a single value produce NaN, as intended
+        warnings.simplefilter('ignore', RuntimeWarning)
+        means = numpy.nanmean(data, axis=1)
+        medians = numpy.nanmedian(data, axis=1)
+        std_devs = numpy.nanstd(data, axis=1, ddof=1)
+        minima = numpy.nanmin(data, axis=1)
+        cvs = std_devs / means
+
+        deviations = numpy.abs(data - medians[:, None])
+        mads = numpy.nanmedian(deviations, axis=1)
+        outliers = (mads[:, None] > 0) & (0.6745 * deviations / mads[:, None] > OUTLIER_THRESHOLD)
+
+        ci_lower, ci_upper = _bootstrap_ci(data, counts, numpy.random.default_rng(seed))
+
+    statistics = {'count': counts, 'mean': means, 'median': medians, 'std_dev': std_devs, 'min': minima,
+                  'cv': cvs, 'ci_lower': ci_lower, 'ci_upper': ci_upper, 'outliers': outliers.sum(axis=1)}
+    return statistics, outliers
+
+
+def _bootstrap_ci(data, counts, rng):
+    """
+    Percentile bootstrap confidence intervals of the means of the rows of data.
+    :param data: matrix of samples, padded with NaN
+    :param counts: number of values of each sample
+    :return: pair (array of lower bounds, array of upper bounds); NaN for samples with less than two values
+    """
+    lower = numpy.full(len(counts), numpy.nan)
+    upper = numpy.full(len(counts), numpy.nan)
+    width = data.shape[1]
+    rows = numpy.flatnonzero(counts >= 2)
+    chunk = max(1, BOOTSTRAP_CHUNK_SIZE // (BOOTSTRAP_RESAMPLES * width))
+    alpha = (1 - BOOTSTRAP_CONFIDENCE) / 2
+
+    for start in range(0, len(rows), chunk):
+        part = rows[start:start + chunk]
+        n = counts[part][:, None, None]
+        indices = (rng.random((len(part), BOOTSTRAP_RESAMPLES, width)) * n).astype(int)
+        resampled = data[part[:, None, None], indices]
+        resampled[numpy.broadcast_to(numpy.arange(width) >= n, resampled.shape)] = numpy.nan
+        resampled_means = numpy.nanmean(resampled, axis=2)
+        lower[part], upper[part] = numpy.quantile(resampled_means, [alpha, 1 - alpha], axis=1)
+    return lower, upper
+
+
+def mann_whitney_u(x, y):
+    """
+    Two-sided Mann-Whitney U test of whether the values of x tend to differ from the
+    values of y. The p-value is exact for small samples without ties, and otherwise
+    based on the normal approximation with tie and continuity correction.
+    :param x: at least one value
+    :param y: at least one value
+    :return: pair (U statistic of x, p-value)
+    """
+    n1, n2 = len(x), len(y)
+    values = numpy.concatenate([numpy.asarray(x, dtype=float), numpy.asarray(y, dtype=float)])
+    ranks = _ranks(values)
+    u = float(ranks[:n1].sum() - n1 * (n1 + 1) / 2)
+    u_min = min(u, n1 * n2 - u)
+    has_ties = len(numpy.unique(values)) < len(values)
+
+    if not has_ties and n1 + n2 <= 40:
+        counts = _u_distribution(n1, n2)
+        p = 2 * counts[:int(u_min) + 1].sum() / counts.sum()
+        return u, min(1.0, float(p))
+
+    n = n1 + n2
+    _, tie_counts = numpy.unique(values, return_counts=True)
+    variance = n1 * n2 / 12 * ((n + 1) - (tie_counts ** 3 - tie_counts).sum() / (n * (n - 1)))
+    if variance <= 0:
+        return u, 1.0
+    z = (abs(u - n1 * n2 / 2) - 0.5) / math.sqrt(variance)
+    return u, min(1.0, 2 * (1 - NormalDist().cdf(max(z, 0.0))))
+
+
+def _ranks(values):
+    """
+    :return: ranks of the values, starting at 1; tied values get the average of their ranks
+    """
+    order = numpy.argsort(values, kind='mergesort')
+    sorted_values = values[order]
+    ranks = numpy.empty(len(values))
+    ranks[order] = numpy.arange(1, len(values) + 1)
+    # average the ranks of ties
+    _, first, counts = numpy.unique(sorted_values, return_index=True, return_counts=True)
+    for start, count in zip(first, counts):
+        if count > 1:
+            ranks[order[start:start + count]] = start + (count + 1) / 2
+    return ranks
+
+
+def _u_distribution(n1, n2):
+    """
+    :return: array whose entry u is the number of rankings without ties in which the U statistic is u
+    """
+    # counts[i][j] is the distribution for samples of sizes i and j
+    counts = [[None] * (n2 + 1) for _ in range(n1 + 1)]
+    for i in range(n1 + 1):
+        for j in range(n2 + 1):
+            if i == 0 or j == 0:
+                counts[i][j] = numpy.ones(1)
+                continue
+            # the largest value belongs to the first sample (adding j to U) or to the second one
+            distribution = numpy.zeros(i * j + 1)
+            distribution[j:j + len(counts[i - 1][j])] += counts[i - 1][j]
+            distribution[:len(counts[i][j - 1])] += counts[i][j - 1]
+            counts[i][j] = distribution
+    return counts[n1][n2]
+
+
+def adjust_p_values(p_values, method):
+    """
+    Corrects p-values for multiple testing.
+    :param method: "holm" (Holm-Bonferroni, controls the family-wise error rate) or
+                   "fdr" (Benjamini-Hochberg, controls the false discovery rate)
+    :return: list of adjusted p-values, in the order of p_values
+    """
+    m = len(p_values)
+    if m == 0:
+        return []
+    p = numpy.asarray(p_values, dtype=float)
+    order = numpy.argsort(p)
+    if method == "holm":
+        adjusted = numpy.maximum.accumulate((m - numpy.arange(m)) * p[order])
+    elif method == "fdr":
+        adjusted = numpy.minimum.accumulate((m / numpy.arange(m, 0, -1)) * p[order][::-1])[::-1]
+    else:
+        raise ValueError("Unknown correction method '{}'".format(method))
+    result = numpy.empty(m)
+    result[order] = numpy.minimum(adjusted, 1.0)
+    return result.tolist()
@@ -1,16 +1,20 @@
 import datetime
+import glob
 import os
 import sys
+from pyhocon import ConfigFactory
 
 PLACEHOLDER_DATE = "@date@"
 PLACEHOLDER_FILENAME = "@file_name@"
 PLACEHOLDER_PATH_DEPENDENT_FILENAME = "@path_name@"
 PLACEHOLDER_REP = "@rep@"
 PLACEHOLDER_CONFIG_NAME = "@config_name@"
+PLACEHOLDER_PORT = "@port@"
+PLACEHOLDER_FILES = "@files@"
 CURR_DATE = datetime.datetime.now().strftime("%Y-%m-%d-%H-%M-%S")
 
 def replace_placeholders(string, file="", repetition=PLACEHOLDER_REP, date=CURR_DATE,
-                         config_name=PLACEHOLDER_CONFIG_NAME):
+                         config_name=PLACEHOLDER_CONFIG_NAME, port=PLACEHOLDER_PORT):
     filename = PLACEHOLDER_FILENAME
     path_filename = PLACEHOLDER_PATH_DEPENDENT_FILENAME
     if file != "":
@@ -20,7 +24,22 @@ def replace_placeholders(string, file="", repetition=PLACEHOLDER_REP, date=CURR_
         .replace(PLACEHOLDER_FILENAME, filename) \
         .replace(PLACEHOLDER_REP, str(repetition)) \
         .replace(PLACEHOLDER_PATH_DEPENDENT_FILENAME, path_filename) \
-        .replace(PLACEHOLDER_CONFIG_NAME, config_name)
+        .replace(PLACEHOLDER_CONFIG_NAME, config_name) \
+        .replace(PLACEHOLDER_PORT, port)
+
+def replace_files_placeholder(command, files):
+    """
+    Substitutes the input files of a batch for @files@: a part of the command that is just the
+    placeholder becomes one argument per file, in other parts the files are separated by spaces.
+    :return: the command as list
+    """
+    substituted = []
+    for part in command:
+        if part == PLACEHOLDER_FILES:
+            substituted.extend(files)
+        else:
+            substituted.append(part.replace(PLACEHOLDER_FILES, " ".join(files)))
+    return substituted
 
 def generate_path_dependent_filename(file):
     _, file = os.path.splitdrive(file)
@@ -42,4 +61,28 @@ def abort(exit_code):
 def require(condition, message, exit_code=3):
     if not condition:
         print("Error: {}".format(message))
-        abort(exit_code)
\ No newline at end of file
+        abort(exit_code)
+
+def find_config_copy(results_dir):
+    """
+    Finds the copy of the configuration file that was placed in the results folder.
+    """
+    candidates = glob.glob(os.path.join(results_dir, "*.conf"))
+    require(len(candidates) == 1,
+            "Cannot determine the configuration file in '{}', please specify it explicitly".format(results_dir))
+    return candidates[0]
+
+def find_results_file(results_dir, key, default):
+    """
+    Finds a file of the results folder by its name in the copy of the configuration file
+    placed there, e.g. 'results.journal'. A date placeholder in the name matches any date.
+    :param default: name of the file if there is no unique configuration copy or it lacks 'key'
+    :return: the path of the file, or None if it does not exist
+    """
+    name = default
+    candidates = glob.glob(os.path.join(results_dir, "*.conf"))
+    if len(candidates) == 1:
+        name = ConfigFactory.parse_file(candidates[0]).get(key, None) or default
+    matches = sorted(glob.glob(os.path.join(glob.escape(results_dir),
+                                            glob.escape(name).replace(PLACEHOLDER_DATE, "*"))))
+    return matches[-1] if matches else None
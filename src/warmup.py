@@ -0,0 +1,67 @@
+from src.stats import steady_state_changepoint, steady_state_rolling_cv
+
+# Methods of detecting the warmup runs of a run configuration
+WARMUP_DETECTIONS = ['fixed', 'rolling_cv', 'changepoint']
+
+
+class Warmup:
+    """
+    Determines the warmup runs of a (file, run configuration) pair, e.g. JIT-cold runs of
+    a verifier hosted by a Nailgun server, which are excluded from the statistics. Either
+    a fixed number of runs, or the runs before the timing series reaches a steady state.
+    """
+
+    def __init__(self, detection, runs=0, window=3, max_cv=0.05, min_slowdown=0.1, max_runs=None):
+        """
+        :param detection: one of WARMUP_DETECTIONS
+        :param runs: number of warmup runs, for 'fixed'
+        :param window: number of runs whose coefficient of variation must be at most 'max_cv', for 'rolling_cv'
+        :param min_slowdown: minimum slowdown of the runs before the changepoint, for 'changepoint'
+        :param max_runs: maximum number of warmup runs detected, or None for no limit
+        """
+        self.detection = detection
+        self.runs = runs
+        self.window = window
+        self.max_cv = max_cv
+        self.min_slowdown = min_slowdown
+        self.max_runs = max_runs
+
+    @staticmethod
+    def from_config(run_config):
+        """
+        :param run_config: a run configuration
+        :return: Warmup of its 'warmup' property, or None if it has none
+        """
+        spec = run_config.get('warmup', None)
+        if not spec:
+            return None
+        return Warmup(detection=spec.get('detection', 'fixed'),
+                      runs=spec.get('runs', 0),
+                      window=spec.get('window', 3),
+                      max_cv=spec.get('max_cv', 0.05),
+                      min_slowdown=spec.get('min_slowdown', 0.1),
+                      max_runs=spec.get('max_runs', None))
+
+    def warmup_runs(self, repetitions, times, valid):
+        """
+        :param repetitions: repetitions of the runs of a (file, run configuration) pair, in ascending
+                            order; None for runs recorded without repetition index
+        :param times: runtimes of the runs
+        :param valid: for each run, whether it completed, see SingleRunResult.is_valid
+        :return: number of leading runs that are warmup runs, or None if no steady state was detected
+        """
+        if self.detection == 'fixed':
+            # Runs recorded without repetition index count in their order
+            return sum(1 for i, rep in enumerate(repetitions) if (rep if rep is not None else i) < self.runs)
+
+        # Detect the steady state in the valid runs; timeouts before it are warmup runs as well
+        valid_runs = [i for i, is_valid in enumerate(valid) if is_valid]
+        valid_times = [float(times[i]) for i in valid_runs]
+        max_start = len(valid_times) if self.max_runs is None else self.max_runs
+        if self.detection == 'rolling_cv':
+            start = steady_state_rolling_cv(valid_times, self.window, self.max_cv, max_start)
+        else:
+            start = steady_state_changepoint(valid_times, self.min_slowdown, max_start)
+        if start is None or start >= len(valid_runs):
+            return None
+        return valid_runs[start] if start > 0 else 0
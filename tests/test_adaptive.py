@@ -0,0 +1,17 @@
+from src.adaptive import AdaptiveRepetitions
+
+
+def test_repetitions_stop_once_the_confidence_interval_is_narrow_enough():
+    adaptive = AdaptiveRepetitions(3, 10, 0.05, 0.95)
+
+    assert not adaptive.done(2, [1.0, 1.0])
+    assert adaptive.done(3, [1.0, 1.01, 0.99])
+    assert not adaptive.done(3, [1.0, 2.0, 3.0])
+
+
+def test_repetitions_stop_at_the_maximum_or_when_all_runs_timed_out():
+    adaptive = AdaptiveRepetitions(3, 5, 0.05, 0.95)
+
+    assert adaptive.done(5, [1.0, 2.0, 3.0, 4.0, 5.0])
+    assert adaptive.done(3, [])
+    assert not adaptive.done(3, [1.0])
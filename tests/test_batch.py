@@ -0,0 +1,137 @@
+import io
+import os
+import shutil
+import pytest
+from src.batch import BatchExtractor, BatchRunner
+from src.output_archive import OutputArchive
+from src.plan import JobRecord
+
+PATTERN = r"^RESULT (?P<file>\S+) (?P<time>[0-9.]+) (?P<outcome>\w+)$"
+
+# Reports each file given as argument, but crashes at crash.vpr
+BATCH_SCRIPT = """
+for file in "$@"; do
+  if [ "$file" = crash.vpr ]; then exit 3; fi
+  echo "RESULT $file 250 verified"
+done
+"""
+
+
+def _batch(files, timeout=None):
+    return {'files': files, 'pattern': PATTERN, 'time_unit': 'ms', 'success': ['verified'], 'timeout': timeout}
+
+
+def test_runtimes_and_outcomes_are_extracted_per_file():
+    output = "\n".join(["starting", "RESULT a.vpr 1500 verified", "RESULT ./dir/b.vpr 20 failed",
+                        "RESULT unknown.vpr 10 verified", "RESULT c.vpr x verified"])
+    extractor = BatchExtractor(PATTERN, 'ms', ['verified'])
+
+    reported = extractor.extract(output, ["a.vpr", "dir/b.vpr", "c.vpr"])
+
+    assert reported == {"a.vpr": (1.5, 0), "dir/b.vpr": (0.02, 1)}
+
+
+def test_files_are_matched_by_absolute_path():
+    extractor = BatchExtractor(r"^(?P<file>\S+) took (?P<time>[0-9.]+)$")
+
+    reported = extractor.extract(os.path.abspath("a.vpr") + " took 2", ["a.vpr"])
+
+    assert reported == {"a.vpr": (2.0, None)}
+
+
+def test_a_file_reported_twice_keeps_its_last_report():
+    extractor = BatchExtractor(PATTERN, 'ms', ['verified'])
+
+    reported = extractor.extract("RESULT a.vpr 10 failed\nRESULT a.vpr 20 verified", ["a.vpr"])
+
+    assert reported == {"a.vpr": (0.02, 0)}
+
+
+@pytest.mark.skipif(shutil.which("sh") is None, reason="requires sh")
+def test_files_reported_on_stderr_are_extracted():
+    script = 'echo "RESULT $1 100 verified" >&2; echo "RESULT $2 200 failed"'
+    jobs = [JobRecord(0, ["sh", "-c", script, "batch", "@files@"])]
+
+    results = BatchRunner.run_as_benchmark(jobs, _batch(["a.vpr", "b.vpr"]), "config", 1, 2, 1, 5, io.StringIO(),
+                                           io.StringIO())
+
+    assert [(r.input_file, r.time_elapsed, r.return_code) for r in results] == [("a.vpr", 0.1, 0), ("b.vpr", 0.2, 1)]
+
+
+@pytest.mark.skipif(shutil.which("sh") is None, reason="requires sh")
+def test_unreported_files_are_retried_until_isolated():
+    files = ["a.vpr", "crash.vpr", "b.vpr", "c.vpr"]
+    jobs = [JobRecord(0, ["sh", "-c", BATCH_SCRIPT, "batch", "@files@"])]
+
+    results = BatchRunner.run_as_benchmark(jobs, _batch(files), "config", 1, 4, 1, 5, io.StringIO(), io.StringIO())
+
+    assert [r.input_file for r in results] == files
+    assert [r.return_code for r in results] == [0, 3, 0, 0]
+    assert [r.time_elapsed for r in results if r.input_file != "crash.vpr"] == [0.25, 0.25, 0.25]
+
+
+@pytest.mark.skipif(shutil.which("sh") is None, reason="requires sh")
+def test_the_output_of_a_batch_is_archived_once(tmp_path):
+    files = ["a.vpr", "b.vpr", "c.vpr"]
+    jobs = [JobRecord(0, ["sh", "-c", BATCH_SCRIPT, "batch", "@files@"])]
+    archive = OutputArchive(str(tmp_path / "output.gz"))
+
+    BatchRunner.run_as_benchmark(jobs, _batch(files), "config", 1, 3, 1, 5, None, None, output_archive=archive)
+    archive.close()
+
+    entries = [entry for entry in OutputArchive.entries(archive.filename) if entry['stream'] == 'stdout']
+    assert [entry['input_file'] for entry in entries] == files
+    assert len({entry['offset'] for entry in entries}) == 1
+    assert OutputArchive.read(archive.filename, entries[1]).decode().splitlines()[1] == "RESULT b.vpr 250 verified"
+    # One gzip member per stream
+    assert os.path.getsize(archive.filename) == sum(entry['length'] for entry in OutputArchive.entries(
+        archive.filename) if entry['input_file'] == "a.vpr")
+
+
+class _MetricsSpy:
+    def __init__(self):
+        self.calls = []
+
+    def job_started(self, slot, file, config_name, command):
+        self.calls.append(("started", file))
+
+    def jobs_finished(self, slot, results):
+        self.calls.append(("finished", [result.input_file for result in results]))
+
+
+@pytest.mark.skipif(shutil.which("sh") is None, reason="requires sh")
+def test_each_invocation_is_finished_once_in_the_metrics():
+    files = ["crash.vpr", "a.vpr"]
+    jobs = [JobRecord(0, ["sh", "-c", BATCH_SCRIPT, "batch", "@files@"])]
+    metrics = _MetricsSpy()
+
+    BatchRunner.run_as_benchmark(jobs, _batch(files), "config", 1, 2, 1, 5, io.StringIO(), io.StringIO(),
+                                 metrics=metrics, slot=0)
+
+    # The first invocation reports no file, but still finishes
+    assert metrics.calls == [("started", "crash.vpr a.vpr"), ("finished", []),
+                             ("started", "crash.vpr"), ("finished", ["crash.vpr"]),
+                             ("started", "a.vpr"), ("finished", ["a.vpr"])]
+
+
+@pytest.mark.skipif(shutil.which("sh") is None, reason="requires sh")
+def test_files_without_outcome_of_a_killed_batch_have_no_exit_code():
+    script = 'echo "RESULT a.vpr 10 done"; exec sleep 10'
+    jobs = [JobRecord(0, ["sh", "-c", script, "batch", "@files@"])]
+    batch = dict(_batch(["a.vpr", "b.vpr"], timeout=0.5), pattern=r"^RESULT (?P<file>\S+) (?P<time>[0-9.]+)")
+
+    results = BatchRunner.run_as_benchmark(jobs, batch, "config", 1, 2, 1, 5, io.StringIO(), io.StringIO())
+
+    assert results[0].return_code is None and results[0].is_valid()
+    assert results[1].timeout_occurred
+
+
+@pytest.mark.skipif(shutil.which("sh") is None, reason="requires sh")
+def test_a_batch_without_timeout_is_neither_killed_nor_timed_out():
+    jobs = [JobRecord(0, ["sh", "-c", BATCH_SCRIPT, "batch", "@files@"])]
+
+    results = BatchRunner.run_as_benchmark(jobs, _batch(["a.vpr", "b.vpr"]), "config", 1, 2, 1, 0, io.StringIO(),
+                                           io.StringIO())
+
+    assert [(r.input_file, r.timeout_occurred, r.return_code) for r in results] == [("a.vpr", False, 0),
+                                                                                   ("b.vpr", False, 0)]
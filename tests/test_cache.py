@@ -0,0 +1,63 @@
+import os
+import time
+from src.cache import ResultCache
+from src.result import SingleRunResult
+
+
+def _result(time_elapsed):
+    result = SingleRunResult("config", "a.vpr")
+    result.time_elapsed = time_elapsed
+    return result
+
+
+def _write(filename, text):
+    with open(filename, "w") as fh:
+        fh.write(text)
+
+
+def test_the_key_changes_with_everything_a_run_depends_on(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), 0, 0)
+    file, artifact = str(tmp_path / "a.vpr"), str(tmp_path / "tool.jar")
+    _write(file, "program")
+    _write(artifact, "tool")
+    key = cache.key(file, ["tool", file], [artifact], 10, None, None, 0)
+
+    assert cache.key(file, ["tool", file], [artifact], 10, None, None, 0) == key
+    assert cache.key(file, ["tool", "-v", file], [artifact], 10, None, None, 0) != key
+    assert cache.key(file, ["tool", file], [artifact], 20, None, None, 0) != key
+    assert cache.key(file, ["tool", file], [artifact], 10, None, None, 1) != key
+    assert cache.key(file, ["tool", file], [artifact], 10, 1024 * 1024, None, 0) != key
+    assert cache.key(file, ["tool", file], [artifact], 10, None, "cgroup", 0) != key
+    _write(artifact, "new tool")
+    assert cache.key(file, ["tool", file], [artifact], 10, None, None, 0) != key
+    _write(artifact, "tool")
+    _write(file, "changed program")
+    assert cache.key(file, ["tool", file], [artifact], 10, None, None, 0) != key
+
+
+def test_stored_results_are_looked_up_by_their_key(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), 0, 0)
+
+    cache.store("ab" * 32, _result(1.5))
+
+    assert cache.lookup("ab" * 32).time_elapsed == 1.5
+    assert cache.lookup("cd" * 32) is None
+
+
+def test_entries_are_evicted_by_age_and_least_recently_used_first_by_size(tmp_path):
+    cache = ResultCache(str(tmp_path / "cache"), 0, 0)
+    keys = ["{:02x}".format(i) * 32 for i in range(4)]
+    for key in keys:
+        cache.store(key, _result(1.0))
+    entry_size = os.path.getsize(cache._entry_filename(keys[0]))
+    now = time.time()
+    for age, key in zip([1000, 30, 20, 10], keys):
+        os.utime(cache._entry_filename(key), (now - age, now - age))
+
+    # keys[1] is used again, keys[2] is now the least recently used entry
+    assert cache.lookup(keys[1]) is not None
+    cache.max_age = 100
+    cache.max_size = 2 * entry_size
+
+    assert cache.evict() == 2
+    assert [cache.lookup(key) is not None for key in keys] == [False, True, False, True]
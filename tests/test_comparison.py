@@ -0,0 +1,79 @@
+import os
+from src.comparison import Comparison, load_results
+from src.journal import ResultJournal
+from src.result import SingleRunResult
+from src.stats import adjust_p_values, mann_whitney_u
+
+
+def _results(file, config_name, times, timeouts=0):
+    results = []
+    for i, time_elapsed in enumerate(times + [10.0] * timeouts):
+        result = SingleRunResult(config_name, file)
+        result.repetition = i
+        result.time_elapsed = time_elapsed
+        result.timeout_occurred = i >= len(times)
+        results.append(result)
+    return {(file, config_name): results}
+
+
+def test_the_exact_mann_whitney_p_value_of_separated_samples():
+    # Only one of the 10 rankings of 2 and 3 values separates them this way, on each side
+    assert mann_whitney_u([1.0, 2.0], [3.0, 4.0, 5.0]) == (0.0, 0.2)
+    assert mann_whitney_u([3.0, 4.0, 5.0], [1.0, 2.0]) == (6.0, 0.2)
+
+
+def test_mann_whitney_with_ties_uses_the_normal_approximation():
+    u, p = mann_whitney_u([1.0, 1.0, 2.0], [1.0, 1.0, 2.0])
+
+    assert u == 4.5 and p == 1.0
+
+
+def test_p_values_are_adjusted_for_multiple_testing():
+    p_values = [0.01, 0.04, 0.03, 0.5]
+
+    holm = adjust_p_values(p_values, "holm")
+    fdr = adjust_p_values(p_values, "fdr")
+
+    assert [round(p, 10) for p in holm] == [0.04, 0.09, 0.09, 0.5]
+    assert [round(p, 10) for p in fdr] == [0.04, 0.0533333333, 0.0533333333, 0.5]
+    assert adjust_p_values([], "holm") == []
+
+
+def test_significant_slowdowns_and_new_timeouts_are_reported():
+    baseline, candidate = {}, {}
+    fast, slow = [1.0 + 0.01 * i for i in range(8)], [2.0 + 0.01 * i for i in range(8)]
+    baseline.update(_results("slower.vpr", "A", fast))
+    candidate.update(_results("slower.vpr", "B", slow))
+    baseline.update(_results("same.vpr", "A", fast))
+    candidate.update(_results("same.vpr", "B", fast[::-1]))
+    baseline.update(_results("timeout.vpr", "A", fast))
+    candidate.update(_results("timeout.vpr", "B", fast[:6], timeouts=2))
+
+    comparison = Comparison(baseline, candidate, "A", "B")
+
+    assert [c.file for c in comparison.regressions(0.05)] == ["slower.vpr"]
+    assert comparison.improvements(0.05) == []
+    assert [c.file for c in comparison.new_timeouts()] == ["timeout.vpr"]
+    assert abs(comparison.geometric_mean_ratio() - ((2.035 / 1.035) * 1.0 * (1.025 / 1.035)) ** (1 / 3)) < 1e-9
+
+
+def _results_folder(directory, times, warmup=""):
+    os.makedirs(directory)
+    with open(os.path.join(directory, "benchmark.conf"), "w") as fh:
+        fh.write('run_configurations = [ {{ name = "A", command = ["tool"] {} }} ]\n'.format(warmup))
+    journal = ResultJournal(os.path.join(directory, "journal.jsonl"))
+    journal.append(_results("a.vpr", "A", times)[("a.vpr", "A")][::-1])
+    journal.close()
+    return directory
+
+
+def test_warmup_runs_are_excluded_from_the_comparison(tmp_path):
+    steady = [1.0 + 0.01 * i for i in range(8)]
+    baseline = load_results(_results_folder(str(tmp_path / "baseline"), steady))
+    cold = str(tmp_path / "cold")
+    candidate = load_results(_results_folder(cold, [5.0, 5.0] + steady, warmup=', warmup = { runs = 2 }'))
+
+    assert [r.repetition for r in candidate[("a.vpr", "A")]] == list(range(2, 10))
+    assert Comparison(baseline, candidate, "A", "A").regressions(0.05) == []
+    # Also when the journal is given instead of the results folder
+    assert len(load_results(os.path.join(cold, "journal.jsonl"))[("a.vpr", "A")]) == 8
@@ -0,0 +1,80 @@
+import os
+import signal
+import subprocess
+import threading
+import time
+import psutil
+import pytest
+from src.containment import CgroupContainment, JobAborted, create_containment
+from src.process_runner import ProcessRunner
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason="containment requires POSIX")
+
+# Writes the PID of the job to the file $0 and sleeps
+SLEEPER = 'echo $$ > "$0"; exec sleep 30'
+
+
+@pytest.fixture(params=["process_group", "cgroup"])
+def containment(request):
+    containment = create_containment(request.param)
+    if request.param == "cgroup" and not isinstance(containment, CgroupContainment):
+        containment.close()
+        pytest.skip("no writable cgroup v2")
+    yield containment
+    containment.close()
+
+
+def _wait_for_pid(pid_file):
+    deadline = time.perf_counter() + 5
+    while time.perf_counter() < deadline:
+        if os.path.exists(pid_file) and open(pid_file).read().strip():
+            return int(open(pid_file).read())
+        time.sleep(0.01)
+    raise AssertionError("The job did not start")
+
+
+def _gone(pid):
+    try:
+        return psutil.Process(pid).status() == psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return True
+
+
+def test_interrupt_kills_the_job(tmp_path, containment):
+    pid_file = str(tmp_path / "pid")
+    interrupt = threading.Thread(target=lambda: (_wait_for_pid(pid_file), os.kill(os.getpid(), signal.SIGINT)))
+    interrupt.start()
+    with pytest.raises(KeyboardInterrupt):
+        ProcessRunner.run(["sh", "-c", SLEEPER, pid_file], 0, subprocess.DEVNULL, subprocess.DEVNULL, containment)
+    interrupt.join()
+
+    assert _gone(_wait_for_pid(pid_file))
+    assert containment.active_jobs.jobs == set()
+    if isinstance(containment, CgroupContainment):
+        assert not [name for name in os.listdir(containment.parent) if name.startswith("job-")]
+
+
+def test_closing_the_containment_aborts_running_jobs(tmp_path, containment):
+    pid_file = str(tmp_path / "pid")
+    errors = []
+
+    def run():
+        try:
+            ProcessRunner.run(["sh", "-c", SLEEPER, pid_file], 0, subprocess.DEVNULL, subprocess.DEVNULL,
+                              containment)
+        except JobAborted as err:
+            errors.append(err)
+
+    slot = threading.Thread(target=run)
+    slot.start()
+    pid = _wait_for_pid(pid_file)
+    containment.close()
+    slot.join(5)
+
+    assert not slot.is_alive()
+    assert len(errors) == 1
+    assert _gone(pid)
+    if isinstance(containment, CgroupContainment):
+        assert not os.path.exists(containment.parent)
+    with pytest.raises(JobAborted):
+        containment.new_job(None)
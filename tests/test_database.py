@@ -0,0 +1,41 @@
+from src.database import ResultDatabase
+from src.result import SingleRunResult
+
+
+def _result(file, config_name, repetition, time_elapsed, timeout_occurred=False):
+    result = SingleRunResult(config_name, file)
+    result.repetition = repetition
+    result.time_elapsed = time_elapsed
+    result.return_code = None if timeout_occurred else 0
+    result.timeout_occurred = timeout_occurred
+    result.peak_rss = 1024
+    return result
+
+
+def test_campaigns_and_their_runs_are_read_back(tmp_path):
+    database = ResultDatabase(str(tmp_path / "db" / "results.db"))
+    database.store_campaign(str(tmp_path / "r1"), "2024-01-01", "host", "a.conf", "timeout = 10",
+                            [_result("a.vpr", "A", 0, 1.0), _result("a.vpr", "A", 1, 3.0),
+                             _result("a.vpr", "A", 2, 10.0, timeout_occurred=True)])
+    second = database.store_campaign(str(tmp_path / "r2"), "2024-01-02", "host", "a.conf", "timeout = 20",
+                                     [_result("a.vpr", "A", 0, 4.0)])
+
+    assert [row[2:] for row in database.campaigns()] == [("2024-01-01", "host", 3), ("2024-01-02", "host", 1)]
+    assert database.config_text(second) == "timeout = 20"
+    columns, rows = database.time_series(input_file="a.%")
+    assert columns[3:7] == ["runs", "valid_runs", "timeouts", "average_runtime"]
+    assert [row[3:] for row in rows] == [(3, 2, 1, 2.0, 1.0, 3.0), (1, 1, 0, 4.0, 4.0, 4.0)]
+    columns, rows = database.time_series(config_name="A", last=1, runs=True)
+    assert rows == [("2024-01-02", "a.vpr", "A", 0, 4.0, 0, 0, 0, 0)]
+    database.close()
+
+
+def test_storing_a_campaign_again_replaces_its_runs_but_keeps_its_date(tmp_path):
+    database = ResultDatabase(str(tmp_path / "results.db"))
+    database.store_campaign(str(tmp_path / "r1"), "2024-01-01", "host", "a.conf", "", [_result("a.vpr", "A", 0, 1.0)])
+
+    database.store_campaign(str(tmp_path / "r1"), "2024-02-01", "host", "a.conf", "",
+                            [_result("a.vpr", "A", 0, 1.0), _result("a.vpr", "A", 1, 2.0)])
+
+    assert [row[2:] for row in database.campaigns()] == [("2024-01-01", "host", 2)]
+    database.close()
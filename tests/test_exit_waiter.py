@@ -0,0 +1,70 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import pytest
+from src import exit_waiter
+from src.exit_waiter import ExitWaiter, install_child_handler
+
+pytestmark = pytest.mark.skipif(not hasattr(signal, 'SIGCHLD'), reason="requires SIGCHLD")
+
+
+@pytest.fixture
+def child_handler(monkeypatch):
+    # Use the SIGCHLD handler even where pidfds are supported
+    monkeypatch.setattr(ExitWaiter, "_pidfd_supported", False)
+    install_child_handler()
+    yield
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    signal.set_wakeup_fd(-1)
+    exit_waiter._child_handler_installed = False
+
+
+def _wait(process):
+    with ExitWaiter(process.pid) as waiter:
+        assert waiter.event is not None
+        while True:
+            waiter.prepare()
+            if process.poll() is not None:
+                return
+            waiter.wait(float('inf'))
+
+
+def test_waiting_threads_wake_up_when_their_children_exit(child_handler):
+    processes = [subprocess.Popen(["sleep", str(0.1 * i)]) for i in range(1, 5)]
+    waiters = [threading.Thread(target=_wait, args=(process,)) for process in processes]
+    for waiter in waiters:
+        waiter.start()
+    for waiter in waiters:
+        waiter.join(5)
+
+    assert not any(waiter.is_alive() for waiter in waiters)
+
+
+# The main thread waits for a child while other children exit, such that SIGCHLDs
+# interrupt it while it holds the lock of its event
+MAIN_THREAD_WAITER = """
+import subprocess, threading
+from src.exit_waiter import ExitWaiter, install_child_handler
+ExitWaiter._pidfd_supported = False
+install_child_handler()
+stop = False
+def spawn():
+    while not stop:
+        subprocess.run(["true"])
+threading.Thread(target=spawn, daemon=True).start()
+process = subprocess.Popen(["sleep", "2"])
+with ExitWaiter(process.pid) as waiter:
+    while process.poll() is None:
+        waiter.prepare()
+        waiter.wait(0.001)
+stop = True
+"""
+
+
+def test_a_main_thread_waiter_survives_signals_during_its_own_waits():
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    process = subprocess.run([sys.executable, "-c", MAIN_THREAD_WAITER], cwd=root, timeout=30,
+                             stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    assert process.returncode == 0, process.stderr.decode()[-2000:]
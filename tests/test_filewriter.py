@@ -0,0 +1,14 @@
+import pytest
+from src.filewriter import FileWriter
+
+
+def test_errors_of_the_row_generator_are_raised(tmp_path):
+    def rows():
+        yield ["file", "time"]
+        raise ValueError("no runtime")
+
+    with pytest.raises(ValueError):
+        with FileWriter(str(tmp_path / "timings.csv")) as writer:
+            writer.write_csv_rows(rows())
+
+    assert open(str(tmp_path / "timings.csv")).read() == "file;time\n"
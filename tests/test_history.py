@@ -0,0 +1,36 @@
+import json
+from src.history import RuntimeHistory
+
+
+def _journal(filename, runs):
+    with open(filename, "w") as fh:
+        for file, config_name, time_elapsed, timeout_occurred in runs:
+            fh.write(json.dumps({'input_file': file, 'config_name': config_name, 'time_elapsed': time_elapsed,
+                                 'timeout_occurred': timeout_occurred}) + "\n")
+
+
+def test_known_pairs_are_estimated_with_their_mean_runtime_and_timeouts_with_the_timeout(tmp_path):
+    _journal(str(tmp_path / "journal.jsonl"), [("a.vpr", "A", 1.0, False), ("./a.vpr", "A", 3.0, False),
+                                               ("b.vpr", "A", 100.0, True)])
+    history = RuntimeHistory(10)
+
+    history.load([str(tmp_path / "journal.jsonl")])
+
+    assert history.knows("a.vpr", "A") and not history.knows("a.vpr", "B")
+    assert history.estimate("a.vpr", "A") == 2.0
+    assert history.estimate("b.vpr", "A") == 10
+
+
+def test_unknown_pairs_are_estimated_with_the_median_of_their_run_configuration(tmp_path):
+    with open(str(tmp_path / "timings.csv"), "w") as fh:
+        fh.write("runtime [s];input file;run configuration;exit code;timeout\n")
+        for time_elapsed, file, config_name in [(1, "a.vpr", "A"), (2, "b.vpr", "A"), (6, "c.vpr", "A"),
+                                                (20, "a.vpr", "B")]:
+            fh.write("{};{};{};0;False\n".format(time_elapsed, file, config_name))
+    history = RuntimeHistory(10)
+
+    history.load([str(tmp_path / "timings.csv")])
+
+    assert history.estimate("d.vpr", "A") == 2.0
+    assert history.estimate("b.vpr", "B") == 20.0
+    assert history.estimate("a.vpr", "C") == 4.0
@@ -0,0 +1,106 @@
+import shutil
+import subprocess
+import threading
+import pytest
+from src.journal import ResultJournal, results_folder_file
+from src.plan import JobRecord
+from src.process_runner import ProcessRunner
+from src.result import RunResult, SingleRunResult
+
+
+def _result(repetition, config_name="config"):
+    result = SingleRunResult(config_name, "file.vpr")
+    result.repetition = repetition
+    result.time_elapsed = 1.0 + repetition
+    result.return_code = 0
+    result.timeout_occurred = False
+    return result
+
+
+def test_results_are_read_back_in_order(tmp_path):
+    journal = ResultJournal(str(tmp_path / "results" / "journal.jsonl"))
+    journal.append([_result(0), _result(1)])
+    journal.append([_result(2)])
+    journal.close()
+
+    results = list(ResultJournal(journal.filename).read())
+    assert [r.repetition for r in results] == [0, 1, 2]
+    assert [r.time_elapsed for r in results] == [1.0, 2.0, 3.0]
+
+
+def test_append_after_a_partial_line_keeps_both_records(tmp_path, capsys):
+    filename = str(tmp_path / "journal.jsonl")
+    journal = ResultJournal(filename)
+    journal.append([_result(0), _result(1)])
+    journal.close()
+    # The runner was killed while writing the second record
+    with open(filename, "rb+") as fh:
+        fh.truncate(fh.seek(0, 2) - 10)
+
+    resumed = ResultJournal(filename)
+    resumed.append([_result(1), _result(2)])
+    resumed.close()
+
+    results = list(ResultJournal(filename).read())
+    assert [r.repetition for r in results] == [0, 1, 2]
+    assert "Skipping corrupt line" not in capsys.readouterr().out
+
+
+def test_append_to_a_single_partial_line(tmp_path):
+    filename = str(tmp_path / "journal.jsonl")
+    with open(filename, "w") as fh:
+        fh.write('{"config_name": "con')
+
+    journal = ResultJournal(filename)
+    journal.append([_result(0)])
+    journal.close()
+
+    assert [r.repetition for r in ResultJournal(filename).read()] == [0]
+
+
+def test_concurrent_appends_do_not_interleave(tmp_path):
+    journal = ResultJournal(str(tmp_path / "journal.jsonl"))
+    threads = [threading.Thread(target=lambda name=name: [journal.append([_result(i, name)]) for i in range(200)])
+               for name in ["a", "b", "c", "d"]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.close()
+
+    results = list(journal.read())
+    assert len(results) == 800
+    for name in ["a", "b", "c", "d"]:
+        assert [r.repetition for r in results if r.config_name == name] == list(range(200))
+
+
+@pytest.mark.skipif(shutil.which("true") is None, reason="requires 'true'")
+def test_each_run_is_journaled_before_the_round_ends(tmp_path):
+    journal = ResultJournal(str(tmp_path / "journal.jsonl"))
+    results = RunResult(journal)
+    jobs = [JobRecord(0, ["true"]), JobRecord(1, ["true"]), JobRecord(2, [str(tmp_path / "missing")])]
+
+    # The third repetition fails, e.g. like a runner killed in the middle of the round
+    with pytest.raises(OSError):
+        ProcessRunner.run_as_benchmark(jobs, "file.vpr", "config", 1, 3, 3, 0, subprocess.DEVNULL,
+                                       subprocess.DEVNULL, results=results)
+    journal.close()
+
+    assert [r.repetition for r in ResultJournal(journal.filename).read()] == [0, 1]
+
+
+def test_the_journal_of_a_results_folder_is_found_by_its_configured_name(tmp_path):
+    with open(str(tmp_path / "benchmark.conf"), "w") as fh:
+        fh.write('results = { journal = "runs-@date@.jsonl", timelines = "timelines.jsonl" }\n')
+    for name in ["timelines.jsonl", "output.index.jsonl", "runs-2026-10-18-10-00-00.jsonl"]:
+        open(str(tmp_path / name), "w").close()
+
+    assert results_folder_file(str(tmp_path)) == str(tmp_path / "runs-2026-10-18-10-00-00.jsonl")
+
+
+def test_a_results_folder_without_journal_stands_for_its_timings(tmp_path):
+    with open(str(tmp_path / "benchmark.conf"), "w") as fh:
+        fh.write('results = { individual_timings = "runs.csv" }\n')
+    open(str(tmp_path / "runs.csv"), "w").close()
+
+    assert results_folder_file(str(tmp_path)) == str(tmp_path / "runs.csv")
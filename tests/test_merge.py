@@ -0,0 +1,51 @@
+import os
+import pytest
+from src.journal import ResultJournal
+from src.merge import merge_journals
+from src.result import SingleRunResult
+
+CONFIG = """repetitions = 2
+timeout = {}
+run_configurations = [ {{ name = "A", command = ["tool", "@file_name@"] }} ]
+"""
+
+
+def _shard(directory, jobs, timeout=10):
+    os.makedirs(directory)
+    with open(os.path.join(directory, "benchmark.conf"), "w") as fh:
+        fh.write(CONFIG.format(timeout))
+    results = []
+    for file, repetition in jobs:
+        result = SingleRunResult("A", file)
+        result.repetition = repetition
+        result.time_elapsed = 1.0
+        results.append(result)
+    journal = ResultJournal(os.path.join(directory, "journal.jsonl"))
+    journal.append(results)
+    journal.close()
+    return directory
+
+
+def test_the_journals_of_disjoint_shards_are_merged(tmp_path):
+    first = _shard(str(tmp_path / "first"), [("a.vpr", 0), ("a.vpr", 1)])
+    second = _shard(str(tmp_path / "second"), [("b.vpr", 0), ("b.vpr", 1)])
+    journal = ResultJournal(str(tmp_path / "merged.jsonl"))
+
+    config_file = merge_journals([first, second], journal)
+    journal.close()
+
+    assert config_file == os.path.join(first, "benchmark.conf")
+    assert [(r.input_file, r.repetition) for r in journal.read()] == [("a.vpr", 0), ("a.vpr", 1),
+                                                                      ("b.vpr", 0), ("b.vpr", 1)]
+
+
+@pytest.mark.parametrize("second_jobs, timeout", [([("a.vpr", 1)], 10),       # a file in two shards
+                                                  ([("b.vpr", 0), ("b.vpr", 0)], 10),   # a job twice
+                                                  ([("b.vpr", 2)], 10),       # beyond 'repetitions'
+                                                  ([("b.vpr", 0)], 20)])      # a different timeout
+def test_inconsistent_shards_are_rejected(tmp_path, second_jobs, timeout):
+    first = _shard(str(tmp_path / "first"), [("a.vpr", 0)])
+    second = _shard(str(tmp_path / "second"), second_jobs, timeout)
+
+    with pytest.raises(SystemExit):
+        merge_journals([first, second], ResultJournal(str(tmp_path / "merged.jsonl")))
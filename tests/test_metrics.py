@@ -0,0 +1,43 @@
+import os
+import threading
+from src.metrics import ProgressMetrics
+from src.result import SingleRunResult
+
+
+def _finished_result(config_name):
+    result = SingleRunResult(config_name, "file.vpr")
+    result.repetition = 0
+    result.time_elapsed = 0.1
+    result.return_code = 0
+    result.timeout_occurred = False
+    result.out_of_memory = False
+    return result
+
+
+def test_concurrent_updates_write_the_textfile(tmp_path):
+    threads, updates = 4, 500
+    textfile = str(tmp_path / "metrics" / "runner.prom")
+    metrics = ProgressMetrics(str(tmp_path), threads * updates, {"config": threads * updates}, threads, textfile)
+    errors = []
+
+    def update(slot):
+        try:
+            for _ in range(updates):
+                metrics.job_started(slot, "file.vpr", "config", ["true"])
+                metrics.job_finished(slot, _finished_result("config"))
+        except Exception as err:
+            errors.append(err)
+
+    workers = [threading.Thread(target=update, args=(slot,)) for slot in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    assert errors == []
+    with open(textfile) as fh:
+        content = fh.read()
+    assert "viper_runner_jobs_done {}\n".format(threads * updates) in content
+    assert 'viper_runner_jobs_remaining{config="config"} 0\n' in content
+    # No temporary files are left behind
+    assert os.listdir(os.path.dirname(textfile)) == ["runner.prom"]
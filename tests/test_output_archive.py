@@ -0,0 +1,31 @@
+import os
+import threading
+import time
+import pytest
+from src.output_archive import StreamReader
+
+
+@pytest.mark.skipif(not hasattr(os, 'sched_setaffinity') or len(os.sched_getaffinity(0)) < 2,
+                    reason="requires CPU affinity and at least two CPUs")
+def test_compression_does_not_run_on_the_cpus_of_the_slot():
+    slot_cpus = {min(os.sched_getaffinity(0))}
+    affinities = []
+    read_fd, write_fd = os.pipe()
+
+    def slot():
+        # Like a job slot pinned by the scheduler
+        os.sched_setaffinity(0, slot_cpus)
+        reader = StreamReader(os.fdopen(read_fd, "rb"))
+        os.write(write_fd, b"output")
+        deadline = time.perf_counter() + 5
+        while os.sched_getaffinity(reader.thread.native_id) == slot_cpus and time.perf_counter() < deadline:
+            time.sleep(0.01)
+        affinities.append(os.sched_getaffinity(reader.thread.native_id))
+        os.close(write_fd)
+        reader.finish()
+
+    thread = threading.Thread(target=slot)
+    thread.start()
+    thread.join()
+
+    assert affinities and not affinities[0] & slot_cpus
@@ -0,0 +1,61 @@
+from pyhocon import ConfigFactory
+from src.adaptive import AdaptiveRepetitions
+from src.plan import ExecutionPlan, RoundPlan
+from src.scheduler import Round, Scheduler
+
+
+def _plan(pairs, repetitions=3):
+    rounds = [Round(file, ConfigFactory.from_dict({'name': name, 'command': ["tool", "@file_name@", "@rep@"],
+                                                   'pre_round_commands': ["prepare @file_name@"]}),
+                    list(range(0, repetitions)))
+              for file, name in pairs]
+    Scheduler.number_jobs(rounds)
+    return ExecutionPlan({'timeout': 10}, sorted(set(file for file, _ in pairs)),
+                         [RoundPlan.compile(rnd, repetitions, 10, 100, ["tool.jar"]) for rnd in rounds])
+
+
+def test_the_commands_of_a_plan_are_substituted_when_it_is_compiled():
+    rnd = _plan([("a.vpr", "A")]).rounds[0]
+
+    assert [job.command for job in rnd.jobs] == [("tool", "a.vpr", "0"), ("tool", "a.vpr", "1"),
+                                                 ("tool", "a.vpr", "2")]
+    assert rnd.pre_round_commands == ("prepare a.vpr",)
+    assert rnd.memory_limit == 100 * 1024 * 1024 and rnd.artifacts == ("tool.jar",)
+
+
+def test_a_saved_plan_is_loaded_unchanged(tmp_path):
+    plan = _plan([("a.vpr", "A"), ("b.vpr", "A")])
+
+    plan.save(str(tmp_path / "plan.json"))
+    loaded = ExecutionPlan.load(str(tmp_path / "plan.json"))
+
+    assert loaded.config == plan.config and loaded.files == plan.files
+    assert loaded.rounds == plan.rounds
+
+
+def test_completed_jobs_are_removed_and_the_remaining_jobs_renumbered():
+    plan = _plan([("a.vpr", "A"), ("b.vpr", "A"), ("c.vpr", "A")])
+    completed_jobs = {("a.vpr", "A", 0): 1.0, ("a.vpr", "A", 1): 1.0, ("a.vpr", "A", 2): 1.0,
+                      ("b.vpr", "A", 1): None}
+
+    rounds = plan.remaining_rounds(completed_jobs)
+
+    assert [(rnd.file, rnd.repetitions, rnd.first_job, rnd.previous_results) for rnd in rounds] == \
+        [("b.vpr", [0, 2], 1, (None,)), ("c.vpr", [0, 1, 2], 3, ())]
+
+
+def test_rounds_whose_adaptive_repetitions_are_done_are_removed():
+    plan = _plan([("a.vpr", "A"), ("b.vpr", "A")], repetitions=5)
+    completed_jobs = {("a.vpr", "A", 0): 1.0, ("a.vpr", "A", 1): 1.0, ("a.vpr", "A", 2): 1.0,
+                      ("b.vpr", "A", 0): 1.0, ("b.vpr", "A", 1): 3.0, ("b.vpr", "A", 2): 5.0}
+
+    rounds = plan.remaining_rounds(completed_jobs, AdaptiveRepetitions(3, 5, 0.05, 0.95))
+
+    assert [(rnd.file, rnd.repetitions) for rnd in rounds] == [("b.vpr", [3, 4])]
+
+
+def test_the_job_order_lists_the_jobs_in_the_order_of_the_rounds():
+    plan = _plan([("b.vpr", "A"), ("a.vpr", "A")], repetitions=2)
+
+    assert plan.job_order() == {("b.vpr", "A", 0): 0, ("b.vpr", "A", 1): 1, ("a.vpr", "A", 0): 2,
+                                ("a.vpr", "A", 1): 3}
@@ -0,0 +1,23 @@
+from plotter import aggregate, load_columns
+
+TIMINGS = """time;file;config;exit code;timeout;out of memory
+1.0;a.vpr;A;0;False;False
+3.0;a.vpr;A;-1;True;False
+2.0;a.vpr;B;0;False;False
+4.0;b.vpr;B;-1;False;True
+"""
+
+
+def test_killed_runs_count_towards_the_means_unless_excluded(tmp_path):
+    csv_path = str(tmp_path / "timings.csv")
+    with open(csv_path, "w") as fh:
+        fh.write(TIMINGS)
+    runs, files, configs = load_columns(csv_path)
+
+    means, _ = aggregate(runs, len(files), len(configs))
+    completed_means, _ = aggregate(runs, len(files), len(configs), exclude_killed=True)
+
+    assert (files, configs) == (["a.vpr", "b.vpr"], ["A", "B"])
+    assert means[0].tolist() == [2.0, 2.0] and means[1, 1] == 4.0
+    assert completed_means[0].tolist() == [1.0, 2.0]
+    assert all(value != value for value in completed_means[1])
@@ -0,0 +1,31 @@
+import os
+import shutil
+import subprocess
+import sys
+import pytest
+from src.process_runner import TREE_SAMPLING_INTERVAL, ProcessRunner
+
+LARGE_PARENT = 300 * 2**20
+
+
+@pytest.mark.skipif(sys.platform == 'win32', reason="requires 'sleep'")
+def test_peak_rss_excludes_the_memory_of_a_large_parent():
+    ballast = bytearray(LARGE_PARENT)
+    # Touch each page, such that the ballast is resident
+    for i in range(0, len(ballast), 4096):
+        ballast[i] = 1
+
+    result = ProcessRunner.run(["sleep", "0.5"], 0, subprocess.DEVNULL, subprocess.DEVNULL)
+
+    assert result.return_code == 0
+    assert result.usage.peak_rss is not None
+    assert result.usage.peak_rss < 50 * 2**20
+    del ballast
+
+
+@pytest.mark.skipif(not hasattr(os, 'wait4') or shutil.which("true") is None, reason="requires os.wait4 and 'true'")
+def test_runs_shorter_than_the_sampling_interval_take_the_peak_rss_from_the_rusage():
+    result = ProcessRunner.run(["true"], 0, subprocess.DEVNULL, subprocess.DEVNULL)
+
+    assert result.time_elapsed < TREE_SAMPLING_INTERVAL
+    assert result.usage.peak_rss > 0
@@ -0,0 +1,100 @@
+import glob
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import pytest
+from src import environment
+
+RUNNER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "runner.py")
+
+CONFIG = """test_folder = "tests"
+confirm_start = false
+repetitions = 2
+timeout = 10
+pin_cpus = false
+calibration_runs = 0
+containment = "none"
+results = { path = "results", individual_timings = "timings.csv" }
+run_configurations = [ { name = "null", command = ["true", "@file_name@"] } ]
+"""
+
+
+def _run_runner(directory, *args):
+    process = subprocess.run([sys.executable, RUNNER] + list(args), cwd=str(directory), stdin=subprocess.DEVNULL,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    assert process.returncode == 0, process.stdout.decode(errors="replace")[-2000:]
+    return process.stdout.decode(errors="replace")
+
+
+@pytest.fixture
+def benchmark(tmp_path):
+    os.makedirs(str(tmp_path / "tests"))
+    for name in ["a.vpr", "b.vpr"]:
+        open(str(tmp_path / "tests" / name), "w").close()
+    with open(str(tmp_path / "benchmark.conf"), "w") as fh:
+        fh.write(CONFIG)
+    return tmp_path
+
+
+@pytest.mark.skipif(shutil.which("true") is None, reason="requires 'true'")
+def test_a_dry_run_plan_can_be_executed_and_resumed(benchmark):
+    _run_runner(benchmark, "--dry-run", "benchmark.conf")
+    _run_runner(benchmark, "--plan", os.path.join("results", "plan.json"))
+
+    assert [os.path.basename(name) for name in glob.glob(str(benchmark / "results" / "*.conf"))] == \
+        ["benchmark.conf"]
+    output = _run_runner(benchmark, "--resume", "results")
+    assert "jobs remaining = 0" in output
+
+
+def test_declining_the_start_saves_no_plan(benchmark, monkeypatch):
+    monkeypatch.chdir(str(benchmark))
+    monkeypatch.setattr(environment, "getch", lambda: "q")
+    with open("benchmark.conf", "a") as fh:
+        fh.write("confirm_start = true\n")
+
+    with pytest.raises(SystemExit):
+        environment.Environment().exec("benchmark.conf")
+
+    assert not os.path.exists(os.path.join("results", "plan.json"))
+
+
+@pytest.mark.skipif(shutil.which("true") is None, reason="requires 'true'")
+def test_a_coordinator_neither_calibrates_nor_lets_its_workers_create_results_folders(benchmark):
+    with open(str(benchmark / "benchmark.conf"), "a") as fh:
+        fh.write("calibration_runs = 2\nresults.calibration = calibration.csv\n")
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    output = _run_runner(benchmark, "--coordinator", str(port), "--local-workers", "2", "benchmark.conf")
+
+    assert "Collected 4 data points" in output
+    assert sorted(os.listdir(str(benchmark / "results"))) == ["benchmark.conf", "journal.jsonl", "plan.json",
+                                                              "schedule.csv", "timings.csv"]
+
+
+@pytest.mark.skipif(shutil.which("true") is None, reason="requires 'true'")
+def test_resuming_appends_to_the_schedule_and_the_calibration(benchmark):
+    with open(str(benchmark / "benchmark.conf"), "a") as fh:
+        fh.write("calibration_runs = 2\nresults.calibration = calibration.csv\n")
+    _run_runner(benchmark, "benchmark.conf")
+    results = benchmark / "results"
+    # Interrupted after the first job
+    with open(str(results / "journal.jsonl")) as fh:
+        first_job = fh.readline()
+    with open(str(results / "journal.jsonl"), "w") as fh:
+        fh.write(first_job)
+    with open(str(results / "schedule.csv")) as fh:
+        schedule = fh.read().splitlines()
+
+    _run_runner(benchmark, "--resume", "results")
+
+    with open(str(results / "schedule.csv")) as fh:
+        resumed_schedule = fh.read().splitlines()
+    assert resumed_schedule[:3] == schedule
+    assert [row.split(";")[0] for row in resumed_schedule[1:]] == ["1", "2", "3", "4"]
+    with open(str(results / "calibration.csv")) as fh:
+        assert [row.split(";")[0] for row in fh.read().splitlines()] == ["repetition", "0", "1", "2", "3"]
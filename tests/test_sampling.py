@@ -0,0 +1,49 @@
+import math
+import os
+import random
+from src.sampling import StratifiedSampler
+
+
+def _files(directory, count):
+    return [os.path.join("bench", directory, "f{}.vpr".format(i)) for i in range(count)]
+
+
+def test_strata_contribute_in_proportion_to_their_size_and_at_least_one_file():
+    files = _files("large", 16) + _files("medium", 8) + _files("small", 1)
+    sampler = StratifiedSampler(files, "bench")
+
+    selected = sampler.draw(9, random.Random(1))
+
+    per_directory = {directory: sum(1 for file in selected if os.sep + directory + os.sep in file)
+                     for directory in ["large", "medium", "small"]}
+    assert per_directory == {"large": 5, "medium": 3, "small": 1}
+
+
+def test_runtime_buckets_split_the_strata_of_a_directory():
+    files = _files("all", 8)
+    weights = {file: float(i) for i, file in enumerate(files)}
+    sampler = StratifiedSampler(files, "bench", weights, buckets=2)
+
+    selected = sampler.draw(2, random.Random(1))
+
+    assert sorted(weights[file] >= 4 for file in selected) == [False, True]
+
+
+def test_draws_are_reproducible_by_their_seed():
+    sampler = StratifiedSampler(_files("a", 20) + _files("b", 20), "bench")
+
+    assert sampler.draw(10, random.Random(5)) == sampler.draw(10, random.Random(5))
+    assert sampler.draw(100, random.Random(5)) == set(sampler.files)
+
+
+def test_tracking_compares_the_ratio_on_the_subset_with_that_on_all_files():
+    files = _files("a", 10)
+    log_ratios = {file: math.log(2.0 if i < 5 else 1.0) for i, file in enumerate(files)}
+    sampler = StratifiedSampler(files, "bench")
+
+    full, subset, error, (low, high) = sampler.tracking(set(files[:2]), 2, 1, log_ratios)
+
+    assert abs(full - math.sqrt(2.0)) < 1e-12
+    assert abs(subset - 2.0) < 1e-12 and abs(error - (math.sqrt(2.0) - 1)) < 1e-12
+    assert low < 0 < high
+    assert sampler.tracking(set(files[:2]), 2, 1, {}) is None
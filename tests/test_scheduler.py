@@ -0,0 +1,135 @@
+import random
+import threading
+import time
+from src.journal import ResultJournal
+from src.result import RunResult, SingleRunResult
+from src.scheduler import Round, RoundCommandLock, Scheduler
+
+
+def test_rounds_are_yielded_as_they_finish():
+    durations = {"slow": 0.5, "fast": 0.0}
+
+    def execute(rnd, slot):
+        time.sleep(durations[rnd.file])
+        return rnd.file
+
+    rounds = [Round("slow", None, [0]), Round("fast", None, [0])]
+    assert list(Scheduler(2, False).run(rounds, execute)) == ["fast", "slow"]
+
+
+def test_sequential_rounds_keep_their_order():
+    rounds = [Round(name, None, [0]) for name in ["a", "b", "c"]]
+    assert list(Scheduler(1, False).run(rounds, lambda rnd, slot: rnd.file)) == ["a", "b", "c"]
+
+
+def test_each_slot_runs_one_round_at_a_time():
+    running = set()
+    overlaps = []
+    lock = threading.Lock()
+
+    def execute(rnd, slot):
+        with lock:
+            overlaps.append(slot in running)
+            running.add(slot)
+        time.sleep(0.01)
+        with lock:
+            running.discard(slot)
+        return slot
+
+    slots = list(Scheduler(3, False).run([Round(str(i), None, [0]) for i in range(12)], execute))
+    assert sorted(set(slots)) == [0, 1, 2]
+    assert not any(overlaps)
+
+
+def test_results_are_listed_in_the_job_order(tmp_path):
+    journal = ResultJournal(str(tmp_path / "journal.jsonl"))
+    results = RunResult(journal)
+    # Journaled in the order in which concurrent jobs finished
+    for file, config_name, repetition in [("b", "A", 0), ("a", "A", 1), ("a", "A", 0), ("b", "A", 1)]:
+        result = SingleRunResult(config_name, file)
+        result.repetition = repetition
+        result.time_elapsed = 1.0
+        result.return_code = 0
+        result.timeout_occurred = False
+        results.add_results([result])
+    journal.close()
+
+    job_order = {("a", "A", 0): 0, ("a", "A", 1): 1, ("b", "A", 0): 2, ("b", "A", 1): 3}
+    results.process_timings(job_order=job_order)
+
+    assert [(r.input_file, r.repetition) for r in results.sorted_results()] == [("a", 0), ("a", 1),
+                                                                                ("b", 0), ("b", 1)]
+    assert list(results.file_to_sorted_rows) == ["a", "b"]
+
+
+def test_round_commands_run_while_no_job_runs():
+    lock = RoundCommandLock()
+    events = []
+    job_started = threading.Event()
+
+    def job():
+        with lock.shared():
+            events.append("job start")
+            job_started.set()
+            time.sleep(0.2)
+            events.append("job end")
+
+    def command():
+        job_started.wait()
+        with lock.exclusive():
+            events.append("command")
+
+    def later_job():
+        # Starts while the command waits, hence after it
+        time.sleep(0.1)
+        with lock.shared():
+            events.append("later job")
+
+    threads = [threading.Thread(target=target) for target in [job, command, later_job]]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert events == ["job start", "job end", "command", "later job"]
+
+
+def _order(rounds):
+    return [(rnd.file, rnd.run_config, rnd.repetitions) for rnd in rounds]
+
+
+def test_interleaved_rounds_run_the_same_repetition_of_all_run_configurations_back_to_back():
+    rounds = [Round("a", "A", [0, 1]), Round("a", "B", [0, 1]), Round("b", "A", [0])]
+
+    assert _order(Scheduler.order_interleaved(rounds)) == [("a", "A", [0]), ("a", "B", [0]), ("a", "A", [1]),
+                                                           ("a", "B", [1]), ("b", "A", [0])]
+
+
+def test_random_orders_are_reproduced_by_their_seed_and_keep_blocks_together():
+    rounds = [Round(file, config, [0, 1, 2]) for file in "abcdef" for config in "ABC"]
+
+    order = _order(Scheduler.order_interleaved(rounds, random.Random(42)))
+
+    assert order == _order(Scheduler.order_interleaved(rounds, random.Random(42)))
+    assert order != _order(Scheduler.order_interleaved(rounds, random.Random(43)))
+    assert sorted(order) == sorted(_order(Scheduler.order_interleaved(rounds)))
+    # Each block of three runs shares the file and repetition
+    blocks = [order[i:i + 3] for i in range(0, len(order), 3)]
+    assert all(len({(file, tuple(reps)) for file, _, reps in block}) == 1 for block in blocks)
+
+
+def test_shards_are_disjoint_and_independent_of_the_order_of_the_files():
+    files = ["f{}".format(i) for i in range(10)]
+
+    shards = [Scheduler.shard_files(files, i, 3) for i in range(3)]
+
+    assert sorted(sum(shards, [])) == sorted(files)
+    assert [len(shard) for shard in shards] == [4, 3, 3]
+    assert [sorted(Scheduler.shard_files(files[::-1], i, 3)) for i in range(3)] == [sorted(s) for s in shards]
+
+
+def test_shards_are_balanced_by_weight():
+    weights = {"a": 10.0, "b": 6.0, "c": 4.0, "d": 1.0}
+
+    assert Scheduler.shard_files(list(weights), 0, 2, weights) == ["a", "d"]
+    assert Scheduler.shard_files(list(weights), 1, 2, weights) == ["b", "c"]
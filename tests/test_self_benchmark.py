@@ -0,0 +1,49 @@
+from src.self_benchmark import NOISE_FLOOR, _interleaved_minima, compare_reports
+
+
+def _report(**medians):
+    units = {'exit_detection_delay': ("s", "lower"), 'runner_jobs_per_second': ("jobs/s", "higher"),
+             'cpu_spinner_sampling_slowdown': ("ratio", "lower")}
+    return {'metrics': {name: {'unit': units[name][0], 'better': units[name][1], 'median': median}
+                        for name, median in medians.items()}}
+
+
+def test_changes_in_the_worse_direction_beyond_the_threshold_are_regressions():
+    baseline = _report(runner_jobs_per_second=100.0, cpu_spinner_sampling_slowdown=0.02)
+    report = _report(runner_jobs_per_second=70.0, cpu_spinner_sampling_slowdown=0.03)
+
+    assert compare_reports(baseline, report, 0.2) == [('cpu_spinner_sampling_slowdown', 0.02, 0.03),
+                                                      ('runner_jobs_per_second', 100.0, 70.0)]
+
+
+def test_improvements_and_small_changes_are_no_regressions():
+    baseline = _report(runner_jobs_per_second=100.0, cpu_spinner_sampling_slowdown=0.02)
+    report = _report(runner_jobs_per_second=150.0, cpu_spinner_sampling_slowdown=0.022)
+
+    assert compare_reports(baseline, report, 0.2) == []
+
+
+def test_time_changes_below_the_noise_floor_are_no_regressions():
+    # Ten times slower, but by less than the noise floor
+    baseline = _report(exit_detection_delay=NOISE_FLOOR / 20)
+    below = _report(exit_detection_delay=NOISE_FLOOR / 2)
+    above = _report(exit_detection_delay=NOISE_FLOOR * 2)
+
+    assert compare_reports(baseline, below, 0.2) == []
+    assert compare_reports(baseline, above, 0.2) == [('exit_detection_delay', NOISE_FLOOR / 20, NOISE_FLOOR * 2)]
+
+
+def test_metrics_missing_from_the_baseline_are_skipped():
+    assert compare_reports(_report(), _report(exit_detection_delay=1.0), 0.2) == []
+
+
+def test_interleaved_variants_take_turns_to_run_first_and_yield_their_minimum():
+    calls = []
+
+    def variant(name, times):
+        return lambda: (calls.append(name), times.pop(0))[1]
+
+    minima = _interleaved_minima([variant("a", [3.0, 1.0, 2.0]), variant("b", [5.0, 6.0, 4.0])], runs=3)
+
+    assert minima == [1.0, 4.0]
+    assert calls == ["a", "b", "b", "a", "a", "b"]
@@ -0,0 +1,45 @@
+import math
+import numpy
+from src.stats import confidence_interval, summarize, t_quantile
+
+
+def test_t_quantiles_match_tabulated_values():
+    assert abs(t_quantile(0.975, 1) - 12.706) < 1e-3
+    assert abs(t_quantile(0.975, 2) - 4.303) < 1e-3
+    assert abs(t_quantile(0.975, 5) - 2.571) / 2.571 < 0.01
+    assert abs(t_quantile(0.975, 30) - 2.042) / 2.042 < 0.001
+    assert abs(t_quantile(0.025, 10) + t_quantile(0.975, 10)) < 1e-12
+
+
+def test_the_confidence_interval_is_centred_on_the_mean():
+    lower, upper = confidence_interval([1.0, 2.0, 3.0], 0.95)
+
+    half_width = 4.303 * 1.0 / math.sqrt(3)
+    assert abs(lower - (2.0 - half_width)) < 1e-3 and abs(upper - (2.0 + half_width)) < 1e-3
+
+
+def test_samples_are_summarized_independently():
+    statistics, _ = summarize([[1.0, 2.0, 3.0, 6.0], [5.0], []])
+
+    assert statistics['count'].tolist() == [4, 1, 0]
+    assert statistics['mean'][0] == 3.0 and statistics['median'][0] == 2.5 and statistics['min'][0] == 1.0
+    assert abs(statistics['std_dev'][0] - numpy.std([1.0, 2.0, 3.0, 6.0], ddof=1)) < 1e-12
+    assert statistics['mean'][1] == 5.0 and math.isnan(statistics['std_dev'][1])
+    assert math.isnan(statistics['mean'][2])
+    assert statistics['ci_lower'][0] <= 3.0 <= statistics['ci_upper'][0]
+    assert math.isnan(statistics['ci_lower'][1])
+
+
+def test_the_bootstrap_is_reproducible_by_its_seed():
+    samples = [[1.0, 1.5, 2.0, 4.0, 2.5]]
+
+    assert summarize(samples, seed=7)[0]['ci_lower'] == summarize(samples, seed=7)[0]['ci_lower']
+
+
+def test_outliers_are_values_far_from_the_median_in_units_of_the_median_absolute_deviation():
+    statistics, outliers = summarize([[10.0, 10.1, 9.9, 10.0, 10.2, 30.0], [1.0, 1.0, 1.0]])
+
+    assert outliers[0].tolist() == [False, False, False, False, False, True]
+    # Without deviation from the median, nothing is an outlier
+    assert not outliers[1].any()
+    assert statistics['outliers'].tolist() == [1, 0]
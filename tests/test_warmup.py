@@ -0,0 +1,42 @@
+from pyhocon import ConfigFactory
+from src.stats import steady_state_changepoint, steady_state_rolling_cv
+from src.warmup import Warmup
+
+
+def _warmup_runs(warmup, times, repetitions=None, valid=None):
+    return warmup.warmup_runs(repetitions if repetitions is not None else list(range(0, len(times))), times,
+                              valid if valid is not None else [True] * len(times))
+
+
+def test_the_rolling_cv_finds_the_first_stable_window():
+    assert steady_state_rolling_cv([5.0, 3.0, 1.0, 1.01, 0.99, 1.0], 3, 0.05, 6) == 2
+    assert steady_state_rolling_cv([5.0, 3.0, 1.0, 1.01, 0.99, 1.0], 3, 0.05, 1) is None
+    assert steady_state_rolling_cv([1.0, 2.0, 4.0, 8.0], 3, 0.05, 4) is None
+
+
+def test_the_changepoint_splits_slow_warmup_runs_from_the_steady_state():
+    assert steady_state_changepoint([3.0, 2.9, 1.0, 1.1, 0.9, 1.0], 0.1, 6) == 2
+    # The first runs are not slower by at least min_slowdown
+    assert steady_state_changepoint([1.05, 1.04, 1.0, 1.0, 1.0], 0.1, 5) == 0
+    assert steady_state_changepoint([3.0, 1.0], 0.1, 2) == 0
+
+
+def test_a_fixed_number_of_warmup_runs_counts_repetitions():
+    warmup = Warmup.from_config(ConfigFactory.from_dict({'warmup': {'runs': 2}}))
+
+    assert _warmup_runs(warmup, [9.0, 9.0, 1.0, 1.0]) == 2
+    # Repetitions 0 and 1 were completed by an interrupted benchmark and are not in the results
+    assert _warmup_runs(warmup, [1.0, 1.0], repetitions=[2, 3]) == 0
+    assert Warmup.from_config(ConfigFactory.from_dict({'name': "A"})) is None
+
+
+def test_timeouts_before_the_steady_state_are_warmup_runs():
+    warmup = Warmup('changepoint')
+
+    assert _warmup_runs(warmup, [10.0, 3.0, 3.0, 1.0, 1.0, 1.0], valid=[False, True, True, True, True, True]) == 3
+
+
+def test_no_steady_state_within_the_maximum_number_of_warmup_runs_is_reported():
+    warmup = Warmup('rolling_cv', window=3, max_cv=0.05, max_runs=1)
+
+    assert _warmup_runs(warmup, [5.0, 3.0, 1.0, 1.0, 1.0]) is None